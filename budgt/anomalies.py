@@ -0,0 +1,304 @@
+"""Incremental spending-anomaly detection for Budgt.sh.
+
+``category_stats`` keeps, per category, an exponentially weighted mean and
+variance of individual expenses and of weekly totals. Every write path calls
+``record`` with the expenses it just inserted, inside its own DB transaction
+(like ``rollups.record``): each expense is scored against the statistics
+*before* it is folded in, so updating the detector is O(1) per transaction
+and never rescans history.
+
+Two kinds of anomalies are stored in ``anomalies``:
+
+- ``transaction``: one expense at least ``THRESHOLD`` standard deviations
+  above its category's running mean
+- ``week``: a category's running total for the current week at least
+  ``THRESHOLD`` standard deviations above its usual weekly total; the row is
+  updated as the week keeps growing
+"""
+
+import datetime
+import math
+from collections import namedtuple
+
+from sqlalchemy import select, text
+from sqlalchemy.dialects.sqlite import insert
+
+from .database import Anomaly, CategoryStats, TransactionType
+
+TRANSACTION = "transaction"
+WEEK = "week"
+
+# Weight of the newest observation in the running statistics
+ALPHA = 0.1
+# Standard deviations above the mean that count as an anomaly
+THRESHOLD = 3.0
+# Observations needed before a category is scored
+MIN_TRANSACTIONS = 8
+MIN_WEEKS = 4
+# Empty weeks folded in when a category goes quiet for longer than this are
+# skipped, which keeps a late expense O(1)
+MAX_GAP_WEEKS = 52
+
+# One written expense as seen by the detector
+Observation = namedtuple(
+    "Observation", ["transaction_id", "date", "category_id", "transaction_type", "amount"]
+)
+
+# A flagged transaction or week, as stored in ``anomalies``
+Alert = namedtuple(
+    "Alert", ["kind", "category_id", "period", "transaction_id", "amount", "expected", "zscore"]
+)
+
+
+def observation_for(transaction):
+    """Build an ``Observation`` from a flushed ``Transaction``."""
+    return Observation(
+        transaction.id,
+        transaction.date,
+        transaction.category_id,
+        transaction.transaction_type,
+        transaction.amount,
+    )
+
+
+def _update(count, mean, variance, value):
+    """Fold ``value`` into an exponentially weighted mean and variance."""
+    if count == 0:
+        return 1, value, 0.0
+    diff = value - mean
+    increment = ALPHA * diff
+    return count + 1, mean + increment, (1 - ALPHA) * (variance + diff * increment)
+
+
+def _zscore(count, minimum, mean, variance, value):
+    """Standard deviations of ``value`` above ``mean``, or None if unscored."""
+    if count < minimum or variance <= 0:
+        return None
+    return (value - mean) / math.sqrt(variance)
+
+
+def _day(value):
+    return value.date() if isinstance(value, datetime.datetime) else value
+
+
+def _monday(value):
+    day = _day(value)
+    return day - datetime.timedelta(days=day.weekday())
+
+
+def _empty_stats(category_id):
+    return {
+        "category_id": category_id,
+        "count": 0,
+        "mean": 0.0,
+        "variance": 0.0,
+        "week": None,
+        "week_total": 0.0,
+        "weeks": 0,
+        "week_mean": 0.0,
+        "week_variance": 0.0,
+    }
+
+
+def _close_week(stats, week):
+    """Fold the accumulated week and any empty weeks before ``week``."""
+    gap = (week - stats["week"]).days // 7
+    for total in [stats["week_total"]] + [0.0] * min(gap - 1, MAX_GAP_WEEKS):
+        stats["weeks"], stats["week_mean"], stats["week_variance"] = _update(
+            stats["weeks"], stats["week_mean"], stats["week_variance"], total
+        )
+    stats["week"] = week
+    stats["week_total"] = 0.0
+
+
+def observe(stats, observation):
+    """Score one expense and fold it into ``stats`` (a ``category_stats`` row).
+
+    Args:
+        stats (dict): Column values of the category's statistics, updated in place
+        observation (Observation): The expense
+
+    Returns:
+        list: ``Alert`` tuples raised by this expense
+    """
+    alerts = []
+    amount = observation.amount or 0.0
+    zscore = _zscore(stats["count"], MIN_TRANSACTIONS, stats["mean"], stats["variance"], amount)
+    if zscore is not None and zscore >= THRESHOLD:
+        alerts.append(
+            Alert(
+                TRANSACTION,
+                stats["category_id"],
+                _day(observation.date),
+                observation.transaction_id or 0,
+                amount,
+                stats["mean"],
+                zscore,
+            )
+        )
+    stats["count"], stats["mean"], stats["variance"] = _update(
+        stats["count"], stats["mean"], stats["variance"], amount
+    )
+
+    week = _monday(observation.date)
+    if stats["week"] is None:
+        stats["week"] = week
+    elif week > stats["week"]:
+        _close_week(stats, week)
+    elif week < stats["week"]:
+        # Back-dated expense: the weekly statistics have moved past it
+        return alerts
+
+    stats["week_total"] += amount
+    zscore = _zscore(
+        stats["weeks"], MIN_WEEKS, stats["week_mean"], stats["week_variance"], stats["week_total"]
+    )
+    if zscore is not None and zscore >= THRESHOLD:
+        alerts.append(
+            Alert(WEEK, stats["category_id"], week, 0, stats["week_total"], stats["week_mean"], zscore)
+        )
+    return alerts
+
+
+def _stats_upsert():
+    statement = insert(CategoryStats)
+    columns = [column.name for column in CategoryStats.__table__.columns if column.name != "category_id"]
+    return statement.on_conflict_do_update(
+        index_elements=["category_id"],
+        set_={name: statement.excluded[name] for name in columns},
+    )
+
+
+def _anomaly_upsert():
+    statement = insert(Anomaly)
+    return statement.on_conflict_do_update(
+        index_elements=["kind", "category_id", "period", "transaction_id"],
+        set_={
+            "amount": statement.excluded.amount,
+            "expected": statement.excluded.expected,
+            "zscore": statement.excluded.zscore,
+            "detected_at": statement.excluded.detected_at,
+        },
+    )
+
+
+_STATS_UPSERT = _stats_upsert()
+_ANOMALY_UPSERT = _anomaly_upsert()
+
+
+def record(db, observations):
+    """Score written expenses and update the running statistics.
+
+    Runs in the caller's transaction: one SELECT for the touched categories,
+    one upsert of their statistics and one upsert of any anomalies.
+
+    Args:
+        db: Session or Connection holding the write
+        observations (iterable): ``Observation`` tuples; non-expenses are ignored
+
+    Returns:
+        list: ``Alert`` tuples raised by the batch
+    """
+    observations = [
+        observation for observation in observations
+        if observation.transaction_type == TransactionType.EXPENSE
+    ]
+    if not observations:
+        return []
+
+    keys = {observation.category_id or 0 for observation in observations}
+    stats = {
+        row.category_id: dict(row._mapping)
+        for row in db.execute(
+            select(*CategoryStats.__table__.columns).where(CategoryStats.category_id.in_(keys))
+        )
+    }
+    alerts = {}
+    for observation in observations:
+        key = observation.category_id or 0
+        if key not in stats:
+            stats[key] = _empty_stats(key)
+        for alert in observe(stats[key], observation):
+            # A growing week keeps only its latest figures
+            alerts[alert[:4]] = alert
+
+    db.execute(_STATS_UPSERT, [stats[key] for key in keys])
+    if alerts:
+        detected_at = datetime.datetime.utcnow()
+        db.execute(
+            _ANOMALY_UPSERT,
+            [dict(alert._asdict(), detected_at=detected_at) for alert in alerts.values()],
+        )
+    return list(alerts.values())
+
+
+def recent(db, since, limit=None):
+    """Return anomalies for periods on or after ``since``, newest first.
+
+    Args:
+        db (Session): Open database session
+        since (date): Earliest day (or week Monday) to include
+        limit (int): Maximum number of rows
+
+    Returns:
+        list: ``Alert`` tuples
+    """
+    query = (
+        select(
+            Anomaly.kind,
+            Anomaly.category_id,
+            Anomaly.period,
+            Anomaly.transaction_id,
+            Anomaly.amount,
+            Anomaly.expected,
+            Anomaly.zscore,
+        )
+        .where(Anomaly.period >= since)
+        .order_by(Anomaly.period.desc(), Anomaly.zscore.desc())
+    )
+    if limit:
+        query = query.limit(limit)
+    return [Alert(*row) for row in db.execute(query)]
+
+
+def rebuild(db):
+    """Replay the whole expense history through the detector.
+
+    Expenses are read from the analytics column arrays in (day, id) order and
+    processed in memory, then both tables are rewritten.
+
+    Args:
+        db (Session): Open database session; the caller commits
+
+    Returns:
+        int: Number of anomalies found
+    """
+    from .analytics import EXPENSE, LedgerColumns, from_day
+
+    columns = LedgerColumns.open(db)
+    expense = columns.type == EXPENSE
+    stats = {}
+    alerts = {}
+    for transaction_id, day, category_id, amount in zip(
+        columns.id[expense].tolist(),
+        columns.day[expense].tolist(),
+        columns.category_id[expense].tolist(),
+        columns.amount[expense].tolist(),
+    ):
+        if category_id not in stats:
+            stats[category_id] = _empty_stats(category_id)
+        observation = Observation(transaction_id, from_day(day), category_id, TransactionType.EXPENSE, amount)
+        for alert in observe(stats[category_id], observation):
+            alerts[alert[:4]] = alert
+
+    db.execute(text("DELETE FROM category_stats"))
+    db.execute(text("DELETE FROM anomalies"))
+    if stats:
+        db.execute(insert(CategoryStats), list(stats.values()))
+    if alerts:
+        detected_at = datetime.datetime.utcnow()
+        db.execute(
+            insert(Anomaly),
+            [dict(alert._asdict(), detected_at=detected_at) for alert in alerts.values()],
+        )
+    return len(alerts)
@@ -1,40 +1,900 @@
 
+import os
 import sys
-from .database import init_db
-from .tui import ExpenseApp
+import time
+from .config import load_config
 from . import __version__
 
+# Everything else (SQLAlchemy, the models, Textual, plotext, NumPy) is
+# imported inside the command that needs it, so `budgt --version` and the
+# read-only commands start without loading the TUI stack.
+
+def _pop_option(args, name):
+    """Remove ``name VALUE`` or ``name=VALUE`` from ``args`` and return VALUE."""
+    for index, arg in enumerate(args):
+        if arg == name:
+            if index + 1 >= len(args):
+                raise ValueError(f"{name} requires a value")
+            value = args[index + 1]
+            del args[index:index + 2]
+            return value
+        if arg.startswith(name + "="):
+            del args[index]
+            return arg[len(name) + 1:]
+    return None
+
+def rebuild_balances():
+    """Recompute materialized balances from history and report any drift."""
+    from .balances import AccountBalanceStore
+    from .database import SessionLocal, init_db
+
+    init_db()
+    db = SessionLocal()
+    try:
+        drift = AccountBalanceStore.rebuild(db)
+    finally:
+        db.close()
+
+    if not drift:
+        print("All account balances are consistent.")
+        return 0
+
+    for entry in drift:
+        stored = "missing" if entry.stored is None else f"${entry.stored:.2f}"
+        print(f"{entry.name}: stored {stored}, actual ${entry.actual:.2f} (repaired)")
+    print(f"Repaired {len(drift)} account balance(s).")
+    return 1
+
+def rebuild_rollups():
+    """Recompute the daily and monthly rollup tables from the ledger."""
+    from . import rollups
+    from .database import SessionLocal, init_db
+
+    init_db()
+    db = SessionLocal()
+    started = time.perf_counter()
+    try:
+        count = rollups.rebuild(db)
+        db.commit()
+    finally:
+        db.close()
+    print(f"Rebuilt {count} daily rollup row(s) in {time.perf_counter() - started:.2f}s")
+    return 0
+
+def rebuild_alerts():
+    """Replay the expense history through the anomaly detector."""
+    from . import anomalies
+    from .database import SessionLocal, init_db
+
+    init_db()
+    db = SessionLocal()
+    started = time.perf_counter()
+    try:
+        count = anomalies.rebuild(db)
+        db.commit()
+    finally:
+        db.close()
+    print(f"Found {count} anomal{'y' if count == 1 else 'ies'} in {time.perf_counter() - started:.2f}s")
+    return 0
+
+def show_alerts(argv):
+    """Run ``budgt alerts``: list recent spending anomalies."""
+    import argparse
+    from datetime import date, timedelta
+    from . import anomalies, categories, database
+    from .database import Transaction, init_db
+
+    parser = argparse.ArgumentParser(
+        prog="budgt alerts",
+        description="List expenses and weeks that spiked above their category's usual spend.",
+    )
+    parser.add_argument("--days", type=int, default=30, help="how far back to look (default: 30)")
+    parser.add_argument("--limit", type=int, help="show at most this many alerts")
+    options = parser.parse_args(argv)
+
+    init_db()
+    db = database.SessionLocal()
+    try:
+        alerts = anomalies.recent(db, date.today() - timedelta(days=options.days), options.limit)
+        labels = categories.labels(db) if alerts else {}
+        ids = [alert.transaction_id for alert in alerts if alert.transaction_id]
+        descriptions = {}
+        if ids:
+            descriptions = dict(
+                db.query(Transaction.id, Transaction.description).filter(Transaction.id.in_(ids))
+            )
+    finally:
+        db.close()
+
+    if not alerts:
+        print(f"No spending anomalies in the last {options.days} days.")
+        return 0
+    for alert in alerts:
+        category = labels.get(alert.category_id, "Uncategorized")
+        if alert.kind == anomalies.WEEK:
+            what = f"week of {alert.period}"
+            detail = f"{category} total"
+        else:
+            what = str(alert.period)
+            detail = f"{category}: {descriptions.get(alert.transaction_id, '')}"
+        print(
+            f"{what:<19} ${alert.amount:>10.2f}  usual ${alert.expected:>9.2f}  "
+            f"{alert.zscore:>4.1f}σ  {detail}"
+        )
+    return 0
+
+def show_forecast(argv):
+    """Run ``budgt forecast``: project account balances forward."""
+    import argparse
+    import json
+    from datetime import timedelta
+    from . import database
+    from .database import init_db
+    from .forecast import forecast, to_json
+
+    parser = argparse.ArgumentParser(
+        prog="budgt forecast",
+        description="Project each account's balance from recurring flows and average spend.",
+    )
+    parser.add_argument("--days", type=int, default=30, help="days to project (default: 30)")
+    parser.add_argument("--json", action="store_true", help="print the daily projection as JSON")
+    options = parser.parse_args(argv)
+    if options.days < 1:
+        parser.error("--days must be at least 1")
+
+    init_db()
+    db = database.SessionLocal()
+    try:
+        result = forecast(db, options.days)
+    finally:
+        db.close()
+
+    data = to_json(result)
+    if options.json:
+        json.dump(data, sys.stdout, indent=2)
+        print()
+        return 0
+
+    end = result.start + timedelta(days=result.days - 1)
+    print(f"Forecast through {end} ({result.days} days)")
+    for account in data["accounts"]:
+        print(
+            f"  {account['name']:<20} ${account['balance']:>11.2f} -> ${account['projected']:>11.2f}"
+            f"   lowest ${account['lowest']:.2f} on {account['lowest_date']}"
+        )
+    return 0
+
+def _read_connection(config):
+    """Open a plain SQLite connection for a read-only command.
+
+    The ORM is only imported when the database still has to be created or
+    migrated; afterwards the read runs on ``sqlite3`` alone.
+    """
+    from . import queries
+
+    connection = queries.connect(config)
+    if connection is None:
+        from . import database
+
+        database.configure(config)
+        database.init_db()
+        connection = queries.connect(config)
+    if connection is None:
+        print("budgt: this command needs a database file, not :memory:", file=sys.stderr)
+    return connection
+
+def _day(value):
+    """argparse type for YYYY-MM-DD dates."""
+    import argparse
+    from datetime import date
+
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YYYY-MM-DD, got {value!r}")
+
+def show_balance(config, argv):
+    """Run ``budgt balance``: print every account balance and the total."""
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(prog="budgt balance", description="Show account balances.")
+    parser.add_argument("--json", action="store_true", help="print the balances as JSON")
+    options = parser.parse_args(argv)
+
+    connection = _read_connection(config)
+    if connection is None:
+        return 1
+    try:
+        from . import queries
+
+        accounts = queries.balances(connection)
+    finally:
+        connection.close()
+
+    if any(account.balance is None for account in accounts):
+        # Accounts created before balances were materialized: backfill them
+        from . import database
+        from .balances import AccountBalanceStore
+
+        database.configure(config)
+        db = database.SessionLocal()
+        try:
+            accounts = [
+                (
+                    account.account_id,
+                    account.name,
+                    account.account_type.name if account.account_type else "",
+                    account.balance,
+                )
+                for account in AccountBalanceStore.read(db)
+            ]
+        finally:
+            db.close()
+
+    total = sum(account[3] for account in accounts)
+    if options.json:
+        data = {
+            "accounts": [
+                {"id": id, "name": name, "type": account_type, "balance": round(balance, 2)}
+                for id, name, account_type, balance in accounts
+            ],
+            "total": round(total, 2),
+        }
+        json.dump(data, sys.stdout, indent=2)
+        print()
+        return 0
+
+    if not accounts:
+        print("No accounts yet. Add one with 'a' in the app.")
+        return 0
+    for _, name, account_type, balance in accounts:
+        label = account_type.replace("_", " ").title() if account_type else ""
+        print(f"{name:<24} {label:<14} ${balance:>12.2f}")
+    print(f"{'Total':<39} ${total:>12.2f}")
+    return 0
+
+def add_transaction(config, argv):
+    """Run ``budgt add``: record one income or expense."""
+    import argparse
+    from datetime import datetime
+
+    parser = argparse.ArgumentParser(prog="budgt add", description="Record an income or expense.")
+    parser.add_argument("amount", type=float, help="amount, always positive")
+    parser.add_argument("description", help="what the transaction was for")
+    parser.add_argument("--account", required=True, help="name of the account")
+    parser.add_argument("--type", choices=("expense", "income"), default="expense",
+                        help="transaction type (default: expense)")
+    parser.add_argument("--category", help='category label, e.g. "Food > Groceries"')
+    parser.add_argument("--date", type=_day, help="day of the transaction (default: now)")
+    options = parser.parse_args(argv)
+
+    description = options.description.strip()
+    if not description:
+        parser.error("description is required")
+    if len(description) > 200:
+        parser.error("description too long (200 char max)")
+    if options.amount <= 0:
+        parser.error("amount must be greater than zero")
+    if options.amount > 999999999:
+        parser.error("amount too large (max $999M)")
+
+    # Writes keep balances, rollups and anomaly statistics in step, so they
+    # go through the same ORM path as the add-transaction modal
+    from . import anomalies, categories, database, rollups
+    from .balances import AccountBalanceStore
+    from .database import Account, Transaction, TransactionType
+
+    database.configure(config)
+    database.init_db()
+    transaction_type = TransactionType[options.type.upper()]
+    db = database.SessionLocal()
+    try:
+        account = db.query(Account).filter(Account.name == options.account).first()
+        if account is None:
+            print(f"budgt add: unknown account: {options.account}", file=sys.stderr)
+            return 1
+        new_transaction = Transaction(
+            transaction_type=transaction_type,
+            account_id=account.id,
+            description=description,
+            amount=options.amount,
+            category=options.category,
+            category_id=categories.resolve(db, options.category),
+        )
+        if options.date:
+            new_transaction.date = datetime.combine(options.date, datetime.min.time())
+        db.add(new_transaction)
+        db.flush()
+
+        delta = options.amount if transaction_type == TransactionType.INCOME else -options.amount
+        AccountBalanceStore.apply(db, account.id, delta)
+        rollups.record(db, [rollups.entry_for(new_transaction)])
+        anomalies.record(db, [anomalies.observation_for(new_transaction)])
+        db.commit()
+        balance = AccountBalanceStore.read_accounts(db, [account.id])[0].balance
+    finally:
+        db.close()
+
+    print(f"Added {options.type} of ${options.amount:.2f} to {options.account} (balance ${balance:.2f})")
+    return 0
+
+def _signed_amount(row):
+    """Amount of a ``TransactionRow`` as it affects its account.
+
+    A transfer without a direction counts as 0, as in the balance query.
+    """
+    amount = row.amount or 0.0
+    if row.transaction_type == "INCOME":
+        return amount
+    if row.transaction_type == "TRANSFER":
+        return amount * (row.transfer_direction or 0)
+    return -amount
+
+def list_transactions(config, argv):
+    """Run ``budgt list``: print the newest transactions."""
+    import argparse
+    import json
+    from datetime import timedelta
+
+    parser = argparse.ArgumentParser(prog="budgt list", description="List recent transactions, newest first.")
+    parser.add_argument("-n", "--limit", type=int, default=20, help="rows to show (default: 20)")
+    parser.add_argument("--account", help="only list this account")
+    parser.add_argument("--from", dest="start", type=_day, help="first day to include (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="end", type=_day, help="last day to include (YYYY-MM-DD)")
+    parser.add_argument("--json", action="store_true", help="print one JSON object per line")
+    options = parser.parse_args(argv)
+    if options.limit < 1:
+        parser.error("--limit must be at least 1")
+    end = options.end + timedelta(days=1) if options.end else None
+
+    connection = _read_connection(config)
+    if connection is None:
+        return 1
+    try:
+        from . import queries
+
+        rows = queries.transactions(connection, options.limit, options.account, options.start, end)
+    finally:
+        connection.close()
+
+    for row in rows:
+        if options.json:
+            json.dump(
+                {
+                    "id": row.id,
+                    "date": row.date[:10],
+                    "type": row.transaction_type.lower(),
+                    "amount": round(_signed_amount(row), 2),
+                    "account": row.account_name,
+                    "category": row.category,
+                    "description": row.description,
+                },
+                sys.stdout,
+            )
+            print()
+        else:
+            print(
+                f"{row.date[:10]}  {_signed_amount(row):>+11.2f}  {(row.account_name or ''):<16.16} "
+                f"{(row.category or ''):<24.24} {row.description or ''}"
+            )
+    if not rows and not options.json:
+        print("No transactions found.")
+    return 0
+
+def show_report(config, argv):
+    """Run ``budgt report``: income and spending per category by month."""
+    import argparse
+    import json
+    from datetime import date
+
+    def month(value):
+        try:
+            return date.fromisoformat(value + "-01")
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"expected YYYY-MM, got {value!r}")
+
+    parser = argparse.ArgumentParser(
+        prog="budgt report",
+        description="Summarize income and spending per category for one or more months.",
+    )
+    parser.add_argument("--month", type=month, help="last month to include (YYYY-MM, default: this month)")
+    parser.add_argument("--months", type=int, default=1, help="number of months to cover (default: 1)")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    options = parser.parse_args(argv)
+    if options.months < 1:
+        parser.error("--months must be at least 1")
+
+    last = options.month or date.today().replace(day=1)
+    index = last.year * 12 + last.month - 1
+    first = date((index - options.months + 1) // 12, (index - options.months + 1) % 12 + 1, 1)
+    end = date((index + 1) // 12, (index + 1) % 12 + 1, 1)
+
+    connection = _read_connection(config)
+    if connection is None:
+        return 1
+    try:
+        from . import queries
+
+        rows = queries.report(connection, first, end)
+    finally:
+        connection.close()
+
+    income = sum(row.total for row in rows if row.transaction_type == "INCOME")
+    expenses = sum(row.total for row in rows if row.transaction_type == "EXPENSE")
+    period = f"{first:%Y-%m}" if first == last else f"{first:%Y-%m} to {last:%Y-%m}"
+    if options.json:
+        data = {
+            "from": first.isoformat(),
+            "to": last.isoformat(),
+            "income": round(income, 2),
+            "expenses": round(expenses, 2),
+            "net": round(income - expenses, 2),
+            "categories": [
+                {
+                    "type": row.transaction_type.lower(),
+                    "category": row.category,
+                    "total": round(row.total, 2),
+                    "count": row.count,
+                }
+                for row in rows
+            ],
+        }
+        json.dump(data, sys.stdout, indent=2)
+        print()
+        return 0
+
+    print(f"Report for {period}")
+    print(f"  Income     ${income:>12.2f}")
+    print(f"  Expenses   ${expenses:>12.2f}")
+    print(f"  Net        ${income - expenses:>12.2f}")
+    for heading, transaction_type in (("Spending by category", "EXPENSE"), ("Income by category", "INCOME")):
+        lines = [row for row in rows if row.transaction_type == transaction_type]
+        if not lines:
+            continue
+        total = expenses if transaction_type == "EXPENSE" else income
+        print(f"\n{heading}:")
+        for row in lines:
+            share = row.total / total * 100 if total else 0.0
+            print(f"  {(row.category or 'Uncategorized'):<32.32} ${row.total:>11.2f} {share:>5.1f}%  ({row.count})")
+    return 0
+
+def _positive(value):
+    """argparse type for counts that must be at least 1."""
+    import argparse
+
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"expected a positive number, got {value!r}")
+    return number
+
+def generate_ledger(argv):
+    """Run ``budgt generate``: fill an empty database with synthetic data."""
+    import argparse
+    from . import database, synthetic
+    from .bench import parse_size
+
+    parser = argparse.ArgumentParser(
+        prog="budgt generate",
+        description="Write a seeded synthetic ledger into an empty database (use with --db).",
+    )
+    parser.add_argument("--rows", type=parse_size, default=10000,
+                        help="transactions to generate, e.g. 5000, 100k or 1m (default: 10000)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed (default: 0)")
+    parser.add_argument("--years", type=float, default=synthetic.YEARS,
+                        help=f"longest history to generate (default: {synthetic.YEARS})")
+    options = parser.parse_args(argv)
+
+    database.init_db()
+    db = database.SessionLocal()
+    started = time.perf_counter()
+    try:
+        ledger = synthetic.generate(db, options.rows, options.seed, options.years)
+    except ValueError as e:
+        print(f"budgt generate: {e}", file=sys.stderr)
+        return 1
+    finally:
+        db.close()
+    print(
+        f"Generated {ledger.rows:,} transaction(s) in {ledger.accounts} accounts "
+        f"from {ledger.start} to {ledger.end} in {time.perf_counter() - started:.2f}s"
+    )
+    return 0
+
+def run_bench(argv):
+    """Run ``budgt bench``: time the main operations on synthetic ledgers."""
+    import argparse
+    import json
+    from . import bench
+
+    def sizes(value):
+        try:
+            return [bench.parse_size(size) for size in value.split(",")]
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"expected sizes like 1000,100k,1m, got {value!r}")
+
+    parser = argparse.ArgumentParser(
+        prog="budgt bench",
+        description="Benchmark refresh, insights, import and export on synthetic ledgers.",
+    )
+    parser.add_argument("--sizes", type=sizes, default=list(bench.SIZES),
+                        help="comma-separated ledger sizes (default: 1000,10000,100000)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed of the ledgers (default: 0)")
+    parser.add_argument("--repeat", type=int, default=bench.REPEAT,
+                        help=f"runs per repeated timing; the fastest counts (default: {bench.REPEAT})")
+    parser.add_argument("--import-rows", type=_positive, default=bench.IMPORT_ROWS,
+                        help=f"rows in the imported statement (default: {bench.IMPORT_ROWS})")
+    parser.add_argument("--end", type=_day, default=bench.END_DATE,
+                        help=f"last day of the generated ledgers (default: {bench.END_DATE})")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.add_argument("-o", "--output", help="also save the JSON report to this file")
+    parser.add_argument("--compare", metavar="FILE", help="show changes against an earlier JSON report")
+    parser.add_argument("--keep", metavar="DIR", help="keep the generated databases in DIR")
+    options = parser.parse_args(argv)
+    if options.repeat < 1:
+        parser.error("--repeat must be at least 1")
+
+    baseline = None
+    if options.compare:
+        try:
+            with open(options.compare, encoding="utf-8") as file:
+                baseline = json.load(file)
+        except (OSError, ValueError) as e:
+            print(f"budgt bench: cannot read {options.compare}: {e}", file=sys.stderr)
+            return 1
+
+    report = bench.run(
+        options.sizes,
+        options.seed,
+        options.repeat,
+        options.import_rows,
+        options.keep,
+        progress=lambda message: print(message, file=sys.stderr),
+        end=options.end,
+    )
+    if options.output:
+        with open(options.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+            file.write("\n")
+    if options.json:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        print(bench.format_report(report, baseline))
+    return 0
+
+# Commands that take the resolved storage config instead of the configured
+# engine; the read-only ones never import SQLAlchemy on a current database
+CONFIG_COMMANDS = {
+    "balance": show_balance,
+    "add": add_transaction,
+    "list": list_transactions,
+    "report": show_report,
+}
+
+# Every subcommand, in the order of the help text; anything else is a typo
+# and must not fall through to the TUI
+COMMANDS = (
+    "rebuild-balances", "rebuild-rollups", "rebuild-alerts", "alerts",
+    "forecast", "balance", "add", "list", "report", "db info", "import",
+    "export", "generate", "bench",
+)
+
+def unknown_command(args):
+    """Report an unrecognised subcommand and list the known ones."""
+    name = " ".join(args[:2]) if args[0] == "db" else args[0]
+    print(f"budgt: unknown command: {name}", file=sys.stderr)
+    print(f"Commands: {', '.join(COMMANDS)}", file=sys.stderr)
+    print("Run budgt --help for details.", file=sys.stderr)
+    return 2
+
+# Readable names for pragmas that SQLite reports as numbers
+PRAGMA_NAMES = {
+    "synchronous": {0: "OFF", 1: "NORMAL", 2: "FULL", 3: "EXTRA"},
+    "temp_store": {0: "DEFAULT", 1: "FILE", 2: "MEMORY"},
+}
+
+def db_info():
+    """Print the effective storage settings and database file statistics."""
+    from . import database
+    from .database import init_db
+
+    init_db()
+    config = database.storage_config
+    print(f"Database:        {os.path.abspath(config.path)}")
+    print(f"Config file:     {config.source or 'none (defaults and environment)'}")
+
+    with database.engine.connect() as connection:
+        def pragma(name):
+            return connection.exec_driver_sql(f"PRAGMA {name}").scalar()
+
+        print("\nPragmas (effective):")
+        for name in config.pragmas:
+            value = pragma(name)
+            value = PRAGMA_NAMES.get(name, {}).get(value, value)
+            print(f"  {name:<18} {value}")
+
+        page_size = pragma("page_size")
+        page_count = pragma("page_count")
+        print("\nDatabase:")
+        print(f"  schema version     {pragma('user_version')}")
+        print(f"  page_size          {page_size}")
+        print(f"  page_count         {page_count}")
+        print(f"  freelist_count     {pragma('freelist_count')}")
+        for table in ("accounts", "transactions"):
+            count = connection.exec_driver_sql(f"SELECT COUNT(*) FROM {table}").scalar()
+            print(f"  {table + ' rows':<18} {count}")
+
+    print("\nFiles:")
+    for suffix in ("", "-wal", "-shm"):
+        path = config.path + suffix
+        if os.path.exists(path):
+            print(f"  {os.path.basename(path):<20} {os.path.getsize(path):>12,} bytes")
+    columns = os.path.abspath(config.path) + "-columns"
+    if os.path.isdir(columns):
+        size = sum(entry.stat().st_size for entry in os.scandir(columns) if entry.is_file())
+        print(f"  {os.path.basename(columns) + '/':<20} {size:>12,} bytes (column cache)")
+    return 0
+
+def import_statement(argv):
+    """Run ``budgt import``: bulk-load a bank statement into an account."""
+    import argparse
+    from . import database
+    from .database import init_db
+    from .importer import READERS, StatementError, import_file
+
+    parser = argparse.ArgumentParser(
+        prog="budgt import",
+        description="Import a CSV, OFX/QFX or QIF statement into an account.",
+    )
+    parser.add_argument("file", help="statement file to import")
+    parser.add_argument("--account", required=True, help="name of the receiving account")
+    parser.add_argument("--format", choices=sorted(READERS), help="file format (default: from extension)")
+    parser.add_argument("--date-col", help="CSV column holding the date")
+    parser.add_argument("--description-col", help="CSV column holding the description")
+    parser.add_argument("--amount-col", help="CSV column holding the signed amount")
+    parser.add_argument("--debit-col", help="CSV column holding money out")
+    parser.add_argument("--credit-col", help="CSV column holding money in")
+    parser.add_argument("--category-col", help="CSV column holding the category")
+    parser.add_argument("--date-format", help="strptime format of CSV dates, e.g. %%d/%%m/%%Y")
+    parser.add_argument("--delimiter", default=",", help="CSV field delimiter (default: ,)")
+    options = parser.parse_args(argv)
+
+    csv_options = {}
+    if (options.format or options.file.rsplit(".", 1)[-1].lower()) == "csv":
+        csv_options = {
+            "mapping": {
+                "date": options.date_col,
+                "description": options.description_col,
+                "amount": options.amount_col,
+                "debit": options.debit_col,
+                "credit": options.credit_col,
+                "category": options.category_col,
+            },
+            "date_format": options.date_format,
+            "delimiter": options.delimiter,
+        }
+
+    init_db()
+    db = database.SessionLocal()
+    started = time.perf_counter()
+    try:
+        result = import_file(db, options.file, options.account, options.format, **csv_options)
+    except (StatementError, OSError) as e:
+        print(f"budgt import: {e}", file=sys.stderr)
+        return 1
+    finally:
+        db.close()
+    elapsed = time.perf_counter() - started
+
+    print(f"Imported {result.inserted} transaction(s) into {options.account} in {elapsed:.2f}s")
+    if result.duplicates:
+        print(f"Skipped {result.duplicates} duplicate(s) already in the database")
+    if result.invalid:
+        print(f"Skipped {result.invalid} invalid record(s):")
+        for error in result.errors:
+            print(f"  {error}")
+        if result.invalid > len(result.errors):
+            print(f"  ... and {result.invalid - len(result.errors)} more")
+    return 0
+
+def export_data(argv):
+    """Run ``budgt export``: stream transactions or a report to a file."""
+    import argparse
+    from datetime import datetime, timedelta
+    from . import database
+    from .database import Account, init_db
+    from .exporter import FORMATS, REPORTS, export
+
+    def day(value):
+        try:
+            return datetime.strptime(value, "%Y-%m-%d")
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"expected YYYY-MM-DD, got {value!r}")
+
+    parser = argparse.ArgumentParser(
+        prog="budgt export",
+        description="Export transactions or a monthly report as CSV, JSON Lines or NumPy columns.",
+    )
+    parser.add_argument("-o", "--output", default="-",
+                        help="destination file, or - for standard output (default)")
+    parser.add_argument("--format", choices=FORMATS, help="output format (default: from extension, else csv)")
+    parser.add_argument("--report", choices=REPORTS, default="transactions", help="what to export")
+    parser.add_argument("--from", dest="start", type=day, help="first day to include (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="end", type=day, help="last day to include (YYYY-MM-DD)")
+    parser.add_argument("--account", action="append", default=[],
+                        help="only export this account (repeatable)")
+    options = parser.parse_args(argv)
+
+    file_format = options.format
+    if file_format is None:
+        extension = options.output.rsplit(".", 1)[-1].lower()
+        file_format = extension if extension in FORMATS else "csv"
+    if file_format == "npz" and options.output == "-":
+        parser.error("the npz format needs an --output file")
+    end = options.end + timedelta(days=1) if options.end else None
+
+    init_db()
+    db = database.SessionLocal()
+    try:
+        account_ids = None
+        if options.account:
+            found = dict(db.query(Account.name, Account.id).filter(Account.name.in_(options.account)))
+            missing = [name for name in options.account if name not in found]
+            if missing:
+                print(f"budgt export: unknown account(s): {', '.join(missing)}", file=sys.stderr)
+                return 1
+            account_ids = list(found.values())
+
+        kwargs = dict(report=options.report, start=options.start, end=end, account_ids=account_ids)
+        if file_format == "npz":
+            count = export(db, options.output, file_format, **kwargs)
+        elif options.output == "-":
+            count = export(db, sys.stdout, file_format, **kwargs)
+        else:
+            with open(options.output, "w", newline="", encoding="utf-8") as file:
+                count = export(db, file, file_format, **kwargs)
+    except (ValueError, RuntimeError, OSError) as e:
+        print(f"budgt export: {e}", file=sys.stderr)
+        return 1
+    finally:
+        db.close()
+
+    if options.output != "-":
+        print(f"Exported {count} row(s) to {options.output}")
+    return 0
+
 def main():
     """Main entry point for the Budgt.sh application."""
+    started = time.perf_counter()
+    args = sys.argv[1:]
+    startup_trace = "--startup-trace" in args
+    if startup_trace:
+        args.remove("--startup-trace")
+    try:
+        db_path = _pop_option(args, "--db")
+        config = load_config(db_path)
+    except ValueError as e:
+        print(f"budgt: {e}", file=sys.stderr)
+        sys.exit(2)
+    
     # Handle command line arguments
-    if len(sys.argv) > 1:
-        if sys.argv[1] in ['--version', '-v']:
+    if args:
+        if args[0] in ['--version', '-v']:
             print(f"Budgt.sh v{__version__}")
             return
-        elif sys.argv[1] in ['--help', '-h']:
+        elif args[0] in ['--help', '-h']:
             print(f"""Budgt.sh v{__version__}
 A modern Terminal User Interface (TUI) application for tracking personal expenses and budgeting.
 
 Usage:
     budgt              Start the application
+    budgt rebuild-balances
+                       Recompute account balances and report drift
+    budgt rebuild-rollups
+                       Recompute the daily and monthly summary tables
+    budgt rebuild-alerts
+                       Replay history through the spending anomaly detector
+    budgt alerts [--days N]
+                       List spending anomalies from the last N days
+    budgt forecast [--days N] [--json]
+                       Project account balances N days ahead (default 30)
+    budgt balance [--json]
+                       Show account balances and the total
+    budgt add AMOUNT DESCRIPTION --account NAME [--type income]
+                       Record an expense (or income), optionally with
+                       --category LABEL and --date YYYY-MM-DD
+    budgt list [-n N] [--account NAME] [--from DAY] [--to DAY] [--json]
+                       List the newest transactions
+    budgt report [--month YYYY-MM] [--months N] [--json]
+                       Income and spending per category by month
+    budgt db info      Show storage settings and database file statistics
+    budgt import FILE --account NAME
+                       Import a CSV, OFX/QFX or QIF statement
+                       (see budgt import --help for CSV column options)
+    budgt export [-o FILE] [--format csv|jsonl|npz]
+                       Stream transactions (or --report monthly) to a file,
+                       filtered with --from, --to and --account
+    budgt generate [--rows N] [--seed S]
+                       Fill an empty database with a synthetic ledger
+    budgt bench [--sizes 1000,100k] [--json] [-o FILE] [--compare FILE]
+                       Time refresh, insights, import and export on
+                       synthetic ledgers
     budgt --version    Show version information
     budgt --help       Show this help message
 
+Options:
+    --db PATH          Use the database at PATH (overrides BUDGT_DB and the
+                       config file)
+    --startup-trace    Print how long each startup phase took on exit
+
+Storage settings are read from ~/.config/budgt/config.yaml (or $BUDGT_CONFIG)
+and BUDGT_DB, BUDGT_JOURNAL_MODE, BUDGT_SYNCHRONOUS, BUDGT_CACHE_SIZE,
+BUDGT_MMAP_SIZE, BUDGT_TEMP_STORE and BUDGT_BUSY_TIMEOUT.
+
+BUDGT_PROFILE=1 records timing spans and SQL statistics for the whole run to
+<database>-profile.jsonl (or $BUDGT_PROFILE_FILE).
+
 Keyboard Shortcuts (when running):
     a         Add new account
     t         Add new transaction  
     Shift+T   Transfer money between accounts
     Ctrl+T    Toggle theme
+    w         Cycle insights window (7/30/90/365 days)
+    p         Show or hide the profiler overlay (records while shown)
     q         Quit application
 
 For more information, visit: https://github.com/yourusername/budgt.sh
 """)
             return
+        elif args[0] in CONFIG_COMMANDS:
+            sys.exit(CONFIG_COMMANDS[args[0]](config, args[1:]))
+
+    from .startup import trace
+    if startup_trace:
+        trace.enable(started)
+    from . import database
+    database.configure(config)
+    trace.mark("configure")
+
+    if args:
+        if args[0] == 'rebuild-balances':
+            sys.exit(rebuild_balances())
+        elif args[0] == 'rebuild-rollups':
+            sys.exit(rebuild_rollups())
+        elif args[0] == 'rebuild-alerts':
+            sys.exit(rebuild_alerts())
+        elif args[0] == 'alerts':
+            sys.exit(show_alerts(args[1:]))
+        elif args[0] == 'forecast':
+            sys.exit(show_forecast(args[1:]))
+        elif args[0] == 'import':
+            sys.exit(import_statement(args[1:]))
+        elif args[0] == 'export':
+            sys.exit(export_data(args[1:]))
+        elif args[0] == 'generate':
+            sys.exit(generate_ledger(args[1:]))
+        elif args[0] == 'bench':
+            sys.exit(run_bench(args[1:]))
+        elif args[:2] == ['db', 'info']:
+            sys.exit(db_info())
+        else:
+            sys.exit(unknown_command(args))
     
     # Initialize database and run app
-    init_db()
+    from .tui import ExpenseApp
+    trace.mark("import ui")
+    from .profiling import profiler, requested, trace_path
+    if requested():
+        profiler.enable(trace_path(config))
+    database.init_db()
     app = ExpenseApp()
     app.run()
+    if profiler.path:
+        print(f"Profile written to {profiler.path}", file=sys.stderr)
+        profiler.close()
+    if startup_trace:
+        trace.report()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,272 @@
+"""Account balance service for Budgt.sh.
+
+Balances are kept in the materialized ``account_balances`` table, which every
+write updates inside its own DB transaction, so reading them is O(accounts)
+regardless of history size. ``AccountBalanceService`` recomputes the same
+figures from ``transactions`` in a single grouped query and is used to
+backfill and verify the materialized table.
+"""
+
+import datetime
+from collections import namedtuple
+
+from sqlalchemy import case, func, select, update
+
+from .database import (
+    Account,
+    AccountBalanceRecord,
+    Transaction,
+    TransactionType,
+)
+
+# Differences below half a cent are float noise, not drift
+DRIFT_TOLERANCE = 0.005
+
+
+AccountBalance = namedtuple(
+    "AccountBalance", ["account_id", "name", "account_type", "balance"]
+)
+
+
+class BalanceSummary:
+    """Compact result consumed by the accounts table and the total header."""
+
+    def __init__(self, accounts):
+        self.accounts = accounts
+        self.total = sum(account.balance for account in accounts)
+
+    def __iter__(self):
+        return iter(self.accounts)
+
+    def __len__(self):
+        return len(self.accounts)
+
+
+class AccountBalanceService:
+    """Computes account balances directly in SQL."""
+
+    @staticmethod
+    def net_change_query():
+        """Build the grouped query returning (account_id, net) per account.
+
+        Income adds to the balance, expenses subtract from it, and transfers
+        count with the sign stored in ``transfer_direction``. The query reads
+        only the ``ix_transactions_account_balance`` covering index.
+
+        Returns:
+            Select: SQLAlchemy select grouped by ``account_id``
+        """
+        signed_amount = case(
+            (Transaction.transaction_type == TransactionType.INCOME, Transaction.amount),
+            (Transaction.transaction_type == TransactionType.EXPENSE, -Transaction.amount),
+            (
+                Transaction.transaction_type == TransactionType.TRANSFER,
+                Transaction.amount * func.coalesce(Transaction.transfer_direction, 0),
+            ),
+            else_=0.0,
+        )
+        return (
+            select(
+                Transaction.account_id.label("account_id"),
+                func.sum(signed_amount).label("net"),
+            )
+            .group_by(Transaction.account_id)
+        )
+
+    @staticmethod
+    def compute(db):
+        """Compute the balance of every account in one statement.
+
+        Args:
+            db (Session): Open database session
+
+        Returns:
+            BalanceSummary: Per-account balances plus the overall total
+        """
+        net = AccountBalanceService.net_change_query().subquery()
+        rows = db.execute(
+            select(
+                Account.id,
+                Account.name,
+                Account.account_type,
+                Account.starting_balance,
+                func.coalesce(net.c.net, 0.0),
+            )
+            .outerjoin(net, net.c.account_id == Account.id)
+            .order_by(Account.id)
+        ).all()
+
+        accounts = []
+        for account_id, name, account_type, starting_balance, net_change in rows:
+            accounts.append(
+                AccountBalance(
+                    account_id,
+                    name,
+                    account_type,
+                    (starting_balance or 0.0) + (net_change or 0.0),
+                )
+            )
+        return BalanceSummary(accounts)
+
+
+BalanceDrift = namedtuple("BalanceDrift", ["account_id", "name", "stored", "actual"])
+
+
+class AccountBalanceStore:
+    """Reads and maintains the materialized ``account_balances`` table."""
+
+    @staticmethod
+    def open_account(db, account):
+        """Create the balance row for a freshly added account.
+
+        Args:
+            db (Session): Session the account was added in (not yet committed)
+            account (Account): Flushed account with an assigned id
+        """
+        db.add(
+            AccountBalanceRecord(
+                account_id=account.id,
+                balance=account.starting_balance or 0.0,
+            )
+        )
+
+    @staticmethod
+    def apply(db, account_id, delta):
+        """Add ``delta`` to an account balance inside the caller's transaction.
+
+        Args:
+            db (Session): Session holding the write (flushed, not committed)
+            account_id (int): Account whose balance changed
+            delta (float): Signed change to apply
+        """
+        result = db.execute(
+            update(AccountBalanceRecord)
+            .where(AccountBalanceRecord.account_id == account_id)
+            .values(
+                balance=AccountBalanceRecord.balance + delta,
+                updated_at=datetime.datetime.utcnow(),
+            )
+        )
+        if result.rowcount == 0:
+            # No materialized row yet (e.g. a database created before the
+            # table existed): seed it from history, which already includes
+            # the flushed write.
+            AccountBalanceStore._backfill(db, [account_id])
+
+    @staticmethod
+    def read_accounts(db, account_ids):
+        """Read the materialized balances of just ``account_ids``.
+
+        Args:
+            db (Session): Open database session
+            account_ids (list): Accounts to read
+
+        Returns:
+            list: ``AccountBalance`` tuples ordered by account id
+        """
+        rows = db.execute(
+            select(
+                Account.id,
+                Account.name,
+                Account.account_type,
+                AccountBalanceRecord.balance,
+            )
+            .join(
+                AccountBalanceRecord,
+                AccountBalanceRecord.account_id == Account.id,
+            )
+            .where(Account.id.in_(account_ids))
+            .order_by(Account.id)
+        ).all()
+        return [AccountBalance(*row) for row in rows]
+
+    @staticmethod
+    def read(db):
+        """Read all balances from the materialized table.
+
+        Accounts without a materialized row are backfilled first.
+
+        Args:
+            db (Session): Open database session
+
+        Returns:
+            BalanceSummary: Per-account balances plus the overall total
+        """
+        rows = db.execute(
+            select(
+                Account.id,
+                Account.name,
+                Account.account_type,
+                AccountBalanceRecord.balance,
+            )
+            .outerjoin(
+                AccountBalanceRecord,
+                AccountBalanceRecord.account_id == Account.id,
+            )
+            .order_by(Account.id)
+        ).all()
+
+        missing = [row[0] for row in rows if row[3] is None]
+        if missing:
+            AccountBalanceStore._backfill(db, missing)
+            db.commit()
+            return AccountBalanceStore.read(db)
+
+        return BalanceSummary([AccountBalance(*row) for row in rows])
+
+    @staticmethod
+    def rebuild(db):
+        """Recompute every balance from scratch and repair any drift.
+
+        Args:
+            db (Session): Open database session; committed on return
+
+        Returns:
+            list: ``BalanceDrift`` entries for accounts whose stored balance
+            differed from the recomputed one (or had no stored row)
+        """
+        stored = dict(
+            db.execute(
+                select(AccountBalanceRecord.account_id, AccountBalanceRecord.balance)
+            ).all()
+        )
+        drift = []
+        now = datetime.datetime.utcnow()
+        for account in AccountBalanceService.compute(db):
+            current = stored.get(account.account_id)
+            if current is None:
+                db.add(
+                    AccountBalanceRecord(
+                        account_id=account.account_id,
+                        balance=account.balance,
+                        updated_at=now,
+                    )
+                )
+            elif abs(current - account.balance) > DRIFT_TOLERANCE:
+                db.execute(
+                    update(AccountBalanceRecord)
+                    .where(AccountBalanceRecord.account_id == account.account_id)
+                    .values(balance=account.balance, updated_at=now)
+                )
+            else:
+                continue
+            drift.append(
+                BalanceDrift(account.account_id, account.name, current, account.balance)
+            )
+        db.commit()
+        return drift
+
+    @staticmethod
+    def _backfill(db, account_ids):
+        """Insert materialized rows for ``account_ids`` computed from history."""
+        now = datetime.datetime.utcnow()
+        wanted = set(account_ids)
+        for account in AccountBalanceService.compute(db):
+            if account.account_id in wanted:
+                db.merge(
+                    AccountBalanceRecord(
+                        account_id=account.account_id,
+                        balance=account.balance,
+                        updated_at=now,
+                    )
+                )
@@ -0,0 +1,312 @@
+"""Headless performance benchmark behind ``budgt bench``.
+
+For every requested size a synthetic ledger (``budgt.synthetic``) is written
+to a fresh database in a scratch directory, and the operations users wait on
+are timed there:
+
+- ``generate``: writing the ledger and rebuilding its derived tables (setup,
+  reported for reference)
+- ``startup``: mounting ``ExpenseApp`` headlessly until the first snapshot
+  fills the tables
+- ``refresh``: ``ExpenseApp.refresh_data`` until the tables are repopulated
+- ``insights_first``: the first ``InsightsGenerator.generate_insights`` call,
+  which also builds the on-disk column cache
+- ``insights``: later calls, with the in-memory caches cleared each time
+- ``insights_cached``: ``generate_cached`` while the data is unchanged
+- ``import``: importing a CSV statement of ``import_rows`` rows
+- ``export_csv`` / ``export_monthly``: every transaction, and the monthly
+  report, exported as CSV
+
+Every ledger ends on the same fixed day (``END_DATE`` unless another is
+given), so a size and seed always yield the same rows whenever the benchmark
+runs; the day is stored in the report. Databases left in the directory by an
+earlier run are replaced.
+
+Repeated timings keep the fastest run, which filters out scheduling noise.
+Reports are plain dicts, so they can be saved as JSON and compared with a
+later run through ``compare``.
+"""
+
+import asyncio
+import os
+import platform
+import shutil
+import tempfile
+import time
+from datetime import date, datetime
+
+from . import __version__
+
+# Ledger sizes benchmarked by default
+SIZES = (1000, 10000, 100000)
+REPEAT = 3
+IMPORT_ROWS = 5000
+# Last day of every generated ledger and statement
+END_DATE = date(2026, 6, 30)
+# Headless terminal size, wide enough for the full insights layout
+SCREEN_SIZE = (160, 50)
+# Seconds to wait for the app before giving up
+APP_TIMEOUT = 300
+
+METRICS = (
+    "generate",
+    "startup",
+    "refresh",
+    "insights_first",
+    "insights",
+    "insights_cached",
+    "import",
+    "export_csv",
+    "export_monthly",
+)
+
+# Relative slowdown flagged by ``format_report`` when comparing runs
+REGRESSION_THRESHOLD = 0.1
+
+_SUFFIXES = {"k": 1000, "m": 1000000}
+
+
+def parse_size(text):
+    """Parse ``"5000"``, ``"100k"`` or ``"10m"`` into a row count.
+
+    Raises:
+        ValueError: If ``text`` is not a positive size
+    """
+    text = text.strip().lower().replace("_", "")
+    factor = _SUFFIXES.get(text[-1:], 1)
+    if factor != 1:
+        text = text[:-1]
+    size = int(float(text) * factor)
+    if size < 1:
+        raise ValueError(f"size must be positive, got {text!r}")
+    return size
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 2)
+
+
+def _best(func, repeat):
+    """Fastest of ``repeat`` calls to ``func``, in seconds."""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+async def _until(condition):
+    deadline = time.perf_counter() + APP_TIMEOUT
+    while not condition():
+        if time.perf_counter() > deadline:
+            raise RuntimeError("the app did not finish loading in time")
+        await asyncio.sleep(0.001)
+
+
+async def _app_timings(repeat):
+    """Time the headless app's first snapshot and later refreshes."""
+    from textual.widgets import Static
+
+    from .tui import ExpenseApp
+
+    started = time.perf_counter()
+    app = ExpenseApp()
+    async with app.run_test(size=SCREEN_SIZE) as pilot:
+        await _until(lambda: app._data_generation and not app._refresh_pending)
+        startup = time.perf_counter() - started
+        # Let the first insights land so they do not compete with refreshes
+        display = app.query_one("#insights-display", Static)
+        await _until(lambda: "Loading insights" not in str(display.render()))
+
+        refresh = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            app.refresh_data(immediate=True)
+            await _until(lambda: not app._refresh_pending)
+            elapsed = time.perf_counter() - started
+            refresh = elapsed if refresh is None else min(refresh, elapsed)
+
+        # Each refresh also regenerates the insights; let them land before
+        # the app shuts down
+        await app.workers.wait_for_complete()
+        await pilot.pause()
+    return startup, refresh
+
+
+def bench_size(directory, size, seed=0, repeat=REPEAT, import_rows=IMPORT_ROWS, end=END_DATE):
+    """Benchmark one ledger size in ``directory``.
+
+    Args:
+        directory (str): Scratch directory for the database and files
+        size (int): Number of transactions to generate
+        seed (int): Random seed of the ledger
+        repeat (int): Runs per repeated timing
+        import_rows (int): Rows in the imported statement
+        end (date): Last day of the ledger and the statement
+
+    Returns:
+        dict: ``{"rows": ..., "timings_ms": {metric: milliseconds}}``
+    """
+    from . import database, synthetic
+    from .components.insights import InsightsGenerator
+    from .config import StorageConfig
+    from .exporter import export
+    from .importer import import_file
+
+    path = os.path.join(directory, f"bench-{size}.db")
+    _remove_database(path)
+    database.configure(StorageConfig(path))
+    database.init_db()
+    timings = {}
+
+    db = database.SessionLocal()
+    try:
+        started = time.perf_counter()
+        ledger = synthetic.generate(db, size, seed, end=end)
+        timings["generate"] = time.perf_counter() - started
+    finally:
+        db.close()
+
+    startup, refresh = asyncio.run(_app_timings(repeat))
+    timings["startup"] = startup
+    timings["refresh"] = refresh
+
+    cache.clear_all()
+    started = time.perf_counter()
+    InsightsGenerator.generate_insights(30)
+    timings["insights_first"] = time.perf_counter() - started
+
+    def insights():
+        cache.clear_all()
+        InsightsGenerator.generate_insights(30)
+
+    timings["insights"] = _best(insights, repeat)
+    InsightsGenerator.generate_cached(30)
+    timings["insights_cached"] = _best(lambda: InsightsGenerator.generate_cached(30), repeat)
+
+    statement = os.path.join(directory, f"statement-{size}.csv")
+    synthetic.write_statement(statement, import_rows, seed + 1, end=end)
+    db = database.SessionLocal()
+    try:
+        started = time.perf_counter()
+        import_file(db, statement, synthetic.ACCOUNTS[synthetic.CHECKING][0])
+        timings["import"] = time.perf_counter() - started
+
+        with open(os.devnull, "w", newline="") as sink:
+            timings["export_csv"] = _best(lambda: export(db, sink, "csv"), repeat)
+            timings["export_monthly"] = _best(lambda: export(db, sink, "csv", report="monthly"), repeat)
+    finally:
+        db.close()
+
+    return {"rows": ledger.rows, "timings_ms": {name: _ms(timings[name]) for name in METRICS}}
+
+
+def _remove_database(path):
+    """Delete a database left by an earlier run, with its WAL and column cache."""
+    for name in (path, f"{path}-wal", f"{path}-shm", f"{path}-journal"):
+        try:
+            os.remove(name)
+        except FileNotFoundError:
+            pass
+    shutil.rmtree(f"{path}-columns", ignore_errors=True)
+
+
+def run(sizes=SIZES, seed=0, repeat=REPEAT, import_rows=IMPORT_ROWS, directory=None, progress=None, end=END_DATE):
+    """Benchmark every size and return the report.
+
+    Args:
+        sizes (tuple): Ledger sizes, in transactions
+        seed (int): Random seed of the ledgers
+        repeat (int): Runs per repeated timing
+        import_rows (int): Rows in each imported statement
+        directory (str): Where to keep the databases (a temporary directory
+            that is removed afterwards when omitted); databases from an
+            earlier run are replaced
+        progress (callable): Called with a message before each size
+        end (date): Last day of every ledger
+
+    Returns:
+        dict: Report with the environment and one entry per size
+    """
+    from . import database
+
+    previous = database.storage_config
+    scratch = directory or tempfile.mkdtemp(prefix="budgt-bench-")
+    os.makedirs(scratch, exist_ok=True)
+    results = []
+    try:
+        for size in sizes:
+            if progress:
+                progress(f"Benchmarking {size:,} transactions...")
+            results.append(bench_size(scratch, size, seed, repeat, import_rows, end))
+    finally:
+        database.configure(previous)
+        if directory is None:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    return {
+        "budgt": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "end_date": end.isoformat(),
+        "seed": seed,
+        "repeat": repeat,
+        "import_rows": import_rows,
+        "results": results,
+    }
+
+
+def compare(report, baseline):
+    """Pair each timing with the same size and metric in ``baseline``.
+
+    Returns:
+        dict: ``{(rows, metric): (baseline_ms, report_ms)}`` for timings
+        present in both reports
+    """
+    before = {
+        (result["rows"], metric): value
+        for result in baseline.get("results", [])
+        for metric, value in result["timings_ms"].items()
+    }
+    pairs = {}
+    for result in report["results"]:
+        for metric, value in result["timings_ms"].items():
+            key = (result["rows"], metric)
+            if key in before:
+                pairs[key] = (before[key], value)
+    return pairs
+
+
+def format_report(report, baseline=None):
+    """Render a report as a metric x size table.
+
+    With a ``baseline`` each cell also shows the relative change, and
+    slowdowns above ``REGRESSION_THRESHOLD`` are marked with ``!``.
+
+    Returns:
+        str: Table ready to print
+    """
+    pairs = compare(report, baseline) if baseline else {}
+    sizes = [result["rows"] for result in report["results"]]
+    width = 20 if baseline else 11
+    lines = [
+        f"Budgt.sh {report['budgt']} benchmark (Python {report['python']}, "
+        f"seed {report['seed']}, best of {report['repeat']})",
+        f"{'ms':<16}" + "".join(f"{size:>{width},}" for size in sizes),
+    ]
+    for metric in METRICS:
+        cells = []
+        for result in report["results"]:
+            value = result["timings_ms"].get(metric)
+            cell = "-" if value is None else f"{value:.1f}"
+            pair = pairs.get((result["rows"], metric))
+            if pair and pair[0]:
+                change = pair[1] / pair[0] - 1
+                flag = "!" if change > REGRESSION_THRESHOLD else " "
+                cell += f" ({change:+.0%}){flag}"
+            cells.append(f"{cell:>{width}}")
+        lines.append(f"{metric:<16}" + "".join(cells))
+    return "\n".join(lines)
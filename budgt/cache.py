@@ -0,0 +1,107 @@
+"""Caches invalidated by the database data version.
+
+``DataVersion`` returns a token that changes whenever any connection (in this
+process or another one) commits to the database. It is read with SQLite's
+``PRAGMA data_version`` on a dedicated connection, which costs a few
+microseconds, so derived results such as the insights panel can be cached
+under ``(token, ...)`` keys and reused until the data actually changes.
+"""
+
+import threading
+import weakref
+from collections import OrderedDict
+
+from . import database
+
+
+# Every live LRUCache, so clear_all() reaches caches in modules it never imports
+_caches = weakref.WeakSet()
+
+
+class LRUCache:
+    """Thread-safe mapping that evicts the least recently used entry."""
+
+    def __init__(self, maxsize=32):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        _caches.add(self)
+
+    def get(self, key, default=None):
+        """Return the cached value for ``key``, marking it recently used."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        """Store ``value`` under ``key``, evicting the oldest entry if full."""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class DataVersion:
+    """Token identifying the current contents of the database."""
+
+    def __init__(self):
+        self._engine = None
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def current(self):
+        """Return a hashable token that changes after every commit.
+
+        ``PRAGMA data_version`` only moves for commits made by *other*
+        connections, so the token is read on a connection reserved for it
+        that never writes. Reconfiguring the database opens a fresh one.
+        """
+        with self._lock:
+            engine = database.engine
+            if self._connection is None or self._engine is not engine:
+                self._close()
+                self._engine = engine
+                self._connection = engine.connect()
+            version = self._connection.exec_driver_sql("PRAGMA data_version").scalar()
+            # Never hold a read transaction open between calls
+            self._connection.rollback()
+            return (id(engine), version)
+
+    def close(self):
+        """Release the dedicated connection."""
+        with self._lock:
+            self._close()
+
+    def _close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+# Shared by every cache in the process
+data_version = DataVersion()
+
+
+def clear_all():
+    """Empty every ``LRUCache`` in the process.
+
+    Used by the benchmarks and tests to time or check the cold path without
+    reaching into each module's private cache.
+    """
+    for cache in list(_caches):
+        cache.clear()
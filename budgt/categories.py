@@ -0,0 +1,398 @@
+"""Normalized category tree for Budgt.sh.
+
+Categories live in the ``categories`` table (id, parent_id, name, color,
+nature), which ``sync`` keeps in step with ``budgt/categories.yaml`` at
+startup. Transactions reference a row through ``category_id``, so per-category
+and per-parent totals are integer GROUP BYs rather than string matching.
+Totals are read from ``daily_rollups`` (see ``budgt/rollups.py``).
+
+Labels use the ``"Parent > Child"`` form shown in the category picker; labels
+that are not in the YAML (typed by hand or imported from a statement) become
+user-defined categories on first use.
+
+The tree is also precomputed into ``category_closure`` (one row per ancestor
+and descendant pair) and each category's ``effective_nature`` (its own MUST,
+NEED or WANT, else the nearest ancestor's). Subtree and nature totals over any
+date range are then a single indexed query, however deep or wide the tree.
+"""
+
+import datetime
+import hashlib
+import logging
+import os
+
+from sqlalchemy import func, insert, select, text, update
+from sqlalchemy.orm import aliased
+
+from .database import AppState, Category, CategoryClosure, DailyRollup, TransactionType
+from .rollups import UNCATEGORIZED
+
+CATEGORIES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "categories.yaml")
+
+SEPARATOR = " > "
+
+# Spending natures defined per node in categories.yaml
+NATURES = ("MUST", "NEED", "WANT")
+
+# app_state key holding the fingerprint of the last synchronized YAML
+SYNC_KEY = "categories_sha1"
+
+
+def split_label(label):
+    """Split ``"Parent > Child"`` into ``(parent, child)``; child may be None."""
+    parent, _, child = label.partition(SEPARATOR.strip())
+    return parent.strip(), (child.strip() or None)
+
+
+def join_label(parent, child=None):
+    """Inverse of ``split_label``."""
+    return f"{parent}{SEPARATOR}{child}" if child else parent
+
+
+def load_definitions(path=CATEGORIES_FILE):
+    """Read the category tree from YAML, returning [] if it is unavailable."""
+    try:
+        import yaml
+
+        with open(path, "r") as file:
+            return yaml.safe_load(file) or []
+    except (OSError, ImportError) as e:
+        logging.warning("Could not load categories from %s: %s", path, e)
+        return []
+
+
+def sync(connection, definitions=None):
+    """Insert or update category rows to match the YAML tree.
+
+    Rows are matched on ``(parent_id, name)`` so ids stay stable. Categories
+    that only exist in the database are left alone.
+
+    Args:
+        connection: Connection or Session inside a transaction
+        definitions (list): Parsed tree (defaults to ``load_definitions()``)
+
+    Returns:
+        int: Number of rows inserted or updated
+    """
+    if definitions is None:
+        definitions = load_definitions()
+    existing = {
+        (parent_id, name): (category_id, color, nature)
+        for category_id, parent_id, name, color, nature in connection.execute(
+            select(Category.id, Category.parent_id, Category.name, Category.color, Category.nature)
+        )
+    }
+    changes = 0
+
+    def upsert(parent_id, name, color, nature):
+        nonlocal changes
+        found = existing.get((parent_id, name))
+        if found is None:
+            changes += 1
+            return connection.execute(
+                insert(Category).values(parent_id=parent_id, name=name, color=color, nature=nature)
+            ).inserted_primary_key[0]
+        category_id, stored_color, stored_nature = found
+        if (stored_color, stored_nature) != (color, nature):
+            changes += 1
+            connection.execute(
+                update(Category)
+                .where(Category.id == category_id)
+                .values(color=color, nature=nature)
+            )
+        return category_id
+
+    for node in definitions:
+        color = node.get("color")
+        parent_id = upsert(None, node["name"], color, node.get("nature"))
+        for child in node.get("subcategories") or []:
+            # Subcategories are drawn in their parent's colour
+            upsert(parent_id, child["name"], child.get("color", color), child.get("nature"))
+
+    closed = connection.execute(
+        select(func.count()).select_from(CategoryClosure).where(CategoryClosure.depth == 0)
+    ).scalar()
+    if changes or closed != len(existing):
+        rebuild_tree(connection)
+    return changes
+
+
+def fingerprint(path=CATEGORIES_FILE):
+    """Return the SHA-1 of the category YAML, or None if it cannot be read."""
+    try:
+        with open(path, "rb") as file:
+            return hashlib.sha1(file.read()).hexdigest()
+    except OSError:
+        return None
+
+
+def sync_if_changed(connection, path=CATEGORIES_FILE):
+    """Run ``sync`` only when the YAML changed since the last sync.
+
+    Hashing the file is much cheaper than parsing it, so startup skips the
+    YAML parser and the per-node comparison when nothing was edited.
+
+    Args:
+        connection: Connection or Session inside a transaction
+        path (str): Category YAML to synchronize from
+
+    Returns:
+        int: Result of ``sync``, or None when the sync was skipped
+    """
+    digest = fingerprint(path)
+    stored = connection.execute(select(AppState.value).where(AppState.key == SYNC_KEY)).scalar()
+    if digest is not None and digest == stored:
+        return None
+    changes = sync(connection, load_definitions(path))
+    if digest is not None:
+        connection.execute(
+            text("INSERT OR REPLACE INTO app_state (key, value) VALUES (:key, :value)"),
+            {"key": SYNC_KEY, "value": digest},
+        )
+    return changes
+
+
+# Guards against parent_id cycles in hand-edited databases
+_MAX_DEPTH = 32
+
+
+def rebuild_tree(connection):
+    """Recompute ``category_closure`` and every ``effective_nature``.
+
+    The tree holds at most a few hundred nodes, so the category sync rebuilds
+    it wholesale; categories created on the fly are closed incrementally.
+
+    Args:
+        connection: Connection or Session inside a transaction
+    """
+    connection.execute(text("DELETE FROM category_closure"))
+    connection.execute(
+        text(
+            "WITH RECURSIVE tree (ancestor_id, descendant_id, depth) AS ("
+            "  SELECT id, id, 0 FROM categories"
+            "  UNION ALL"
+            "  SELECT tree.ancestor_id, child.id, tree.depth + 1"
+            "  FROM tree JOIN categories AS child ON child.parent_id = tree.descendant_id"
+            "  WHERE tree.depth < :max_depth"
+            ") "
+            "INSERT OR IGNORE INTO category_closure (ancestor_id, descendant_id, depth) "
+            "SELECT ancestor_id, descendant_id, depth FROM tree"
+        ),
+        {"max_depth": _MAX_DEPTH},
+    )
+    connection.execute(
+        text(
+            "UPDATE categories SET effective_nature = ("
+            "  SELECT ancestor.nature FROM category_closure AS closure"
+            "  JOIN categories AS ancestor ON ancestor.id = closure.ancestor_id"
+            "  WHERE closure.descendant_id = categories.id AND ancestor.nature IS NOT NULL"
+            "  ORDER BY closure.depth LIMIT 1"
+            ")"
+        )
+    )
+
+
+def _find_or_create(db, parent_id, name):
+    parent_match = Category.parent_id.is_(None) if parent_id is None else Category.parent_id == parent_id
+    category_id = db.execute(
+        select(Category.id).where(parent_match, Category.name == name)
+    ).scalar()
+    if category_id is None:
+        category_id = db.execute(
+            insert(Category).values(parent_id=parent_id, name=name)
+        ).inserted_primary_key[0]
+        _close_leaf(db, category_id, parent_id)
+    return category_id
+
+
+def _close_leaf(db, category_id, parent_id):
+    """Add closure rows and the inherited nature for a new leaf category."""
+    db.execute(
+        text(
+            "INSERT INTO category_closure (ancestor_id, descendant_id, depth) "
+            "SELECT :id, :id, 0 "
+            "UNION ALL "
+            "SELECT ancestor_id, :id, depth + 1 FROM category_closure "
+            "WHERE descendant_id = :parent"
+        ),
+        {"id": category_id, "parent": parent_id},
+    )
+    if parent_id is not None:
+        db.execute(
+            update(Category)
+            .where(Category.id == category_id)
+            .values(
+                effective_nature=select(Category.effective_nature)
+                .where(Category.id == parent_id)
+                .scalar_subquery()
+            )
+        )
+
+
+def resolve(db, label, cache=None):
+    """Return the category id for ``label``, creating it if needed.
+
+    Args:
+        db: Session or Connection inside the caller's transaction
+        label (str): ``"Parent"`` or ``"Parent > Child"``; empty means none
+        cache (dict): Optional label -> id memo for bulk callers
+
+    Returns:
+        int: Category id, or None for an empty label
+    """
+    if not label:
+        return None
+    if cache is not None and label in cache:
+        return cache[label]
+    parent, child = split_label(label)
+    category_id = _find_or_create(db, None, parent)
+    if child:
+        category_id = _find_or_create(db, category_id, child)
+    if cache is not None:
+        cache[label] = category_id
+    return category_id
+
+
+def label_expression():
+    """SQL expression and parent alias building ``"Parent > Child"`` labels.
+
+    Returns:
+        tuple: ``(label, parent)`` where ``parent`` must be outer-joined on
+        ``parent.id == Category.parent_id``
+    """
+    parent = aliased(Category)
+    label = func.coalesce(parent.name + SEPARATOR + Category.name, Category.name)
+    return label, parent
+
+
+def labels(db):
+    """Return ``{category_id: label}`` for every category."""
+    label, parent = label_expression()
+    return dict(
+        db.execute(
+            select(Category.id, label).outerjoin(parent, parent.id == Category.parent_id)
+        ).all()
+    )
+
+
+def _day(value):
+    return value.date() if isinstance(value, datetime.datetime) else value
+
+
+def _range_filter(start, end, transaction_type):
+    return (
+        DailyRollup.transaction_type == transaction_type,
+        DailyRollup.day >= _day(start),
+        DailyRollup.day < _day(end),
+    )
+
+
+def _category_key():
+    # Rollups store 0 for uncategorized; callers expect None
+    return func.nullif(DailyRollup.category_id, UNCATEGORIZED)
+
+
+def category_totals(db, start, end, transaction_type=TransactionType.EXPENSE):
+    """Total per category over ``[start, end)``, largest first.
+
+    Totals come from ``daily_rollups``, so bounds have day granularity.
+
+    Args:
+        db (Session): Open database session
+        start (date): Inclusive first day
+        end (date): Exclusive last day
+        transaction_type (TransactionType): Which transactions to sum
+
+    Returns:
+        list: ``(category_id, total)`` tuples; uncategorized spend has None
+    """
+    category = _category_key().label("category")
+    total = func.sum(DailyRollup.total)
+    return db.execute(
+        select(category, total)
+        .where(*_range_filter(start, end, transaction_type))
+        .group_by(category)
+        .order_by(total.desc())
+    ).all()
+
+
+def parent_totals(db, start, end, transaction_type=TransactionType.EXPENSE):
+    """Total per top-level category over ``[start, end)``, largest first.
+
+    Descendant spend is rolled up into its top-level ancestor.
+
+    Returns:
+        list: ``(category_id, total)`` tuples; uncategorized spend has None
+    """
+    top = (
+        select(CategoryClosure.descendant_id, CategoryClosure.ancestor_id.label("top_id"))
+        .join(Category, Category.id == CategoryClosure.ancestor_id)
+        .where(Category.parent_id.is_(None))
+        .subquery()
+    )
+    total = func.sum(DailyRollup.total)
+    return db.execute(
+        select(top.c.top_id, total)
+        .select_from(DailyRollup)
+        .outerjoin(top, top.c.descendant_id == DailyRollup.category_id)
+        .where(*_range_filter(start, end, transaction_type))
+        .group_by(top.c.top_id)
+        .order_by(total.desc())
+    ).all()
+
+
+def subtree_totals(db, start, end, transaction_type=TransactionType.EXPENSE):
+    """Total of every subtree over ``[start, end)`` in one query.
+
+    Each rollup row counts towards its own category and all of its
+    ancestors, so a parent's figure includes every descendant.
+
+    Args:
+        db (Session): Open database session
+        start (date): Inclusive first day
+        end (date): Exclusive last day
+        transaction_type (TransactionType): Which transactions to sum
+
+    Returns:
+        dict: ``{category_id: total}`` for categories with any activity
+    """
+    return dict(
+        db.execute(
+            select(CategoryClosure.ancestor_id, func.sum(DailyRollup.total))
+            .join(CategoryClosure, CategoryClosure.descendant_id == DailyRollup.category_id)
+            .where(*_range_filter(start, end, transaction_type))
+            .group_by(CategoryClosure.ancestor_id)
+        ).all()
+    )
+
+
+def subtree_total(db, category_id, start, end, transaction_type=TransactionType.EXPENSE):
+    """Total of one category and all of its descendants over ``[start, end)``."""
+    return db.execute(
+        select(func.coalesce(func.sum(DailyRollup.total), 0.0))
+        .select_from(CategoryClosure)
+        .join(DailyRollup, DailyRollup.category_id == CategoryClosure.descendant_id)
+        .where(CategoryClosure.ancestor_id == category_id, *_range_filter(start, end, transaction_type))
+    ).scalar()
+
+
+def nature_totals(db, start, end, transaction_type=TransactionType.EXPENSE):
+    """Total per MUST/NEED/WANT bucket over ``[start, end)``.
+
+    Returns:
+        dict: ``{nature: total}`` for every entry of ``NATURES`` plus None for
+        uncategorized spend or categories without a nature
+    """
+    totals = {nature: 0.0 for nature in NATURES}
+    totals[None] = 0.0
+    rows = db.execute(
+        select(Category.effective_nature, func.sum(DailyRollup.total))
+        .select_from(DailyRollup)
+        .outerjoin(Category, Category.id == DailyRollup.category_id)
+        .where(*_range_filter(start, end, transaction_type))
+        .group_by(Category.effective_nature)
+    ).all()
+    for nature, total in rows:
+        key = nature if nature in totals else None
+        totals[key] += total or 0.0
+    return totals
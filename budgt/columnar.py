@@ -0,0 +1,242 @@
+"""On-disk columnar cache of the transaction ledger.
+
+The analytics engine works on every transaction as NumPy columns. Parsing
+them out of SQLite costs about a second per half million rows, so the columns
+are also kept as fixed-width binary files next to the database
+(``budgt.db-columns/``) and opened with ``numpy.memmap``; mapping them costs
+the same however long the history is.
+
+``meta.json`` records how many rows the files hold, the highest transaction id
+they include (the high-water mark), the schema version and the
+``ledger_state.rewrites`` counter that triggers bump on every update or delete
+of a transaction. Opening the store appends rows above the mark with one
+query; the files are rewritten from scratch when the schema version or the
+rewrite counter moved, or when the row at the mark no longer matches (a
+replaced database). None of these checks scan the ledger.
+"""
+
+import json
+import logging
+import os
+from contextlib import contextmanager
+
+import numpy as np
+
+from . import database, migrations
+from .recurring import merchant_code
+
+# Bumped whenever the file layout or column encoding changes
+FORMAT_VERSION = 2
+
+COLUMN_DTYPES = (
+    ("id", "<i8"),
+    # Days since 1970-01-01
+    ("day", "<i4"),
+    ("amount", "<f8"),
+    # 0 for uncategorized, as in the rollup tables
+    ("category_id", "<i4"),
+    ("account_id", "<i4"),
+    # 0 income, 1 expense, 2 transfer
+    ("type", "i1"),
+    # +1 when the row adds to its account balance, -1 when it subtracts
+    ("sign", "i1"),
+    # ``recurring.merchant_code`` of the description, 0 when it has none
+    ("merchant", "<i8"),
+)
+ROW_DTYPE = np.dtype(list(COLUMN_DTYPES))
+
+_SELECT = (
+    "SELECT id, CAST(julianday(date) - 2440587.5 AS INTEGER), amount, "
+    "COALESCE(category_id, 0), COALESCE(account_id, 0), "
+    "CASE transaction_type WHEN 'INCOME' THEN 0 WHEN 'EXPENSE' THEN 1 ELSE 2 END, "
+    "CASE transaction_type WHEN 'INCOME' THEN 1 WHEN 'EXPENSE' THEN -1 "
+    "ELSE COALESCE(transfer_direction, 0) END, "
+    "description "
+    "FROM transactions"
+)
+
+
+def fetch_rows(db, after_id=0):
+    """Read transactions above ``after_id`` as a structured array.
+
+    Args:
+        db (Session): Open database session
+        after_id (int): Only rows with a larger id are returned
+
+    Returns:
+        ndarray: ``ROW_DTYPE`` records sorted by (day, id)
+    """
+    cursor = db.connection().exec_driver_sql(_SELECT + " WHERE id > ?", (after_id,)).cursor
+    table = _to_table(cursor.fetchall())
+    return table[np.lexsort((table["id"], table["day"]))]
+
+
+def _to_table(rows):
+    """Turn ``_SELECT`` tuples into ``ROW_DTYPE`` records."""
+    # Descriptions repeat, so each distinct one is hashed once
+    codes = {description: merchant_code(description) for description in {row[-1] for row in rows}}
+    # Plain DB-API tuples convert straight into a structured array
+    return np.array([row[:-1] + (codes[row[-1]],) for row in rows], dtype=ROW_DTYPE)
+
+
+def columns_of(table):
+    """Split a structured array into contiguous ``{name: array}`` columns."""
+    return {name: np.ascontiguousarray(table[name]) for name, _ in COLUMN_DTYPES}
+
+
+def _rewrites(connection):
+    # None when the row is missing, which never matches a stored counter
+    return connection.exec_driver_sql("SELECT rewrites FROM ledger_state WHERE id = 1").scalar()
+
+
+@contextmanager
+def _locked(directory):
+    # Serializes writers across processes where flock is available
+    try:
+        import fcntl
+    except ImportError:
+        yield
+        return
+    with open(os.path.join(directory, "lock"), "a") as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+class ColumnStore:
+    """Memory-mapped column files for one database."""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    @classmethod
+    def for_database(cls):
+        """Return the store next to the configured database, or None in memory."""
+        path = database.storage_config.path
+        if not path or path == ":memory:":
+            return None
+        return cls(os.path.abspath(path) + "-columns")
+
+    def open(self, db):
+        """Bring the files up to date with the ledger and map them.
+
+        Args:
+            db (Session): Open database session; every check and fetch runs
+                in its read transaction, so the result matches one snapshot
+
+        Returns:
+            dict: ``{name: array}`` columns sorted by (day, id)
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        with _locked(self.directory):
+            meta = self._read_meta()
+            if not self._is_current(db, meta):
+                logging.info("Rebuilding column cache in %s", self.directory)
+                meta = self._rewrite(db, fetch_rows(db))
+            else:
+                added = fetch_rows(db, meta["high_water"])
+                if len(added):
+                    meta = self._append(db, meta, added)
+            return self._map(meta["count"])
+
+    def clear(self):
+        """Drop the cached columns; the next ``open`` rebuilds them."""
+        for name in ["meta.json"] + [f"{name}.bin" for name, _ in COLUMN_DTYPES]:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _read_meta(self):
+        try:
+            with open(self._path("meta.json"), encoding="utf-8") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self, meta):
+        temporary = self._path("meta.json.tmp")
+        with open(temporary, "w", encoding="utf-8") as file:
+            json.dump(meta, file)
+        os.replace(temporary, self._path("meta.json"))
+
+    def _is_current(self, db, meta):
+        if not meta or meta.get("format") != FORMAT_VERSION:
+            return False
+        connection = db.connection()
+        if meta["schema"] != migrations.get_version(connection):
+            return False
+        for name, dtype in COLUMN_DTYPES:
+            try:
+                size = os.path.getsize(self._path(f"{name}.bin"))
+            except OSError:
+                return False
+            if size < meta["count"] * np.dtype(dtype).itemsize:
+                return False
+        if meta["rewrites"] != _rewrites(connection):
+            return False
+        # The newest cached row must still hold the same values
+        tail = connection.exec_driver_sql(_SELECT + " WHERE id = ?", (meta["high_water"],)).first()
+        return (list(_to_table([tuple(tail)])[0].tolist()) if tail else None) == meta["tail"]
+
+    def _meta(self, db, table, count):
+        tail = None
+        if len(table):
+            tail = table[np.argmax(table["id"])].tolist()
+        connection = db.connection()
+        return {
+            "format": FORMAT_VERSION,
+            "schema": migrations.get_version(connection),
+            "rewrites": _rewrites(connection),
+            "count": count,
+            "high_water": tail[0] if tail else 0,
+            "tail": list(tail) if tail else None,
+        }
+
+    def _rewrite(self, db, table):
+        # Without meta.json a half-written store is rebuilt on the next open
+        self.clear()
+        for name, _ in COLUMN_DTYPES:
+            temporary = self._path(f"{name}.bin.tmp")
+            table[name].tofile(temporary)
+            os.replace(temporary, self._path(f"{name}.bin"))
+        meta = self._meta(db, table, len(table))
+        self._write_meta(meta)
+        return meta
+
+    def _append(self, db, meta, added):
+        count = meta["count"]
+        if count and added["day"][0] < self._map(count)["day"][-1]:
+            # Back-dated rows: merge in memory, keeping (day, id) order
+            existing = self._map(count)
+            table = np.empty(count + len(added), dtype=ROW_DTYPE)
+            for name, _ in COLUMN_DTYPES:
+                table[name][:count] = existing[name]
+                table[name][count:] = added[name]
+            table = table[np.lexsort((table["id"], table["day"]))]
+            return self._rewrite(db, table)
+
+        for name, dtype in COLUMN_DTYPES:
+            with open(self._path(f"{name}.bin"), "r+b") as file:
+                # Discard anything an interrupted append left past the count
+                file.truncate(count * np.dtype(dtype).itemsize)
+                file.seek(0, os.SEEK_END)
+                file.write(added[name].tobytes())
+        meta = self._meta(db, added, count + len(added))
+        self._write_meta(meta)
+        return meta
+
+    def _map(self, count):
+        columns = {}
+        for name, dtype in COLUMN_DTYPES:
+            if count == 0:
+                # numpy cannot map an empty file
+                columns[name] = np.empty(0, dtype=dtype)
+            else:
+                columns[name] = np.memmap(self._path(f"{name}.bin"), dtype=dtype, mode="r", shape=(count,))
+        return columns
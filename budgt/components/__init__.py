@@ -1,14 +1,33 @@
-"""Components package for Budgt.sh TUI application."""
-
-# Import all component classes for easy access
-from .weekly_overview import WeeklyOverview
-from .top_categories import TopCategories
-from .spending_chart import SpendingChart
-from .insights import InsightsGenerator
-
-__all__ = [
-    'WeeklyOverview',
-    'TopCategories', 
-    'SpendingChart',
-    'InsightsGenerator'
-]
+"""Components package for Budgt.sh TUI application.
+
+Component classes are imported on first access, so importing one submodule
+(the modals, say) does not load plotext and the Rich consoles that only the
+insights panel needs.
+"""
+
+import importlib
+
+# Component class -> module defining it
+_COMPONENTS = {
+    'WeeklyOverview': 'weekly_overview',
+    'TopCategories': 'top_categories',
+    'SpendingChart': 'spending_chart',
+    'ForecastChart': 'forecast_chart',
+    'ForecastSummary': 'forecast_chart',
+    'NeedsWants': 'needs_wants',
+    'RecurringCharges': 'recurring',
+    'SpendingStats': 'spending_stats',
+    'WeekdayProfile': 'weekday_profile',
+    'SpendingAlerts': 'alerts',
+    'InsightsGenerator': 'insights',
+    'ProfileOverlay': 'profile_overlay',
+}
+
+__all__ = list(_COMPONENTS)
+
+
+def __getattr__(name):
+    module = _COMPONENTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(f".{module}", __name__), name)
@@ -0,0 +1,38 @@
+"""Spending Alerts Component for Budgt.sh insights."""
+
+from ..anomalies import WEEK
+
+
+class SpendingAlerts:
+    """Component listing anomalies raised by the spending detector."""
+
+    @staticmethod
+    def generate(alerts, labels=None):
+        """Generate the spending alerts component.
+
+        Args:
+            alerts (list): ``Alert`` tuples from ``budgt.anomalies``, newest first
+            labels (dict): Category labels by id
+
+        Returns:
+            str: One line per alert
+        """
+        try:
+            labels = labels or {}
+            lines = ["🔔 Spending Alerts"]
+            if not alerts:
+                lines.append("   No spikes in this period")
+                return "\n".join(lines)
+
+            for alert in alerts:
+                category = labels.get(alert.category_id, "Uncategorized")
+                # Weeks are marked with their Monday
+                marker = "wk" if alert.kind == WEEK else "  "
+                lines.append(
+                    f"{alert.period:%m/%d}{marker} ${alert.amount:>8.2f} {alert.zscore:>4.1f}σ {category[:17]}"
+                )
+            return "\n".join(lines)
+
+        except Exception as e:
+            return f"""🔔 Spending Alerts
+Error: {str(e)}"""
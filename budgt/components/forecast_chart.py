@@ -0,0 +1,99 @@
+"""Cash-Flow Forecast Components for Budgt.sh insights."""
+
+from datetime import timedelta
+
+import plotext as plt
+
+from ..profiling import profiled
+from .spending_chart import _PLOT_LOCK, MAX_TICKS
+
+
+class ForecastSummary:
+    """Component listing each account's current and projected balance."""
+
+    @staticmethod
+    def generate(forecast, limit=8):
+        """Generate the forecast summary component.
+
+        Args:
+            forecast (Forecast): Projection from ``budgt.forecast``
+            limit (int): Number of accounts listed
+
+        Returns:
+            str: One line per account plus the overall change
+        """
+        try:
+            lines = [f"💸 Next {forecast.days} Days"]
+            if not forecast.accounts:
+                lines.append("   No accounts yet")
+                return "\n".join(lines)
+
+            for account, series in list(zip(forecast.accounts, forecast.balances))[:limit]:
+                lines.append(f"{account.name[:14]:<14} ${series[0]:>10.2f} → ${series[-1]:>10.2f}")
+
+            totals = forecast.balances.sum(axis=0)
+            lowest = int(totals.argmin())
+            lowest_day = forecast.start + timedelta(days=lowest - 1)
+            lines.append("")
+            lines.append(f"📉 Lowest total  ${totals[lowest]:>10.2f} on {lowest_day:%m/%d}")
+            lines.append(f"🧮 Net change    ${totals[-1] - totals[0]:>+10.2f}")
+            return "\n".join(lines)
+
+        except Exception as e:
+            return f"""💸 Forecast
+Error: {str(e)}"""
+
+
+class ForecastChart:
+    """Component charting the projected total balance."""
+
+    @staticmethod
+    def generate(forecast):
+        """Generate the projected balance chart using plotext.
+
+        Args:
+            forecast (Forecast): Projection from ``budgt.forecast``
+
+        Returns:
+            str: Formatted plotext line chart
+        """
+        with _PLOT_LOCK:
+            return ForecastChart._create_chart(forecast)
+
+    @staticmethod
+    @profiled("chart.forecast")
+    def _create_chart(forecast):
+        try:
+            if not forecast.accounts:
+                return "No accounts to forecast"
+
+            totals = forecast.balances.sum(axis=0).tolist()
+            dates = [forecast.start + timedelta(days=offset - 1) for offset in range(len(totals))]
+            x_values = list(range(len(totals)))
+
+            plt.clear_data()
+            plt.clear_figure()
+            plt.plotsize(85, 12)
+            plt.plot(x_values, totals, color="green", marker="fhd")
+            plt.title("")
+            plt.xlabel("")
+            plt.ylabel("")
+
+            tick_step = max(1, (len(x_values) + MAX_TICKS - 1) // MAX_TICKS)
+            labels = [f"{day:%m/%d}" for day in dates]
+            plt.xticks(x_values[::tick_step], labels[::tick_step])
+
+            low, high = min(totals), max(totals)
+            margin = max((high - low) * 0.1, 1.0)
+            plt.ylim(low - margin, high + margin)
+            plt.theme("clear")
+            plt.grid(True, True)
+            plt.frame(True)
+
+            lines = plt.build().split('\n')
+            while lines and not lines[-1].strip():
+                lines.pop()
+            return "\n".join(lines) + f"\nToday ${totals[0]:.0f} → ${totals[-1]:.0f} by {dates[-1]:%m/%d}"
+
+        except Exception as e:
+            return f"Chart Error: {str(e)}"
@@ -1,115 +1,227 @@
-from ..database import SessionLocal, Transaction, TransactionType
-from datetime import datetime, timedelta
-from sqlalchemy import func
+from ..categories import nature_totals
+from ..recurring import detect_cached
+from ..database import SessionLocal
+from ..timeseries import DAY, bucket_label, default_bucket, expense_series, window_bounds
 from rich.console import Console
+from datetime import date, timedelta
+from ..cache import LRUCache, data_version
+from ..profiling import profiled
 
 # Import individual component classes
 from .weekly_overview import WeeklyOverview
 from .spending_chart import SpendingChart
+from .forecast_chart import ForecastChart, ForecastSummary
+from .needs_wants import NeedsWants
+from .recurring import RecurringCharges
+from .spending_stats import SpendingStats
+from .weekday_profile import WeekdayProfile
+from .alerts import SpendingAlerts
+
+
+# Rendered panels kept for unchanged data, one per window
+INSIGHTS_CACHE_SIZE = 8
+_insights_cache = LRUCache(INSIGHTS_CACHE_SIZE)
 
 
 class InsightsGenerator:
     """Main insights generator that orchestrates all components."""
     
     @staticmethod
-    def generate_insights():
-        """Generate modular insights using individual components."""
+    def generate_insights(window_days=7):
+        """Generate modular insights using individual components.
+        
+        Args:
+            window_days (int): Number of days covered by the overview and trend
+        """
         try:
-            # Simple database session
-            db = SessionLocal()
-            
-            # Basic initialization
-            end_date = datetime.now()
-            week_start = end_date - timedelta(days=7)
-            
-            # Get weekly expense data
-            weekly_expenses = db.query(func.sum(Transaction.amount)).filter(
-                Transaction.transaction_type == TransactionType.EXPENSE,
-                Transaction.date >= week_start
-            ).scalar() or 0
-            
-            # Calculate daily average
-            daily_average = weekly_expenses / 7 if weekly_expenses > 0 else 0
-            
-            # Get daily trend data
-            daily_data = []
-            dates = []
-            amounts = []
-            
-            for i in range(7):
-                date = end_date - timedelta(days=i)
-                day_start = date.replace(hour=0, minute=0, second=0, microsecond=0)
-                day_end = day_start + timedelta(days=1)
-                
-                daily_expense = db.query(func.sum(Transaction.amount)).filter(
-                    Transaction.transaction_type == TransactionType.EXPENSE,
-                    Transaction.date >= day_start,
-                    Transaction.date < day_end
-                ).scalar() or 0
-                
-                daily_data.append((date.strftime('%m/%d'), daily_expense))
-                dates.append(date.strftime('%m/%d'))
-                amounts.append(daily_expense)
-            
-            # Close database early
-            db.close()
-            
-            # Reverse to show oldest to newest
-            daily_data.reverse()
-            dates.reverse()
-            amounts.reverse()
-            
-            # Generate components
-            overview_content = WeeklyOverview.generate(weekly_expenses, daily_average)
-            trend_content = SpendingChart.generate(daily_data, amounts, dates)
-            
-            # Create manual layout
-            overview_lines = overview_content.split('\n') if overview_content else ["No data"]
-            trend_lines = trend_content.split('\n') if trend_content else ["No data"]
-            
-            max_lines = max(len(overview_lines), len(trend_lines)) if overview_lines and trend_lines else 5
-            result_lines = []
-            
-            # Box headers
-            overview_header = "┌─ Weekly Overview " + "─" * 26 + "┐"
-            trend_header = "┌─ Spending Trend " + "─" * 67 + "┐"
-            result_lines.append(overview_header + " " + trend_header)
-            
-            # Content lines
-            for i in range(max_lines + 2):
-                # Overview side
-                if i == 0 or i == max_lines + 1:
-                    overview_line = "│" + " " * 44 + "│"
-                elif i - 1 < len(overview_lines):
-                    content = overview_lines[i - 1]
-                    if len(content) > 42:
-                        content = content[:39] + "..."
-                    overview_line = "│ " + content.ljust(42) + " │"
-                else:
-                    overview_line = "│" + " " * 44 + "│"
-                
-                # Trend side
-                if i == 0 or i == max_lines + 1:
-                    trend_line = "│" + " " * 84 + "│"
-                elif i - 1 < len(trend_lines):
-                    content = trend_lines[i - 1]
-                    if len(content) > 82:
-                        content = content[:79] + "..."
-                    trend_line = "│ " + content.ljust(82) + " │"
-                else:
-                    trend_line = "│" + " " * 84 + "│"
-                
-                result_lines.append(overview_line + " " + trend_line)
-            
-            # Box footers
-            overview_footer = "└" + "─" * 44 + "┘"
-            trend_footer = "└" + "─" * 84 + "┘"
-            result_lines.append(overview_footer + " " + trend_footer)
-            
-            return "\n".join(result_lines)
-            
+            return InsightsGenerator._render(window_days)
+        except Exception as e:
+            return InsightsGenerator._error_panel(e)
+    
+    @staticmethod
+    def generate_cached(window_days=7):
+        """Return insights from the cache while the data is unchanged.
+        
+        Results are keyed on the database data version, the day and the
+        window, so repeated refreshes with unchanged data cost one
+        ``PRAGMA data_version`` lookup. The boxes are laid out at fixed
+        widths and the charts use fixed colours on plotext's "clear" theme,
+        so neither the panel width nor the app theme changes the output.
+        Error panels are never cached: the next call tries again.
+        
+        Args:
+            window_days (int): Number of days covered by the overview and trend
+        """
+        try:
+            key = (data_version.current(), date.today(), window_days)
+            cached = _insights_cache.get(key)
+            if cached is not None:
+                return cached
+            content = InsightsGenerator._render(window_days)
         except Exception as e:
-            return f"""┌─ Weekly Overview ──────────────────────────┐ ┌─ Spending Trend ───────────────────────────────────────────────────────────┐
+            return InsightsGenerator._error_panel(e)
+        # Only reached when the render succeeded
+        _insights_cache.put(key, content)
+        return content
+    
+    @staticmethod
+    @profiled("insights.render")
+    def _render(window_days):
+        """Query the database and lay out the insights panel."""
+        # Simple database session
+        db = SessionLocal()
+        
+        # One grouped query returns the zero-filled expense series
+        bucket = default_bucket(window_days)
+        series = expense_series(db, window_days, bucket)
+        
+        # One grouped query over the precomputed category natures
+        natures = nature_totals(db, *window_bounds(window_days))
+        
+        # Reused until the data changes
+        charges = detect_cached(db)
+        
+        # Close database early
+        db.close()
+        
+        period_expenses = sum(amount for _, amount in series)
+        
+        # Calculate daily average
+        daily_average = period_expenses / window_days if period_expenses > 0 else 0
+        
+        # Trend data, oldest to newest
+        dates = [bucket_label(day, bucket) for day, _ in series]
+        amounts = [amount for _, amount in series]
+        daily_data = list(zip(dates, amounts))
+        
+        # Generate components
+        period_label = "Weekly" if window_days == 7 else f"{window_days}-Day"
+        overview_content = WeeklyOverview.generate(
+            period_expenses,
+            daily_average,
+            target=WeeklyOverview.DEFAULT_TARGET * window_days / 7,
+            period_label=period_label,
+        )
+        trend_content = SpendingChart.generate(daily_data, amounts, dates)
+        needs_content = NeedsWants.generate(natures)
+        recurring_content = RecurringCharges.generate(charges)
+        
+        # Create manual layout
+        overview_lines = overview_content.split('\n') if overview_content else ["No data"]
+        # Needs vs wants and upcoming charges fill the space under the overview
+        overview_lines += [""] + needs_content.split('\n')
+        overview_lines += [""] + recurring_content.split('\n')
+        trend_lines = trend_content.split('\n') if trend_content else ["No data"]
+        
+        overview_title = f"{period_label} Overview"
+        trend_title = "Spending Trend" if bucket == DAY else f"Spending Trend (by {bucket})"
+        result_lines = InsightsGenerator._box_row(overview_title, overview_lines, trend_title, trend_lines)
+        
+        # Second row: projected balances
+        horizon = 30 if window_days <= 30 else 90
+        forecast_lines, chart_lines = InsightsGenerator._forecast(horizon)
+        result_lines += InsightsGenerator._box_row(
+            "Cash-Flow Forecast", forecast_lines, f"Projected Balance ({horizon} days)", chart_lines
+        )
+        
+        # Third row: vectorized statistics over the whole ledger
+        stats_lines, profile_lines = InsightsGenerator._statistics(window_days)
+        result_lines += InsightsGenerator._box_row(
+            "Spending Statistics", stats_lines, "Weekday Profile & Outliers", profile_lines
+        )
+        
+        return "\n".join(result_lines)
+    
+    @staticmethod
+    @profiled("insights.forecast")
+    def _forecast(days):
+        """Content of the forecast row."""
+        # numpy is only loaded once the panel is first drawn
+        from ..forecast import forecast
+        
+        db = SessionLocal()
+        try:
+            result = forecast(db, days)
+        finally:
+            db.close()
+        
+        summary_content = ForecastSummary.generate(result)
+        chart_content = ForecastChart.generate(result)
+        return summary_content.split('\n'), chart_content.split('\n')
+    
+    @staticmethod
+    @profiled("insights.statistics")
+    def _statistics(window_days):
+        """Content of the statistics row, from the NumPy analytics engine."""
+        # numpy is only loaded once the panel is first drawn
+        from .. import anomalies
+        from ..analytics import load_analytics
+        from ..categories import labels
+        from ..database import Transaction
+        
+        db = SessionLocal()
+        try:
+            summary = load_analytics(db).summary(window_days)
+            since = date.today() - timedelta(days=window_days - 1)
+            alerts = anomalies.recent(db, since, limit=5)
+            ids = [outlier.id for outlier in summary.outliers]
+            descriptions = {}
+            category_labels = {}
+            if ids:
+                descriptions = dict(
+                    db.query(Transaction.id, Transaction.description).filter(Transaction.id.in_(ids))
+                )
+            if ids or alerts:
+                category_labels = labels(db)
+        finally:
+            db.close()
+        
+        # Detector alerts fill the space under the statistics
+        stats_content = SpendingStats.generate(summary) + "\n\n" + SpendingAlerts.generate(alerts, category_labels)
+        profile_content = WeekdayProfile.generate(
+            summary.weekday_profile, summary.outliers, descriptions, category_labels
+        )
+        return stats_content.split('\n'), profile_content.split('\n')
+    
+    @staticmethod
+    def _box_row(left_title, left_lines, right_title, right_lines):
+        """Draw two boxes side by side, 46 and 86 columns wide."""
+        max_lines = max(len(left_lines), len(right_lines))
+        result_lines = []
+        
+        # Box headers
+        left_header = f"┌─ {left_title} "
+        right_header = f"┌─ {right_title} "
+        left_header += "─" * (45 - len(left_header)) + "┐"
+        right_header += "─" * (85 - len(right_header)) + "┐"
+        result_lines.append(left_header + " " + right_header)
+        
+        # Content lines, padded by one blank line above and below
+        for i in range(max_lines + 2):
+            result_lines.append(
+                InsightsGenerator._box_line(left_lines, i, max_lines, 42)
+                + " "
+                + InsightsGenerator._box_line(right_lines, i, max_lines, 82)
+            )
+        
+        # Box footers
+        result_lines.append("└" + "─" * 44 + "┘" + " " + "└" + "─" * 84 + "┘")
+        return result_lines
+    
+    @staticmethod
+    def _box_line(lines, i, max_lines, width):
+        """One bordered content line of a box with ``width`` inner columns."""
+        if i == 0 or i == max_lines + 1 or i - 1 >= len(lines):
+            return "│" + " " * (width + 2) + "│"
+        content = lines[i - 1]
+        if len(content) > width:
+            content = content[:width - 3] + "..."
+        return "│ " + content.ljust(width) + " │"
+    
+    @staticmethod
+    def _error_panel(e):
+        """Placeholder panel shown when insights cannot be generated."""
+        return f"""┌─ Weekly Overview ──────────────────────────┐ ┌─ Spending Trend ───────────────────────────────────────────────────────────┐
 │                                            │ │                                                                               │
 │ 💰 Weekly Total      $0.00                 │ │  Error: {str(e)[:60]}...                                                     │
 │ 📅 Daily Average     $0.00                 │ │                                                                               │
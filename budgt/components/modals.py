@@ -1,8 +1,12 @@
 from textual.widgets import Input, Button, Static, Select, Label
 from textual.containers import Container, Horizontal, Vertical
 from textual.screen import ModalScreen
-from ..database import SessionLocal, Transaction, TransactionType, AccountType, Account
-import yaml
+from ..database import SessionLocal, Transaction, TransactionType, AccountType, Account, TRANSFER_IN, TRANSFER_OUT
+from ..balances import AccountBalanceStore
+from .. import anomalies, categories, rollups
+from ..ledger import from_transaction
+from ..messages import LedgerChanged
+from ..profiling import profiled, profiler
 import os
 import logging
 
@@ -57,23 +61,32 @@ class AddAccountModal(ModalScreen):
                     self.notify("Starting balance too large (max ±$999M)", severity="error")
                     return
                     
-                # Check for duplicate account names
                 db = SessionLocal()
-                existing_account = db.query(Account).filter(Account.name == name).first()
-                if existing_account:
+                try:
+                    # Check for duplicate account names
+                    existing_account = db.query(Account).filter(Account.name == name).first()
+                    if existing_account:
+                        self.notify("Account name already exists", severity="error")
+                        return
+                    
+                    with profiler.span("commit.add_account"):
+                        new_account = Account(
+                            name=name,
+                            account_type=account_type,
+                            starting_balance=balance
+                        )
+                        db.add(new_account)
+                        db.flush()
+                        AccountBalanceStore.open_account(db, new_account)
+                        account_id = new_account.id
+                        db.commit()
+                        balances = AccountBalanceStore.read_accounts(db, [account_id])
+                except Exception:
+                    db.rollback()
+                    raise
+                finally:
                     db.close()
-                    self.notify("Account name already exists", severity="error")
-                    return
-                
-                new_account = Account(
-                    name=name,
-                    account_type=account_type,
-                    starting_balance=balance
-                )
-                db.add(new_account)
-                db.commit()
-                db.close()
-                self.app.refresh_data()
+                self.app.post_message(LedgerChanged(balances=balances))
                 self.notify(f"Account '{name}' created successfully", severity="information")
                 self.dismiss()
                 
@@ -114,14 +127,16 @@ class AddTransactionModal(ModalScreen):
     def on_mount(self) -> None:
         # Load accounts for the select dropdown
         db = SessionLocal()
-        accounts = db.query(Account).all()
-        account_options = [(account.name, account.id) for account in accounts]
+        try:
+            accounts = db.query(Account).all()
+            account_options = [(account.name, account.id) for account in accounts]
+        finally:
+            db.close()
         account_select = self.query_one("#account-select", Select)
         account_select.set_options(account_options)
         
         # Load categories from YAML file
         self.load_categories()
-        db.close()
     
     def load_categories(self) -> None:
         """Load categories from the YAML file."""
@@ -131,6 +146,7 @@ class AddTransactionModal(ModalScreen):
             categories_file = os.path.join(current_dir, "..", "categories.yaml")
             
             if os.path.exists(categories_file):
+                import yaml
                 with open(categories_file, 'r') as file:
                     categories_data = yaml.safe_load(file)
                 
@@ -210,17 +226,34 @@ class AddTransactionModal(ModalScreen):
                     category = None
                 
                 db = SessionLocal()
-                new_transaction = Transaction(
-                    transaction_type=transaction_type,
-                    account_id=account_id,
-                    description=description,
-                    amount=amount,
-                    category=category
-                )
-                db.add(new_transaction)
-                db.commit()
-                db.close()
-                self.app.refresh_data()
+                try:
+                    with profiler.span("commit.add_transaction"):
+                        new_transaction = Transaction(
+                            transaction_type=transaction_type,
+                            account_id=account_id,
+                            description=description,
+                            amount=amount,
+                            category=category,
+                            category_id=categories.resolve(db, category)
+                        )
+                        db.add(new_transaction)
+                        db.flush()
+                    
+                        # Keep the materialized balance in step within the same commit
+                        delta = amount if transaction_type == TransactionType.INCOME else -amount
+                        AccountBalanceStore.apply(db, account_id, delta)
+                        rollups.record(db, [rollups.entry_for(new_transaction)])
+                        anomalies.record(db, [anomalies.observation_for(new_transaction)])
+                        account = db.get(Account, account_id)
+                        row = from_transaction(new_transaction, account.name if account else None)
+                        db.commit()
+                        balances = AccountBalanceStore.read_accounts(db, [account_id])
+                except Exception:
+                    db.rollback()
+                    raise
+                finally:
+                    db.close()
+                self.app.post_message(LedgerChanged(rows=[row], balances=balances))
                 self.notify("Transaction added successfully", severity="information")
                 self.dismiss()
                 
@@ -254,13 +287,14 @@ class TransferModal(ModalScreen):
     def on_mount(self) -> None:
         # Load accounts for both dropdowns
         db = SessionLocal()
-        accounts = db.query(Account).all()
-        account_options = [(account.name, account.id) for account in accounts]
+        try:
+            accounts = db.query(Account).all()
+            account_options = [(account.name, account.id) for account in accounts]
+        finally:
+            db.close()
         
         self.query_one("#from-account-select", Select).set_options(account_options)
         self.query_one("#to-account-select", Select).set_options(account_options)
-        
-        db.close()
 
     def on_button_pressed(self, event: Button.Pressed) -> None:
         if event.button.id == "transfer-money":
@@ -315,6 +349,7 @@ class TransferModal(ModalScreen):
         elif event.button.id == "cancel":
             self.dismiss()
     
+    @profiled("commit.transfer")
     def perform_transfer(self, from_account_id: int, to_account_id: int, amount: float, description: str) -> None:
         """Perform the actual transfer between accounts."""
         db = SessionLocal()
@@ -327,6 +362,8 @@ class TransferModal(ModalScreen):
                 self.notify("One or both accounts not found", severity="error")
                 return
             
+            transfer_category = categories.resolve(db, "Transfer")
+            
             # Create two transactions: one expense (from account) and one income (to account)
             # They will be linked via transfer_pair_id
             
@@ -336,7 +373,9 @@ class TransferModal(ModalScreen):
                 account_id=from_account_id,
                 description=f"Transfer to {to_account.name}: {description}",
                 amount=amount,
-                category="Transfer"
+                category="Transfer",
+                category_id=transfer_category,
+                transfer_direction=TRANSFER_OUT
             )
             
             # Transaction 2: Income to destination account  
@@ -345,7 +384,9 @@ class TransferModal(ModalScreen):
                 account_id=to_account_id,
                 description=f"Transfer from {from_account.name}: {description}",
                 amount=amount,
-                category="Transfer"
+                category="Transfer",
+                category_id=transfer_category,
+                transfer_direction=TRANSFER_IN
             )
             
             # Add both transactions
@@ -357,17 +398,30 @@ class TransferModal(ModalScreen):
             transfer_out.transfer_pair_id = transfer_in.id
             transfer_in.transfer_pair_id = transfer_out.id
             
+            # Move the materialized balances in the same DB transaction
+            AccountBalanceStore.apply(db, from_account_id, -amount)
+            AccountBalanceStore.apply(db, to_account_id, amount)
+            rollups.record(db, [rollups.entry_for(transfer_out), rollups.entry_for(transfer_in)])
+            rows = [
+                from_transaction(transfer_out, from_account.name),
+                from_transaction(transfer_in, to_account.name),
+            ]
+            
+            # Keep the names for the message; committing expires the accounts
+            from_name, to_name = from_account.name, to_account.name
+            
             # Commit the transaction
             db.commit()
             
-            # Refresh the main app data
-            self.app.refresh_data()
+            # Push just the new rows and balances to the main app
+            balances = AccountBalanceStore.read_accounts(db, [from_account_id, to_account_id])
+            self.app.post_message(LedgerChanged(rows=rows, balances=balances))
             
             # Close the modal
             self.dismiss()
             
             # Show success message
-            self.notify(f"Transferred ${amount:.2f} from {from_account.name} to {to_account.name}", severity="information")
+            self.notify(f"Transferred ${amount:.2f} from {from_name} to {to_name}", severity="information")
             
         except Exception as e:
             db.rollback()
@@ -0,0 +1,45 @@
+"""Needs vs Wants Component for Budgt.sh insights."""
+
+
+class NeedsWants:
+    """Component splitting spend into MUST / NEED / WANT natures."""
+
+    LABELS = (
+        ("MUST", "🔒 Must"),
+        ("NEED", "🧺 Need"),
+        ("WANT", "🎁 Want"),
+        (None, "❔ Other"),
+    )
+
+    @staticmethod
+    def generate(nature_totals):
+        """Generate the needs vs wants component.
+
+        Args:
+            nature_totals (dict): Total spend per nature, with None for
+                uncategorized spend
+
+        Returns:
+            str: Formatted breakdown with one bar per nature
+        """
+        try:
+            total = sum(nature_totals.values())
+            lines = ["⚖️  Needs vs Wants"]
+            if total <= 0:
+                lines.append("   No expenses in this period")
+                return "\n".join(lines)
+
+            bar_width = 12
+            for nature, label in NeedsWants.LABELS:
+                amount = nature_totals.get(nature, 0.0)
+                if nature is None and amount <= 0:
+                    continue
+                percentage = amount / total * 100
+                filled = int(percentage / 100 * bar_width)
+                bar = "█" * filled + "░" * (bar_width - filled)
+                lines.append(f"{label:<8}${amount:>9.2f} {percentage:>3.0f}% {bar}")
+            return "\n".join(lines)
+
+        except Exception as e:
+            return f"""⚖️  Needs vs Wants
+Error: {str(e)}"""
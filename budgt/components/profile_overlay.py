@@ -0,0 +1,58 @@
+"""Profiler overlay for Budgt.sh, toggled with ``p``."""
+
+from textual.widgets import Static
+
+from ..profiling import profiler
+
+
+class ProfileOverlay(Static):
+    """Floating panel with the latest spans and the slowest SQL statements."""
+
+    # Spans listed, newest first
+    SPANS = 12
+    # Seconds between redraws while shown
+    REFRESH_INTERVAL = 0.5
+    WIDTH = 80
+
+    def __init__(self, **kwargs):
+        # Statements contain brackets, so they must not be read as markup
+        super().__init__("", markup=False, **kwargs)
+
+    def on_mount(self) -> None:
+        self.set_interval(self.REFRESH_INTERVAL, self.refresh_content)
+
+    def refresh_content(self) -> None:
+        """Redraw from the profiler unless the overlay is hidden."""
+        if self.display:
+            self.update(self.render_text())
+
+    @staticmethod
+    def render_text(spans=SPANS, width=WIDTH):
+        """Format recent spans and the slowest statements.
+
+        Args:
+            spans (int): Number of spans to list
+            width (int): Characters available per line
+
+        Returns:
+            str: Overlay contents
+        """
+        lines = [f"{'span':<28}{'ms':>9}{'sql':>6}{'sql ms':>9}{'rows':>8}"]
+        recent = profiler.recent(spans)
+        for span in recent:
+            name = ("  " * span.depth + span.name)[:27]
+            lines.append(f"{name:<28}{span.ms:>9.1f}{span.queries:>6}{span.sql_ms:>9.1f}{span.rows:>8}")
+        if not recent:
+            lines.append("No spans yet")
+
+        lines += ["", "Slowest SQL"]
+        slowest = profiler.slowest()
+        for query in slowest:
+            prefix = f"{query.ms:>8.1f}ms {(query.span or '-')[:20]:<20} "
+            lines.append(prefix + query.statement[:max(width - len(prefix), 10)])
+        if not slowest:
+            lines.append("No statements yet")
+
+        if profiler.path:
+            lines += ["", f"Trace: {profiler.path}"]
+        return "\n".join(lines)
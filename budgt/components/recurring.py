@@ -0,0 +1,34 @@
+"""Recurring Charges Component for Budgt.sh insights."""
+
+
+class RecurringCharges:
+    """Component listing detected subscriptions and their next charge."""
+
+    @staticmethod
+    def generate(charges, limit=4):
+        """Generate the recurring charges component.
+
+        Args:
+            charges (list): ``RecurringCharge`` tuples ordered by next date
+            limit (int): Number of upcoming charges to list
+
+        Returns:
+            str: Monthly cost of all recurring charges and the next few
+        """
+        try:
+            lines = ["🔁 Upcoming Charges"]
+            if not charges:
+                lines.append("   No recurring charges found")
+                return "\n".join(lines)
+
+            monthly = sum(charge.amount * 30.44 / charge.period_days for charge in charges)
+            lines.append(f"   {len(charges)} recurring, ≈ ${monthly:.2f}/month")
+            for charge in charges[:limit]:
+                lines.append(
+                    f"{charge.next_date:%m/%d} {charge.description[:16]:<16} ${charge.amount:>8.2f} {charge.period}"
+                )
+            return "\n".join(lines)
+
+        except Exception as e:
+            return f"""🔁 Upcoming Charges
+Error: {str(e)}"""
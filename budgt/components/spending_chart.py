@@ -6,6 +6,16 @@ from rich.text import Text
 from rich.align import Align
 from rich import box
 import plotext as plt
+import threading
+
+from ..profiling import profiled
+
+# plotext keeps its figure in module-level state, so charts built from
+# concurrent worker threads must not interleave
+_PLOT_LOCK = threading.Lock()
+
+# Most x-axis labels shown before ticks are thinned out
+MAX_TICKS = 12
 
 
 class SpendingChart:
@@ -23,9 +33,11 @@ class SpendingChart:
         Returns:
             str: Formatted plotext line chart
         """
-        return SpendingChart._create_clean_chart(amounts, date_labels)
+        with _PLOT_LOCK:
+            return SpendingChart._create_clean_chart(amounts, date_labels)
     
     @staticmethod
+    @profiled("chart.spending")
     def _create_clean_chart(amounts, date_labels):
         """Create a compact line graph using plotext for the insights panel.
         
@@ -42,9 +54,8 @@ class SpendingChart:
                 amounts = [120, 50, 85, 200, 150, 90, 180]
                 date_labels = [f"{i+10:02d}" for i in range(7)]
             
-            # Limit to last 7 days to keep compact
-            amounts = amounts[-7:]
-            date_labels = date_labels[-7:] if date_labels else [f"{i+10:02d}" for i in range(7)]
+            if not date_labels:
+                date_labels = [f"{i+10:02d}" for i in range(len(amounts))]
             
             # Create proper line plot using plotext
             plt.clear_data()
@@ -65,9 +76,11 @@ class SpendingChart:
             plt.ylabel("")
             
             # Add some basic axis information for better readability
+            # Thin out the ticks on long windows so the labels stay readable
+            tick_step = max(1, (len(x_values) + MAX_TICKS - 1) // MAX_TICKS)
             day_numbers = [date_label.split('/')[-1] if '/' in date_label else date_label for date_label in date_labels]
             if len(day_numbers) == len(x_values):
-                plt.xticks(x_values, day_numbers)
+                plt.xticks(x_values[::tick_step], day_numbers[::tick_step])
             
             # Show some y-axis values for context
             max_amount = max(amounts) if amounts else 1
@@ -96,7 +109,7 @@ class SpendingChart:
             summary = f"Total: ${total_spending:.0f} | Avg: ${avg_spending:.0f}"
             
             # Create day labels
-            day_labels = " ".join([date_label.split('/')[-1] if '/' in date_label else date_label for date_label in date_labels])
+            day_labels = " ".join(day_numbers[::tick_step])
             
             # Build the clean output
             result = plot_output + "\n" 
@@ -0,0 +1,34 @@
+"""Spending Statistics Component for Budgt.sh insights."""
+
+
+class SpendingStats:
+    """Component showing rolling averages and expense percentiles."""
+
+    @staticmethod
+    def generate(summary):
+        """Generate the spending statistics component.
+
+        Args:
+            summary (AnalyticsSummary): Statistics from ``budgt.analytics``
+
+        Returns:
+            str: Formatted rolling figures and percentiles
+        """
+        try:
+            lines = [
+                f"📈 7-Day Mean      ${summary.rolling_mean:>10.2f}/day",
+                f"📊 30-Day Median   ${summary.rolling_median:>10.2f}/day",
+            ]
+            if not summary.percentiles:
+                lines.append("   No expenses in this period")
+                return "\n".join(lines)
+
+            lines.append("")
+            lines.append("🧾 Single Expense Size")
+            for percentile, amount in summary.percentiles.items():
+                lines.append(f"   p{percentile:<14} ${amount:>10.2f}")
+            return "\n".join(lines)
+
+        except Exception as e:
+            return f"""📐 Spending Statistics
+Error: {str(e)}"""
@@ -1,5 +1,7 @@
 """Top Categories Component for Budgt.sh insights."""
 
+from functools import lru_cache
+
 
 class TopCategories:
     """Component for top spending categories with visual bars."""
@@ -53,6 +55,7 @@ Category                      Amount    Perc  Visual
 Error loading categories: {str(e)}"""
 
     @staticmethod
+    @lru_cache(maxsize=1024)
     def _get_category_info(category):
         """Get icon and display name for a category.
         
@@ -61,6 +64,8 @@ Error loading categories: {str(e)}"""
             
         Returns:
             tuple: (icon, display_name)
+        
+        Results are cached, so each name is keyword-matched only once.
         """
         category_lower = category.lower()
         
@@ -0,0 +1,50 @@
+"""Weekday Profile and Outliers Component for Budgt.sh insights."""
+
+
+class WeekdayProfile:
+    """Component showing spend per weekday and unusually large expenses."""
+
+    DAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+
+    @staticmethod
+    def generate(profile, outliers, descriptions=None, labels=None):
+        """Generate the weekday profile and outliers component.
+
+        Args:
+            profile (sequence): Average spend for each weekday, Monday first
+            outliers (list): ``Outlier`` tuples from ``budgt.analytics``
+            descriptions (dict): Transaction descriptions by id
+            labels (dict): Category labels by id
+
+        Returns:
+            str: Weekday bars followed by the outlier list
+        """
+        try:
+            descriptions = descriptions or {}
+            labels = labels or {}
+            lines = ["📆 Average Spend by Weekday"]
+            peak = max(profile) if len(profile) else 0
+            bar_width = 40
+            for day, amount in zip(WeekdayProfile.DAYS, profile):
+                filled = int(amount / peak * bar_width) if peak > 0 else 0
+                bar = "█" * filled + "░" * (bar_width - filled)
+                lines.append(f"{day}  ${amount:>9.2f} {bar}")
+
+            lines.append("")
+            lines.append("🚨 Unusual Expenses")
+            if not outliers:
+                lines.append("   Nothing out of the ordinary")
+                return "\n".join(lines)
+
+            for outlier in outliers:
+                description = descriptions.get(outlier.id, "")[:24]
+                category = labels.get(outlier.category_id, "Uncategorized")[:20]
+                lines.append(
+                    f"{outlier.date:%m/%d} ${outlier.amount:>9.2f} {outlier.zscore:>4.1f}σ "
+                    f"{description:<24} {category}"
+                )
+            return "\n".join(lines)
+
+        except Exception as e:
+            return f"""📆 Weekday Profile
+Error: {str(e)}"""
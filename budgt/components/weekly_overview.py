@@ -4,14 +4,18 @@
 class WeeklyOverview:
     """Component for weekly spending overview with progress bar."""
     
+    # Spending target for a seven-day period
+    DEFAULT_TARGET = 1000.0
+    
     @staticmethod
-    def generate(weekly_expenses, daily_average, target=1000.0):
+    def generate(weekly_expenses, daily_average, target=DEFAULT_TARGET, period_label="Weekly"):
         """Generate weekly overview component.
         
         Args:
-            weekly_expenses (float): Total expenses for the week
+            weekly_expenses (float): Total expenses for the period
             daily_average (float): Average daily spending
-            target (float): Weekly spending target
+            target (float): Spending target for the period
+            period_label (str): Name of the period, e.g. "Weekly" or "30-Day"
             
         Returns:
             str: Formatted weekly overview content
@@ -25,7 +29,8 @@ class WeeklyOverview:
             progress_filled = int((progress_percentage / 100) * progress_bar_width)
             progress_bar = "█" * progress_filled + "░" * (progress_bar_width - progress_filled)
             
-            overview_content = f"""💰 Weekly Total      ${weekly_expenses:>8.2f}
+            total_label = f"{period_label} Total"
+            overview_content = f"""💰 {total_label:<18}${weekly_expenses:>8.2f}
 📅 Daily Average     ${daily_average:>8.2f}
 🎯 Target           ${target:>8.2f}
    Progress         {progress_percentage:>6.1f}%
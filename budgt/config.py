@@ -0,0 +1,123 @@
+"""Storage configuration for Budgt.sh.
+
+Settings are resolved from, in increasing order of precedence: built-in
+defaults, the ``storage`` section of the config file, ``BUDGT_*`` environment
+variables and the ``--db`` command line flag.
+
+Example ``~/.config/budgt/config.yaml``::
+
+    storage:
+      path: ~/finance/budgt.db
+      journal_mode: WAL
+      synchronous: NORMAL
+      cache_size: -65536      # negative values are KiB, positive are pages
+      mmap_size: 268435456    # bytes
+      temp_store: MEMORY
+      busy_timeout: 5000      # milliseconds
+"""
+
+import os
+
+DEFAULT_DB_PATH = "budgt.db"
+
+# Pragma name -> (default, allowed values or int)
+PRAGMAS = {
+    "journal_mode": ("WAL", ("DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF")),
+    "synchronous": ("NORMAL", ("OFF", "NORMAL", "FULL", "EXTRA")),
+    "cache_size": (-65536, int),
+    "mmap_size": (268435456, int),
+    "temp_store": ("MEMORY", ("DEFAULT", "FILE", "MEMORY")),
+    "busy_timeout": (5000, int),
+}
+
+
+def config_file_path():
+    """Return the config file location, honouring ``BUDGT_CONFIG``."""
+    explicit = os.environ.get("BUDGT_CONFIG")
+    if explicit:
+        return os.path.expanduser(explicit)
+    base = os.environ.get("XDG_CONFIG_HOME") or os.path.join("~", ".config")
+    return os.path.expanduser(os.path.join(base, "budgt", "config.yaml"))
+
+
+def _validate(name, value):
+    """Normalise one pragma value, raising ValueError when it is invalid."""
+    _, allowed = PRAGMAS[name]
+    if allowed is int:
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"{name} must be an integer, got {value!r}")
+    normalised = str(value).upper()
+    if normalised not in allowed:
+        raise ValueError(f"{name} must be one of {', '.join(allowed)}, got {value!r}")
+    return normalised
+
+
+class StorageConfig:
+    """Effective database path and connection pragmas."""
+
+    def __init__(self, path=DEFAULT_DB_PATH, pragmas=None, source=None):
+        self.path = path
+        self.pragmas = {name: default for name, (default, _) in PRAGMAS.items()}
+        self.pragmas.update(pragmas or {})
+        # Config file that contributed settings, if any
+        self.source = source
+
+    @property
+    def url(self):
+        """SQLAlchemy URL for the configured database file."""
+        return f"sqlite:///{self.path}"
+
+    def with_path(self, path):
+        """Return a copy pointing at a different database file."""
+        return StorageConfig(path, dict(self.pragmas), self.source)
+
+
+def load_config(db_path=None, environ=None):
+    """Resolve the storage configuration.
+
+    Args:
+        db_path (str): Database path from the command line, if given
+        environ (dict): Environment to read (defaults to ``os.environ``)
+
+    Returns:
+        StorageConfig: Effective settings
+
+    Raises:
+        ValueError: If a configured value is invalid
+    """
+    environ = os.environ if environ is None else environ
+    path = DEFAULT_DB_PATH
+    pragmas = {}
+    source = None
+
+    config_file = config_file_path()
+    if os.path.exists(config_file):
+        import yaml
+
+        with open(config_file, "r") as file:
+            data = yaml.safe_load(file) or {}
+        storage = data.get("storage") or {}
+        if not isinstance(storage, dict):
+            raise ValueError(f"'storage' in {config_file} must be a mapping")
+        source = config_file
+        if storage.get("path"):
+            path = storage["path"]
+        for name in PRAGMAS:
+            if name in storage:
+                pragmas[name] = _validate(name, storage[name])
+
+    if environ.get("BUDGT_DB"):
+        path = environ["BUDGT_DB"]
+    for name in PRAGMAS:
+        value = environ.get(f"BUDGT_{name.upper()}")
+        if value:
+            pragmas[name] = _validate(name, value)
+
+    if db_path:
+        path = db_path
+
+    if path != ":memory:":
+        path = os.path.expanduser(path)
+    return StorageConfig(path, pragmas, source)
@@ -1,21 +1,59 @@
 
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Enum, ForeignKey
+from sqlalchemy import create_engine, event, Column, Integer, String, Float, Date, DateTime, Enum, ForeignKey, Index
 from sqlalchemy.orm import declarative_base, relationship
 from sqlalchemy.orm import sessionmaker
 import datetime
 import enum
+import os
 
-DATABASE_URL = "sqlite:///budgt.db"
+from . import migrations, startup
+from .config import StorageConfig, load_config
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
 Base = declarative_base()
 
+storage_config = None
+DATABASE_URL = None
+engine = None
+
+def _apply_pragmas(dbapi_connection, connection_record):
+    """Apply the configured pragmas to every new SQLite connection."""
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in storage_config.pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+    finally:
+        cursor.close()
+
+def configure(config=None):
+    """Point the engine and SessionLocal at the configured database.
+
+    Args:
+        config (StorageConfig): Settings to use (defaults to ``load_config()``)
+    """
+    global storage_config, DATABASE_URL, engine
+    if engine is not None:
+        engine.dispose()
+    storage_config = config or load_config()
+    directory = os.path.dirname(storage_config.path)
+    if directory and storage_config.path != ":memory:":
+        os.makedirs(directory, exist_ok=True)
+    DATABASE_URL = storage_config.url
+    engine = create_engine(DATABASE_URL)
+    event.listen(engine, "connect", _apply_pragmas)
+    SessionLocal.configure(bind=engine)
+    return engine
+
 class TransactionType(enum.Enum):
     INCOME = "Income"
     EXPENSE = "Expense"
     TRANSFER = "Transfer"
 
+# Values of Transaction.transfer_direction: the sign a transfer leg applies to
+# its account's balance (0 for a leg without a pair in another account)
+TRANSFER_OUT = -1
+TRANSFER_IN = 1
+
 class AccountType(enum.Enum):
     CASH = "Cash"
     BANK_ACCOUNT = "Bank Account"
@@ -31,6 +69,35 @@ class Account(Base):
     starting_balance = Column(Float, default=0.0)
     created_date = Column(DateTime, default=datetime.datetime.utcnow)
 
+class Category(Base):
+    """Node of the category tree, synchronized from categories.yaml."""
+    __tablename__ = "categories"
+
+    id = Column(Integer, primary_key=True)
+    parent_id = Column(Integer, ForeignKey("categories.id"), nullable=True)
+    name = Column(String, nullable=False)
+    color = Column(String, nullable=True)
+    # MUST, NEED or WANT; NULL for user-defined categories
+    nature = Column(String, nullable=True)
+    # Own nature, else the nearest ancestor's (maintained with the closure)
+    effective_nature = Column(String, nullable=True)
+
+    __table_args__ = (
+        Index("ix_categories_parent_name", "parent_id", "name", unique=True),
+    )
+
+class CategoryClosure(Base):
+    """Every (ancestor, descendant) pair of the category tree, self included."""
+    __tablename__ = "category_closure"
+
+    ancestor_id = Column(Integer, ForeignKey("categories.id"), primary_key=True)
+    descendant_id = Column(Integer, ForeignKey("categories.id"), primary_key=True)
+    depth = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index("ix_category_closure_descendant", "descendant_id", "ancestor_id"),
+    )
+
 class Transaction(Base):
     __tablename__ = "transactions"
 
@@ -40,9 +107,140 @@ class Transaction(Base):
     amount = Column(Float)
     transaction_type = Column(Enum(TransactionType))
     account_id = Column(Integer)
+    # Display label ("Parent > Child"); aggregates use category_id
     category = Column(String)
+    category_id = Column(Integer, ForeignKey("categories.id"), nullable=True)
     # For transfers: reference to the paired transaction in the other account
     transfer_pair_id = Column(Integer, nullable=True)
+    # For transfers: TRANSFER_OUT or TRANSFER_IN; NULL for other types
+    transfer_direction = Column(Integer, nullable=True)
+    # Content hash of imported statement rows, used to skip duplicates
+    import_hash = Column(String, nullable=True)
+
+    # Existing databases receive new indexes through budgt/migrations.py
+    __table_args__ = (
+        # Supports keyset pagination of the transactions panel on (date, id)
+        Index("ix_transactions_date_id", "date", "id"),
+        # Cover the per-account balance and the insights range aggregations
+        Index(
+            "ix_transactions_account_balance",
+            "account_id", "transaction_type", "amount", "transfer_direction",
+        ),
+        Index("ix_transactions_type_date", "transaction_type", "date", "category_id", "amount"),
+        # Subtree totals seek each descendant category over a date range
+        Index("ix_transactions_category", "category_id", "transaction_type", "date", "amount"),
+        Index("ix_transactions_import_hash", "import_hash", unique=True),
+    )
+
+class AccountBalanceRecord(Base):
+    """Materialized running balance, one row per account."""
+    __tablename__ = "account_balances"
+
+    account_id = Column(Integer, ForeignKey("accounts.id"), primary_key=True)
+    balance = Column(Float, default=0.0)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+class DailyRollup(Base):
+    """Sum and count of transactions per (day, account, category, type)."""
+    __tablename__ = "daily_rollups"
+
+    day = Column(Date, primary_key=True)
+    account_id = Column(Integer, primary_key=True)
+    # 0 stands for uncategorized so the key never contains NULL
+    category_id = Column(Integer, primary_key=True)
+    transaction_type = Column(Enum(TransactionType), primary_key=True)
+    total = Column(Float, nullable=False, default=0.0)
+    count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ix_daily_rollups_type_day", "transaction_type", "day", "category_id", "total"),
+    )
+
+class MonthlyRollup(Base):
+    """Same as ``DailyRollup`` per calendar month (``month`` is the 1st)."""
+    __tablename__ = "monthly_rollups"
+
+    month = Column(Date, primary_key=True)
+    account_id = Column(Integer, primary_key=True)
+    category_id = Column(Integer, primary_key=True)
+    transaction_type = Column(Enum(TransactionType), primary_key=True)
+    total = Column(Float, nullable=False, default=0.0)
+    count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ix_monthly_rollups_type_month", "transaction_type", "month", "category_id", "total"),
+    )
+
+class CategoryStats(Base):
+    """Running spend statistics per category for the anomaly detector.
+
+    Means and variances are exponentially weighted, so each new expense
+    updates them in O(1) (see ``budgt.anomalies``).
+    """
+    __tablename__ = "category_stats"
+
+    # 0 stands for uncategorized, as in the rollup tables
+    category_id = Column(Integer, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    mean = Column(Float, nullable=False, default=0.0)
+    variance = Column(Float, nullable=False, default=0.0)
+    # Monday of the week being accumulated, and its total so far
+    week = Column(Date, nullable=True)
+    week_total = Column(Float, nullable=False, default=0.0)
+    # Statistics of completed weekly totals
+    weeks = Column(Integer, nullable=False, default=0)
+    week_mean = Column(Float, nullable=False, default=0.0)
+    week_variance = Column(Float, nullable=False, default=0.0)
+
+class Anomaly(Base):
+    """Expense or week flagged by the anomaly detector."""
+    __tablename__ = "anomalies"
+
+    id = Column(Integer, primary_key=True)
+    # "transaction" or "week"
+    kind = Column(String, nullable=False)
+    category_id = Column(Integer, nullable=False)
+    # Day of the expense, or Monday of the week
+    period = Column(Date, nullable=False)
+    # 0 for weeks, so the unique key never contains NULL
+    transaction_id = Column(Integer, nullable=False, default=0)
+    amount = Column(Float, nullable=False)
+    expected = Column(Float, nullable=False)
+    zscore = Column(Float, nullable=False)
+    detected_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_anomalies_key", "kind", "category_id", "period", "transaction_id", unique=True),
+        Index("ix_anomalies_period", "period"),
+    )
+
+class LedgerState(Base):
+    """Single row counting rewrites of stored transactions.
+
+    Triggers bump ``rewrites`` whenever a transaction is deleted or one of its
+    analysed columns is updated, so caches built from the ledger
+    (``budgt.columnar``) can tell plain appends from rewrites.
+    """
+    __tablename__ = "ledger_state"
+
+    id = Column(Integer, primary_key=True)
+    rewrites = Column(Integer, nullable=False, default=0)
+
+# Created with the schema; existing databases get them from migration 8
+LEDGER_TRIGGERS = (
+    "CREATE TRIGGER IF NOT EXISTS transactions_rewrite_update "
+    "AFTER UPDATE OF date, amount, transaction_type, account_id, category_id, transfer_direction, description "
+    "ON transactions BEGIN UPDATE ledger_state SET rewrites = rewrites + 1; END",
+    "CREATE TRIGGER IF NOT EXISTS transactions_rewrite_delete "
+    "AFTER DELETE ON transactions BEGIN UPDATE ledger_state SET rewrites = rewrites + 1; END",
+)
+
+class AppState(Base):
+    """Key/value facts the application records about the database itself."""
+    __tablename__ = "app_state"
+
+    key = Column(String, primary_key=True)
+    value = Column(String, nullable=True)
 
 # Keep old Expense class for backward compatibility
 class Expense(Base):
@@ -53,8 +251,67 @@ class Expense(Base):
     description = Column(String, index=True)
     amount = Column(Float)
 
+try:
+    configure()
+except ValueError:
+    # main() reconfigures and reports the error; keep the module importable
+    configure(StorageConfig())
+
 def init_db():
-    Base.metadata.create_all(bind=engine)
+    """Create or upgrade the schema and synchronize the category tree.
+
+    A database already at the current schema version skips ``create_all``
+    and the migration pass, and the category sync only parses
+    ``categories.yaml`` when the file changed since the last sync, so
+    opening an up-to-date database costs a couple of small queries.
+    """
+    with engine.connect() as connection:
+        current = migrations.get_version(connection) == migrations.head_version()
+        fresh = not current and migrations.is_fresh(connection)
+    startup.trace.mark("schema check")
+    if not current:
+        Base.metadata.create_all(bind=engine)
+        if fresh:
+            # create_all just built the current schema
+            with engine.begin() as connection:
+                connection.exec_driver_sql("INSERT INTO ledger_state (id, rewrites) VALUES (1, 0)")
+                for statement in LEDGER_TRIGGERS:
+                    connection.exec_driver_sql(statement)
+                migrations.set_version(connection, migrations.head_version())
+        else:
+            migrations.migrate(engine)
+            _replay_anomalies()
+        startup.trace.mark("schema upgrade")
+
+    from . import categories
+
+    with engine.begin() as connection:
+        categories.sync_if_changed(connection)
+    startup.trace.mark("category sync")
+
+def _replay_anomalies():
+    """Fill the anomaly statistics of an upgraded ledger that has none yet.
+
+    Migration 9 only creates the tables, so the expense history is replayed
+    here, with the current models, when ``category_stats`` is empty but the
+    ledger holds expenses.
+    """
+    with engine.connect() as connection:
+        needed = connection.exec_driver_sql(
+            "SELECT NOT EXISTS (SELECT 1 FROM category_stats) "
+            "AND EXISTS (SELECT 1 FROM transactions WHERE transaction_type = 'EXPENSE')"
+        ).scalar()
+    if not needed:
+        return
+
+    from . import anomalies
+
+    db = SessionLocal()
+    try:
+        anomalies.rebuild(db)
+        db.commit()
+    finally:
+        db.close()
 
 def get_db():
     db = SessionLocal()
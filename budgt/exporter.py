@@ -0,0 +1,288 @@
+"""Streaming export of transactions and reports for Budgt.sh.
+
+Rows are streamed from SQLite with ``yield_per`` and written out as they
+arrive, so memory use stays flat regardless of table size. Date-range and
+account filters are applied in SQL.
+
+Supported formats:
+
+* ``csv`` and ``jsonl`` -- one row per transaction (or report line)
+* ``npz`` -- NumPy column arrays for fast downstream analytics; needs numpy
+"""
+
+import csv
+import datetime
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+
+from sqlalchemy import func, select
+
+from .database import Account, Category, DailyRollup, Transaction
+
+FORMATS = ("csv", "jsonl", "npz")
+REPORTS = ("transactions", "monthly")
+
+# Rows fetched from SQLite per round trip
+STREAM_CHUNK = 2000
+
+TRANSACTION_FIELDS = (
+    "id",
+    "date",
+    "description",
+    "amount",
+    "transaction_type",
+    "category",
+    "account_id",
+    "account",
+    "transfer_direction",
+)
+
+MONTHLY_FIELDS = (
+    "month",
+    "account",
+    "category",
+    "transaction_type",
+    "total",
+    "count",
+)
+
+
+def _apply_filters(query, start=None, end=None, account_ids=None):
+    if start is not None:
+        query = query.where(Transaction.date >= start)
+    if end is not None:
+        query = query.where(Transaction.date < end)
+    if account_ids:
+        query = query.where(Transaction.account_id.in_(account_ids))
+    return query
+
+
+def transactions_query(start=None, end=None, account_ids=None):
+    """Select transactions joined to their account name, oldest first.
+
+    Args:
+        start (datetime): Inclusive lower bound on the date
+        end (datetime): Exclusive upper bound on the date
+        account_ids (list): Restrict to these accounts
+
+    Returns:
+        Select: Query yielding rows in ``TRANSACTION_FIELDS`` order
+    """
+    query = (
+        select(
+            Transaction.id,
+            Transaction.date,
+            Transaction.description,
+            Transaction.amount,
+            Transaction.transaction_type,
+            Transaction.category,
+            Transaction.account_id,
+            Account.name,
+            Transaction.transfer_direction,
+        )
+        .outerjoin(Account, Account.id == Transaction.account_id)
+        .order_by(Transaction.date, Transaction.id)
+    )
+    return _apply_filters(query, start, end, account_ids)
+
+
+def monthly_query(start=None, end=None, account_ids=None):
+    """Select monthly totals per account, category and transaction type.
+
+    Totals are summed from ``daily_rollups`` on the integer account and
+    category ids, so the report costs the same however long the ledger is;
+    names are joined in afterwards.
+
+    Returns:
+        Select: Query yielding rows in ``MONTHLY_FIELDS`` order
+    """
+    from .categories import label_expression
+
+    label, parent = label_expression()
+    month = func.strftime("%Y-%m", DailyRollup.day).label("month")
+    query = (
+        select(
+            month,
+            Account.name,
+            label,
+            DailyRollup.transaction_type,
+            func.sum(DailyRollup.total),
+            func.sum(DailyRollup.count),
+        )
+        .select_from(DailyRollup)
+        .outerjoin(Account, Account.id == DailyRollup.account_id)
+        .outerjoin(Category, Category.id == DailyRollup.category_id)
+        .outerjoin(parent, parent.id == Category.parent_id)
+        .group_by(month, DailyRollup.account_id, DailyRollup.category_id, DailyRollup.transaction_type)
+        .order_by(month, Account.name, label)
+    )
+    if start is not None:
+        query = query.where(DailyRollup.day >= start.date())
+    if end is not None:
+        query = query.where(DailyRollup.day < end.date())
+    if account_ids:
+        query = query.where(DailyRollup.account_id.in_(account_ids))
+    return query
+
+
+def stream(db, query, chunk=STREAM_CHUNK):
+    """Iterate over ``query`` results without materialising them all.
+
+    Args:
+        db (Session): Open database session
+        query (Select): Statement to run
+        chunk (int): Rows buffered per fetch
+
+    Yields:
+        Row: Result rows in query order
+    """
+    result = db.execute(query.execution_options(yield_per=chunk))
+    try:
+        for row in result:
+            yield row
+    finally:
+        result.close()
+
+
+def _plain(value):
+    """Convert a column value to something CSV/JSON can hold."""
+    if isinstance(value, datetime.datetime):
+        return value.isoformat(sep=" ")
+    if hasattr(value, "value"):
+        # Enum members are written by their display value
+        return value.value
+    return value
+
+
+def write_csv(rows, fields, file):
+    """Write rows as CSV with a header line; returns the row count."""
+    writer = csv.writer(file)
+    writer.writerow(fields)
+    count = 0
+    for row in rows:
+        writer.writerow([_plain(value) for value in row])
+        count += 1
+    return count
+
+
+def write_jsonl(rows, fields, file):
+    """Write one JSON object per row; returns the row count."""
+    count = 0
+    for row in rows:
+        record = {field: _plain(value) for field, value in zip(fields, row)}
+        file.write(json.dumps(record, ensure_ascii=False))
+        file.write("\n")
+        count += 1
+    return count
+
+
+def write_npz(rows, path):
+    """Write transactions as NumPy column arrays in an ``.npz`` archive.
+
+    Each column is streamed to its own temporary file as raw fixed-width
+    values, then wrapped in an ``.npy`` header inside the archive, so only
+    one chunk of rows is ever held in memory. Text columns are left out;
+    ``transaction_type`` is stored as an index into ``type_names``.
+
+    Args:
+        rows (iterable): Rows from ``transactions_query``
+        path (str): Destination ``.npz`` file
+
+    Returns:
+        int: Number of rows written
+    """
+    try:
+        import numpy as np
+    except ImportError:
+        raise RuntimeError("The npz format needs numpy (pip install numpy)")
+
+    from .database import TransactionType
+
+    type_names = [member.value for member in TransactionType]
+    type_codes = {member: code for code, member in enumerate(TransactionType)}
+    columns = {
+        "id": np.dtype("<i8"),
+        "date": np.dtype("<M8[s]"),
+        "amount": np.dtype("<f8"),
+        "transaction_type": np.dtype("i1"),
+        "account_id": np.dtype("<i8"),
+        "transfer_direction": np.dtype("i1"),
+    }
+
+    count = 0
+    with tempfile.TemporaryDirectory() as scratch:
+        files = {name: open(os.path.join(scratch, name), "wb") for name in columns}
+        try:
+            buffer = []
+            for row in rows:
+                buffer.append(row)
+                if len(buffer) >= STREAM_CHUNK:
+                    count += _flush_columns(np, buffer, files, columns, type_codes)
+                    buffer = []
+            if buffer:
+                count += _flush_columns(np, buffer, files, columns, type_codes)
+        finally:
+            for file in files.values():
+                file.close()
+
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_STORED, allowZip64=True) as archive:
+            for name, dtype in columns.items():
+                with archive.open(f"{name}.npy", "w", force_zip64=True) as entry:
+                    np.lib.format.write_array_header_1_0(
+                        entry,
+                        {"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": False, "shape": (count,)},
+                    )
+                    with open(os.path.join(scratch, name), "rb") as source:
+                        shutil.copyfileobj(source, entry)
+            with archive.open("type_names.npy", "w") as entry:
+                np.lib.format.write_array(entry, np.array(type_names))
+    return count
+
+
+def _flush_columns(np, rows, files, columns, type_codes):
+    data = {
+        "id": [row[0] for row in rows],
+        "date": [row[1] for row in rows],
+        "amount": [row[3] or 0.0 for row in rows],
+        "transaction_type": [type_codes.get(row[4], -1) for row in rows],
+        "account_id": [row[6] if row[6] is not None else -1 for row in rows],
+        "transfer_direction": [row[8] or 0 for row in rows],
+    }
+    for name, dtype in columns.items():
+        files[name].write(np.asarray(data[name], dtype=dtype).tobytes())
+    return len(rows)
+
+
+def export(db, output, file_format, report="transactions", start=None, end=None, account_ids=None):
+    """Stream an export to ``output``.
+
+    Args:
+        db (Session): Open database session
+        output: Open text file for csv/jsonl, or a path for npz
+        file_format (str): One of ``FORMATS``
+        report (str): ``transactions`` or ``monthly``
+        start (datetime): Inclusive lower bound on the date
+        end (datetime): Exclusive upper bound on the date
+        account_ids (list): Restrict to these accounts
+
+    Returns:
+        int: Number of rows written
+    """
+    if report == "monthly":
+        if file_format == "npz":
+            raise ValueError("The monthly report is only available as csv or jsonl")
+        query, fields = monthly_query(start, end, account_ids), MONTHLY_FIELDS
+    else:
+        query, fields = transactions_query(start, end, account_ids), TRANSACTION_FIELDS
+
+    rows = stream(db, query)
+    if file_format == "csv":
+        return write_csv(rows, fields, output)
+    if file_format == "jsonl":
+        return write_jsonl(rows, fields, output)
+    if file_format == "npz":
+        return write_npz(rows, output)
+    raise ValueError(f"Unsupported format {file_format!r}")
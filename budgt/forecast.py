@@ -0,0 +1,155 @@
+"""Cash-flow forecast per account for Budgt.sh.
+
+Each account's balance is projected for the next ``days`` days from:
+
+- its current materialized balance (``account_balances``)
+- recurring income and expenses detected by ``budgt.recurring``, placed on
+  their expected dates
+- average discretionary spend: the account's expenses over the last
+  ``DISCRETIONARY_DAYS`` that recurring charges do not explain, spread
+  evenly over every projected day
+
+Daily changes are filled into an (accounts x days) matrix with
+``np.add.at`` and turned into balances with one ``np.cumsum`` along the day
+axis, so no Python loop runs per day or per account-day. Irregular income is
+not projected, which keeps the forecast on the cautious side.
+"""
+
+from collections import namedtuple
+from datetime import date, timedelta
+
+import numpy as np
+from sqlalchemy import func, select
+
+from . import recurring
+from .balances import AccountBalanceStore
+from .database import DailyRollup, TransactionType
+
+# Horizons offered by the insights panel and the CLI, in days
+HORIZONS = (30, 90)
+# History used for the average discretionary spend
+DISCRETIONARY_DAYS = 90
+
+Forecast = namedtuple(
+    "Forecast",
+    [
+        # First projected day (tomorrow)
+        "start",
+        "days",
+        # AccountBalance tuples, one per row of ``balances``
+        "accounts",
+        # (accounts, days + 1) array; column 0 holds today's balance
+        "balances",
+        # Average discretionary spend per day, per account
+        "discretionary",
+    ],
+)
+
+
+def _expense_totals(db, start, end):
+    """Total expenses per account over ``[start, end)`` from the rollups."""
+    return dict(
+        db.execute(
+            select(DailyRollup.account_id, func.sum(DailyRollup.total))
+            .where(
+                DailyRollup.transaction_type == TransactionType.EXPENSE,
+                DailyRollup.day >= start,
+                DailyRollup.day < end,
+            )
+            .group_by(DailyRollup.account_id)
+        ).all()
+    )
+
+
+def project(balances, discretionary, events, days):
+    """Project balances from daily flows.
+
+    Args:
+        balances (ndarray): Current balance per account
+        discretionary (ndarray): Spend per day per account
+        events (tuple): ``(rows, offsets, amounts)`` arrays of dated flows,
+            with offsets counted from the first projected day
+        days (int): Number of days to project
+
+    Returns:
+        ndarray: (accounts, days + 1) balances, today's first
+    """
+    flows = np.repeat(-discretionary[:, None], days, axis=1)
+    rows, offsets, amounts = events
+    np.add.at(flows, (rows, offsets), amounts)
+    projected = np.empty((len(balances), days + 1))
+    projected[:, 0] = balances
+    np.cumsum(flows, axis=1, out=projected[:, 1:])
+    projected[:, 1:] += balances[:, None]
+    return projected
+
+
+def forecast(db, days=30, today=None):
+    """Forecast every account's balance for the next ``days`` days.
+
+    Args:
+        db (Session): Open database session
+        days (int): Horizon in days
+        today (date): Last day already on the books (defaults to today)
+
+    Returns:
+        Forecast: Projected balances and the inputs behind them
+    """
+    today = today or date.today()
+    start = today + timedelta(days=1)
+    until = start + timedelta(days=days)
+    accounts = list(AccountBalanceStore.read(db))
+    rows = {account.account_id: index for index, account in enumerate(accounts)}
+
+    event_rows, offsets, amounts = [], [], []
+    # Recurring expenses per account over the discretionary window
+    explained = np.zeros(len(accounts))
+    for transaction_type, sign in ((TransactionType.INCOME, 1.0), (TransactionType.EXPENSE, -1.0)):
+        for charge in recurring.detect_cached(db, today, transaction_type):
+            row = rows.get(charge.account_id)
+            if row is None:
+                continue
+            if transaction_type == TransactionType.EXPENSE:
+                explained[row] += charge.amount * DISCRETIONARY_DAYS / charge.period_days
+            for expected in recurring.schedule(charge, until):
+                event_rows.append(row)
+                offsets.append(max((expected - start).days, 0))
+                amounts.append(sign * charge.amount)
+
+    spent = _expense_totals(db, today - timedelta(days=DISCRETIONARY_DAYS - 1), start)
+    recent = np.array([spent.get(account.account_id) or 0.0 for account in accounts])
+    discretionary = np.maximum(recent - explained, 0.0) / DISCRETIONARY_DAYS
+
+    balances = np.array([account.balance or 0.0 for account in accounts])
+    events = (
+        np.array(event_rows, dtype=np.intp),
+        np.array(offsets, dtype=np.intp),
+        np.array(amounts, dtype=float),
+    )
+    return Forecast(start, days, accounts, project(balances, discretionary, events, days), discretionary)
+
+
+def to_json(result):
+    """Plain-data form of a ``Forecast`` for ``budgt forecast --json``."""
+    accounts = []
+    for account, series, discretionary in zip(result.accounts, result.balances, result.discretionary):
+        lowest = int(np.argmin(series))
+        accounts.append(
+            {
+                "id": account.account_id,
+                "name": account.name,
+                "balance": round(float(series[0]), 2),
+                "projected": round(float(series[-1]), 2),
+                "lowest": round(float(series[lowest]), 2),
+                "lowest_date": (result.start + timedelta(days=lowest - 1)).isoformat(),
+                "discretionary_per_day": round(float(discretionary), 2),
+                "daily": [round(value, 2) for value in series[1:].tolist()],
+            }
+        )
+    total = result.balances.sum(axis=0) if len(result.accounts) else np.zeros(result.days + 1)
+    return {
+        "start": result.start.isoformat(),
+        "days": result.days,
+        "accounts": accounts,
+        "total": [round(value, 2) for value in total[1:].tolist()],
+    }
@@ -0,0 +1,569 @@
+"""Bulk import of bank statements for Budgt.sh.
+
+Files are streamed through a generator pipeline (parse -> normalise -> hash ->
+batch) so memory stays flat however long the statement is. Each batch is
+inserted with a single ``executemany`` and the whole import runs in one
+database transaction. Rows whose content hash is already stored are skipped,
+so importing the same file twice adds nothing.
+"""
+
+import csv
+import datetime
+import functools
+import hashlib
+import re
+import sqlite3
+from collections import OrderedDict, namedtuple
+
+from sqlalchemy import insert, select
+
+from . import anomalies, categories, rollups
+from .balances import AccountBalanceStore
+from .database import Account, Transaction, TransactionType
+
+BATCH_SIZE = 5000
+# Occurrence counters of identical rows kept in memory; days beyond this are
+# moved to a temporary on-disk database until the statement returns to them
+OCCURRENCE_LIMIT = 100000
+
+# SQLite's historical limit on bound parameters is 999
+_IN_CHUNK = 500
+
+# Amount is signed: positive for money in, negative for money out
+ImportRecord = namedtuple(
+    "ImportRecord", ["date", "description", "amount", "category", "external_id"]
+)
+
+ImportResult = namedtuple(
+    "ImportResult", ["inserted", "duplicates", "invalid", "errors"]
+)
+
+DATE_FORMATS = (
+    "%Y-%m-%d",
+    "%Y-%m-%d %H:%M:%S",
+    "%m/%d/%Y",
+    "%m/%d/%y",
+    "%d/%m/%Y",
+    "%d.%m.%Y",
+    "%Y/%m/%d",
+)
+
+# Header names tried, in order, when no CSV column mapping is given
+CSV_COLUMN_GUESSES = {
+    "date": ("date", "posted date", "transaction date", "booking date"),
+    "description": ("description", "payee", "name", "memo", "details"),
+    "amount": ("amount", "value"),
+    "debit": ("debit", "withdrawal", "money out"),
+    "credit": ("credit", "deposit", "money in"),
+    "category": ("category",),
+}
+
+
+class StatementError(ValueError):
+    """Raised when a file cannot be imported at all."""
+
+
+class RecordError(ValueError):
+    """Raised for a single unparseable record; the import continues."""
+
+
+@functools.lru_cache(maxsize=4096)
+def parse_date(value, date_format=None):
+    """Parse a statement date.
+
+    Statements repeat the same few dates over and over, so results are
+    cached.
+
+    Args:
+        value (str): Date text
+        date_format (str): Explicit ``strptime`` format, if known
+
+    Returns:
+        datetime.datetime: Parsed date
+    """
+    value = value.strip()
+    if date_format:
+        try:
+            return datetime.datetime.strptime(value, date_format)
+        except ValueError:
+            raise RecordError(f"Date {value!r} does not match {date_format!r}")
+    for candidate in DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(value, candidate)
+        except ValueError:
+            continue
+    raise RecordError(f"Unrecognised date {value!r}")
+
+
+def parse_amount(value):
+    """Parse an amount such as ``-1,234.50``, ``(12.00)`` or ``$5``."""
+    text = value.strip().replace(",", "").replace("$", "").replace(" ", "")
+    negative = text.startswith("(") and text.endswith(")")
+    text = text.strip("()")
+    if not text:
+        raise RecordError("Missing amount")
+    try:
+        amount = float(text)
+    except ValueError:
+        raise RecordError(f"Invalid amount {value!r}")
+    return -amount if negative else amount
+
+
+def read_csv(file, mapping=None, date_format=None, delimiter=","):
+    """Yield records from a CSV export.
+
+    Args:
+        file: Open text file
+        mapping (dict): Field -> column header for ``date``, ``description``,
+            ``amount`` (signed) or ``debit``/``credit``, and ``category``.
+            Missing fields are guessed from the header row.
+        date_format (str): Explicit ``strptime`` format for the date column
+        delimiter (str): Field delimiter
+
+    Yields:
+        ImportRecord or RecordError: One item per data line
+    """
+    reader = csv.reader(file, delimiter=delimiter)
+    header = next(reader, None)
+    if not header:
+        raise StatementError("CSV file has no header row")
+
+    positions = {name.strip().lower(): index for index, name in enumerate(header)}
+    columns = {}
+    for field, guesses in CSV_COLUMN_GUESSES.items():
+        wanted = (mapping or {}).get(field)
+        if wanted:
+            if wanted.strip().lower() not in positions:
+                raise StatementError(f"Column {wanted!r} not found in CSV header")
+            columns[field] = positions[wanted.strip().lower()]
+            continue
+        for guess in guesses:
+            if guess in positions:
+                columns[field] = positions[guess]
+                break
+
+    if "date" not in columns or "description" not in columns:
+        raise StatementError("CSV needs date and description columns (see --date-col)")
+    if "amount" not in columns and not ("debit" in columns or "credit" in columns):
+        raise StatementError("CSV needs an amount column or debit/credit columns")
+
+    date_index = columns["date"]
+    description_index = columns["description"]
+    amount_index = columns.get("amount")
+    debit_index = columns.get("debit")
+    credit_index = columns.get("credit")
+    category_index = columns.get("category")
+
+    for row in reader:
+        if not row:
+            continue
+        try:
+            if amount_index is not None:
+                amount = parse_amount(row[amount_index])
+            else:
+                credit = row[credit_index].strip() if credit_index is not None else ""
+                if credit:
+                    amount = parse_amount(credit)
+                else:
+                    amount = -abs(parse_amount(row[debit_index] if debit_index is not None else ""))
+            category = row[category_index].strip() if category_index is not None else None
+            yield ImportRecord(
+                parse_date(row[date_index], date_format),
+                row[description_index].strip(),
+                amount,
+                category or None,
+                None,
+            )
+        except IndexError:
+            yield RecordError(f"line {reader.line_num}: Missing columns")
+        except RecordError as e:
+            yield RecordError(f"line {reader.line_num}: {e}")
+
+
+_OFX_TAG = re.compile(r"<(/?)([A-Za-z0-9.]+)>([^<]*)")
+
+
+def read_ofx(file):
+    """Yield records from an OFX/QFX statement (SGML or XML flavour).
+
+    Only the fields Budgt stores are read from each ``<STMTTRN>`` block;
+    everything else is skipped while streaming.
+
+    Yields:
+        ImportRecord or RecordError: One item per statement transaction
+    """
+    current = None
+    for line in file:
+        for closing, tag, value in _OFX_TAG.findall(line):
+            tag = tag.upper()
+            if tag == "STMTTRN":
+                if closing and current is not None:
+                    yield _ofx_record(current)
+                    current = None
+                elif not closing:
+                    if current is not None:
+                        yield _ofx_record(current)
+                    current = {}
+            elif current is not None and not closing:
+                current[tag] = value.strip()
+    if current is not None:
+        yield _ofx_record(current)
+
+
+def _ofx_record(fields):
+    try:
+        posted = fields.get("DTPOSTED", "")
+        if len(posted) < 8:
+            raise RecordError(f"Invalid DTPOSTED {posted!r}")
+        date = datetime.datetime.strptime(posted[:8], "%Y%m%d")
+        description = fields.get("NAME") or fields.get("MEMO") or ""
+        return ImportRecord(
+            date,
+            description,
+            parse_amount(fields.get("TRNAMT", "")),
+            None,
+            fields.get("FITID") or None,
+        )
+    except RecordError as e:
+        return RecordError(f"transaction {fields.get('FITID', '?')}: {e}")
+
+
+def _qif_date(value):
+    # QIF dates look like 12/31/2024, 12/31'24 or 1/ 5/24
+    text = value.strip().replace(" ", "").replace("'", "/")
+    for candidate in ("%m/%d/%Y", "%m/%d/%y", "%d/%m/%Y", "%Y-%m-%d"):
+        try:
+            return datetime.datetime.strptime(text, candidate)
+        except ValueError:
+            continue
+    raise RecordError(f"Unrecognised date {value!r}")
+
+
+def read_qif(file):
+    """Yield records from a QIF export.
+
+    Yields:
+        ImportRecord or RecordError: One item per ``^``-terminated record
+    """
+    fields = {}
+    for line_number, line in enumerate(file, 1):
+        line = line.rstrip("\r\n")
+        if not line or line.startswith("!"):
+            continue
+        code, value = line[0], line[1:]
+        if code != "^":
+            fields.setdefault(code, value)
+            continue
+        try:
+            if "D" not in fields or ("T" not in fields and "U" not in fields):
+                raise RecordError("Record without date or amount")
+            yield ImportRecord(
+                _qif_date(fields["D"]),
+                (fields.get("P") or fields.get("M") or "").strip(),
+                parse_amount(fields.get("T") or fields["U"]),
+                fields.get("L") or None,
+                None,
+            )
+        except RecordError as e:
+            yield RecordError(f"record ending on line {line_number}: {e}")
+        fields = {}
+
+
+READERS = {"csv": read_csv, "ofx": read_ofx, "qfx": read_ofx, "qif": read_qif}
+
+
+def detect_format(path):
+    """Guess the file format from its extension."""
+    extension = path.rsplit(".", 1)[-1].lower() if "." in path else ""
+    if extension not in READERS:
+        raise StatementError(f"Cannot detect format of {path!r}; pass --format")
+    return extension
+
+
+class _Occurrences:
+    """Per-file counters of identical rows, grouped by day, in bounded memory.
+
+    Days are kept in least recently used order. Once more than ``limit``
+    counters are held, the days used least recently move to a private
+    temporary SQLite database, and rows of those days are counted there from
+    then on. A statement sorted by date never goes back to a moved day.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.days = OrderedDict()
+        self.size = 0
+        self.spilled = set()
+        self._spill = None
+
+    def next(self, day, base):
+        """Return how many times ``base`` was already seen on ``day`` and count it."""
+        if day in self.spilled:
+            # One upsert on the primary key; the new count includes this row
+            (count,) = self._spill.execute(
+                "INSERT INTO seen VALUES (?, ?, 1) "
+                "ON CONFLICT (day, base) DO UPDATE SET count = count + 1 RETURNING count",
+                (day, base),
+            ).fetchone()
+            return count - 1
+        counts = self.days.get(day)
+        if counts is None:
+            counts = self.days[day] = {}
+        else:
+            self.days.move_to_end(day)
+        occurrence = counts.get(base, 0)
+        counts[base] = occurrence + 1
+        if not occurrence:
+            self.size += 1
+            self._evict()
+        return occurrence
+
+    def close(self):
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+
+    def _evict(self):
+        # The current day always stays in memory
+        while self.size > self.limit and len(self.days) > 1:
+            day, counts = self.days.popitem(last=False)
+            self.size -= len(counts)
+            if self._spill is None:
+                # An empty name is a private database deleted on close
+                self._spill = sqlite3.connect("")
+                self._spill.execute("CREATE TABLE seen (day TEXT, base TEXT, count INTEGER, PRIMARY KEY (day, base))")
+            self._spill.executemany(
+                "INSERT INTO seen VALUES (?, ?, ?)", [(day, base, count) for base, count in counts.items()]
+            )
+            self.spilled.add(day)
+
+
+def hash_records(records, account_id):
+    """Attach a content hash to each record for duplicate detection.
+
+    OFX transactions are identified by their FITID. Other rows hash their
+    account, date, amount and description plus an occurrence counter, so two
+    identical purchases on the same day stay distinct while a re-import of
+    the same file produces the same hashes. Statements are not always sorted
+    by date, so the counters of every day are kept for the whole file; past
+    ``OCCURRENCE_LIMIT`` counters they move to a temporary file, which keeps
+    memory flat on long statements.
+
+    Yields:
+        tuple: ``(hash, ImportRecord)`` or ``(None, RecordError)``
+    """
+    occurrences = _Occurrences(OCCURRENCE_LIMIT)
+    try:
+        for record in records:
+            if isinstance(record, RecordError):
+                yield None, record
+                continue
+            if record.external_id:
+                key = f"{account_id}|fitid|{record.external_id}"
+            else:
+                day = record.date.isoformat()
+                base = f"{record.amount:.2f}|{' '.join(record.description.lower().split())}"
+                occurrence = occurrences.next(day, base)
+                key = f"{account_id}|{day}|{base}|{occurrence}"
+            yield hashlib.sha1(key.encode("utf-8")).hexdigest(), record
+    finally:
+        occurrences.close()
+
+
+def batched(items, size=BATCH_SIZE):
+    """Group an iterable into lists of at most ``size`` items."""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# Columns written by the importer, in statement order
+_INSERT_COLUMNS = (
+    "date",
+    "description",
+    "amount",
+    "transaction_type",
+    "account_id",
+    "category",
+    "category_id",
+    "import_hash",
+)
+
+
+class _BatchWriter:
+    """Inserts batches with a single driver-level ``executemany``.
+
+    The INSERT is compiled once from the Core table, and values are converted
+    with the dialect's own bind processors, so stored rows are identical to
+    ORM-written ones. Dates and types repeat heavily in statements, so their
+    converted values are memoised.
+    """
+
+    def __init__(self, db):
+        self.connection = db.connection()
+        dialect = self.connection.dialect
+        table = Transaction.__table__
+        self.sql = str(
+            insert(table).compile(dialect=dialect, column_keys=list(_INSERT_COLUMNS))
+        )
+        self.convert_date = functools.lru_cache(maxsize=4096)(
+            self._processor(table.c.date, dialect)
+        )
+        convert_type = self._processor(table.c.transaction_type, dialect)
+        self.income = convert_type(TransactionType.INCOME)
+        self.expense = convert_type(TransactionType.EXPENSE)
+        # Statement categories repeat heavily; resolve each label once
+        self.category_ids = {}
+
+    @staticmethod
+    def _processor(column, dialect):
+        processor = column.type.dialect_impl(dialect).bind_processor(dialect)
+        return processor or (lambda value: value)
+
+    def write(self, rows):
+        """Insert ``(hash, ImportRecord, account_id)`` tuples.
+
+        The batch is also added to the rollup tables and the anomaly detector
+        in the same transaction.
+        """
+        params = []
+        entries = []
+        for content_hash, record, account_id in rows:
+            transaction_type = TransactionType.INCOME if record.amount >= 0 else TransactionType.EXPENSE
+            category_id = categories.resolve(self.connection, record.category, self.category_ids)
+            params.append(
+                (
+                    self.convert_date(record.date),
+                    record.description[:200],
+                    abs(record.amount),
+                    self.income if transaction_type is TransactionType.INCOME else self.expense,
+                    account_id,
+                    record.category,
+                    category_id,
+                    content_hash,
+                )
+            )
+            entries.append(
+                rollups.RollupEntry(
+                    record.date, account_id, category_id, transaction_type, abs(record.amount)
+                )
+            )
+        self.connection.exec_driver_sql(self.sql, params)
+        rollups.record(self.connection, entries)
+        # This transaction holds the write lock, so the batch took the
+        # consecutive ids ending at the current maximum
+        last_id = self.connection.exec_driver_sql("SELECT MAX(id) FROM transactions").scalar()
+        first_id = last_id - len(entries) + 1
+        anomalies.record(
+            self.connection,
+            (
+                anomalies.Observation(
+                    first_id + index, entry.date, entry.category_id, entry.transaction_type, entry.amount
+                )
+                for index, entry in enumerate(entries)
+            ),
+        )
+
+
+def _existing_hashes(db, hashes):
+    existing = set()
+    for start in range(0, len(hashes), _IN_CHUNK):
+        chunk = hashes[start:start + _IN_CHUNK]
+        existing.update(
+            db.execute(
+                select(Transaction.import_hash).where(Transaction.import_hash.in_(chunk))
+            ).scalars()
+        )
+    return existing
+
+
+def import_records(db, records, account_id, batch_size=BATCH_SIZE, max_errors=20):
+    """Insert parsed records into an account in batches.
+
+    Everything runs inside the caller's session transaction, which is
+    committed once at the end. The account's materialized balance is moved
+    by the net of the inserted rows in the same transaction.
+
+    Args:
+        db (Session): Open database session
+        records (iterable): ``ImportRecord`` / ``RecordError`` items
+        account_id (int): Account receiving the transactions
+        batch_size (int): Rows per ``executemany``
+        max_errors (int): Number of error messages kept for reporting
+
+    Returns:
+        ImportResult: Counts of inserted, duplicate and invalid rows
+    """
+    inserted = duplicates = invalid = 0
+    errors = []
+    net_change = 0.0
+    writer = _BatchWriter(db)
+
+    try:
+        for batch in batched(hash_records(records, account_id), batch_size):
+            valid = []
+            for content_hash, record in batch:
+                if content_hash is None:
+                    invalid += 1
+                    if len(errors) < max_errors:
+                        errors.append(str(record))
+                    continue
+                valid.append((content_hash, record))
+
+            existing = _existing_hashes(db, [content_hash for content_hash, _ in valid])
+            rows = []
+            for content_hash, record in valid:
+                if content_hash in existing:
+                    duplicates += 1
+                    continue
+                existing.add(content_hash)
+                rows.append((content_hash, record, account_id))
+                net_change += record.amount
+
+            if rows:
+                writer.write(rows)
+                inserted += len(rows)
+
+        if inserted:
+            AccountBalanceStore.apply(db, account_id, net_change)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    return ImportResult(inserted, duplicates, invalid, errors)
+
+
+def import_file(db, path, account_name, file_format=None, **csv_options):
+    """Import a statement file into the named account.
+
+    Args:
+        db (Session): Open database session
+        path (str): File to import
+        account_name (str): Name of the receiving account
+        file_format (str): ``csv``, ``ofx``, ``qfx`` or ``qif`` (guessed from
+            the extension when omitted)
+        **csv_options: ``mapping``, ``date_format`` and ``delimiter`` for CSV
+
+    Returns:
+        ImportResult: Counts of inserted, duplicate and invalid rows
+    """
+    account = db.query(Account).filter(Account.name == account_name).first()
+    if account is None:
+        raise StatementError(f"Account {account_name!r} does not exist")
+
+    file_format = (file_format or detect_format(path)).lower()
+    if file_format not in READERS:
+        raise StatementError(f"Unsupported format {file_format!r}")
+
+    with open(path, "r", newline="", encoding="utf-8-sig", errors="replace") as file:
+        if file_format == "csv":
+            records = read_csv(file, **csv_options)
+        else:
+            records = READERS[file_format](file)
+        return import_records(db, records, account.id)
@@ -0,0 +1,182 @@
+"""Transaction listing for Budgt.sh.
+
+The transactions panel is filled one page at a time using keyset pagination
+on ``(date, id)``, so opening the app costs the same whether the ledger holds
+a hundred rows or a million.
+"""
+
+from collections import namedtuple
+
+from sqlalchemy import and_, or_, select
+
+from .database import TRANSFER_OUT, Account, Transaction, TransactionType
+
+# Rows fetched per page, and how close to the last loaded row the cursor may
+# get before the next page is fetched
+PAGE_SIZE = 100
+PREFETCH_MARGIN = 25
+
+LedgerRow = namedtuple(
+    "LedgerRow",
+    [
+        "id",
+        "date",
+        "description",
+        "amount",
+        "transaction_type",
+        "category",
+        "account_name",
+        "transfer_direction",
+    ],
+)
+
+
+def row_key(row):
+    """Return the stable DataTable row key for a ``LedgerRow``."""
+    return f"txn-{row.id}"
+
+
+def from_transaction(transaction, account_name):
+    """Build a ``LedgerRow`` from a flushed ``Transaction``.
+
+    Args:
+        transaction (Transaction): Transaction with its id and date assigned
+        account_name (str): Name of the transaction's account
+
+    Returns:
+        LedgerRow: Row ready to be formatted for the transactions table
+    """
+    return LedgerRow(
+        transaction.id,
+        transaction.date,
+        transaction.description,
+        transaction.amount,
+        transaction.transaction_type,
+        transaction.category,
+        account_name,
+        transaction.transfer_direction,
+    )
+
+
+def fetch_page(db, after=None, limit=PAGE_SIZE):
+    """Fetch one page of transactions, newest first.
+
+    Args:
+        db (Session): Open database session
+        after (tuple): ``(date, id)`` of the last row already loaded, or None
+            for the first page
+        limit (int): Maximum number of rows to return
+
+    Returns:
+        list: ``LedgerRow`` tuples ordered by date then id, descending
+    """
+    query = (
+        select(
+            Transaction.id,
+            Transaction.date,
+            Transaction.description,
+            Transaction.amount,
+            Transaction.transaction_type,
+            Transaction.category,
+            Account.name,
+            Transaction.transfer_direction,
+        )
+        .outerjoin(Account, Account.id == Transaction.account_id)
+        .order_by(Transaction.date.desc(), Transaction.id.desc())
+        .limit(limit)
+    )
+    if after is not None:
+        after_date, after_id = after
+        query = query.where(
+            or_(
+                Transaction.date < after_date,
+                and_(Transaction.date == after_date, Transaction.id < after_id),
+            )
+        )
+    return [LedgerRow(*row) for row in db.execute(query).all()]
+
+
+def format_row(row):
+    """Format a ``LedgerRow`` as the cells of the transactions table.
+
+    Args:
+        row (LedgerRow): Transaction to format
+
+    Returns:
+        list: Date, description, amount, type, category and account cells
+    """
+    date_str = row.date.strftime("%m/%d")
+
+    # Format amount with currency and sign
+    amount_str = f"${row.amount:.2f}"
+    type_str = ""
+    if row.transaction_type == TransactionType.INCOME:
+        amount_str = f"+{amount_str}"
+        type_str = "💰 Income"
+    elif row.transaction_type == TransactionType.EXPENSE:
+        amount_str = f"-{amount_str}"
+        type_str = "💸 Expense"
+    elif row.transaction_type == TransactionType.TRANSFER:
+        if row.transfer_direction == TRANSFER_OUT:
+            amount_str = f"-{amount_str}"
+            type_str = "🔄 Transfer Out"
+        else:
+            amount_str = f"+{amount_str}"
+            type_str = "🔄 Transfer In"
+
+    return [
+        date_str,
+        row.description,
+        amount_str,
+        type_str,
+        row.category if row.category else "Uncategorized",
+        row.account_name if row.account_name else "Unknown",
+    ]
+
+
+class TransactionPager:
+    """Tracks the keyset cursor of the rows loaded into the transactions table."""
+
+    def __init__(self, page_size=PAGE_SIZE):
+        self.page_size = page_size
+        self.reset()
+
+    def reset(self):
+        """Forget the loaded window and start again from the newest row."""
+        self.cursor = None
+        self.loaded = 0
+        self.exhausted = False
+
+    def next_page(self, db):
+        """Fetch the page following the rows already loaded.
+
+        Args:
+            db (Session): Open database session
+
+        Returns:
+            list: ``LedgerRow`` tuples; empty once the history is exhausted
+        """
+        if self.exhausted:
+            return []
+        rows = fetch_page(db, self.cursor, self.page_size)
+        if len(rows) < self.page_size:
+            self.exhausted = True
+        if rows:
+            self.cursor = (rows[-1].date, rows[-1].id)
+            self.loaded += len(rows)
+        return rows
+
+    def covers(self, row):
+        """Return True if a newly written row belongs in the loaded window.
+
+        Rows older than the window are left for a later page, which the
+        keyset cursor will reach naturally.
+
+        Args:
+            row (LedgerRow): Newly inserted transaction
+        """
+        return self.cursor is None or self.exhausted or (row.date, row.id) >= self.cursor
+
+    def wants_more(self, cursor_row):
+        """Return True when ``cursor_row`` is within the prefetch margin."""
+        return not self.exhausted and cursor_row >= self.loaded - PREFETCH_MARGIN
@@ -0,0 +1,18 @@
+"""Messages exchanged between Budgt.sh screens and the main app."""
+
+from textual.message import Message
+
+
+class LedgerChanged(Message):
+    """Posted after a write commits, carrying only what changed.
+
+    Args:
+        rows (list): ``LedgerRow`` tuples for newly inserted transactions
+        balances (list): ``AccountBalance`` tuples for accounts whose balance
+            changed (or that were just created)
+    """
+
+    def __init__(self, rows=None, balances=None):
+        super().__init__()
+        self.rows = list(rows or [])
+        self.balances = list(balances or [])
@@ -0,0 +1,349 @@
+"""Versioned schema migrations for Budgt.sh.
+
+``Base.metadata.create_all`` creates missing tables but never alters existing
+ones, so every change to an existing table ships here as a numbered
+migration. The schema version lives in SQLite's ``PRAGMA user_version`` and
+pending migrations run in order from ``init_db``.
+
+``init_db`` skips ``create_all`` entirely once a database is at the head
+version, so a new table also needs a migration that creates it.
+
+Migrations are frozen snapshots: they use plain SQL rather than the current
+models so they keep working as the models evolve.
+"""
+
+import logging
+
+MIGRATIONS = []
+
+
+def migration(version, description):
+    """Register a migration function under ``version``.
+
+    Args:
+        version (int): Schema version reached once the migration has run
+        description (str): One-line summary shown in logs
+    """
+    def register(func):
+        MIGRATIONS.append((version, description, func))
+        MIGRATIONS.sort(key=lambda entry: entry[0])
+        return func
+    return register
+
+
+def get_version(connection):
+    """Return the schema version recorded in the database."""
+    return connection.exec_driver_sql("PRAGMA user_version").scalar() or 0
+
+
+def set_version(connection, version):
+    """Record ``version`` as the database schema version."""
+    connection.exec_driver_sql(f"PRAGMA user_version = {int(version)}")
+
+
+def head_version():
+    """Return the version reached once every migration has run."""
+    return MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+
+def has_column(connection, table, column):
+    """Return True if ``table`` already has ``column``."""
+    rows = connection.exec_driver_sql(f"PRAGMA table_info({table})").all()
+    return any(row[1] == column for row in rows)
+
+
+def is_fresh(connection):
+    """Return True if the database has no Budgt tables yet."""
+    row = connection.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'transactions'"
+    ).first()
+    return row is None
+
+
+def migrate(engine):
+    """Apply every pending migration in order.
+
+    Args:
+        engine (Engine): Engine bound to the database to upgrade
+
+    Returns:
+        list: Versions that were applied
+    """
+    applied = []
+    with engine.begin() as connection:
+        current = get_version(connection)
+    for version, description, func in MIGRATIONS:
+        if version <= current:
+            continue
+        logging.info("Applying schema migration %s: %s", version, description)
+        with engine.begin() as connection:
+            func(connection)
+            set_version(connection, version)
+        applied.append(version)
+    return applied
+
+
+@migration(1, "Index transactions on (date, id) for keyset pagination")
+def _index_date_id(connection):
+    connection.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_transactions_date_id "
+        "ON transactions (date, id)"
+    )
+
+
+@migration(2, "Covering indexes for balance and insights queries")
+def _covering_indexes(connection):
+    # Per-account balance aggregation filters on account and type and sums
+    # the amount
+    connection.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_transactions_account_type "
+        "ON transactions (account_id, transaction_type, amount)"
+    )
+    # Insights filter on type and a date range and sum the amount
+    connection.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_transactions_type_date "
+        "ON transactions (transaction_type, date, amount)"
+    )
+
+
+@migration(3, "Content hash column for duplicate-free statement imports")
+def _import_hash(connection):
+    if not has_column(connection, "transactions", "import_hash"):
+        connection.exec_driver_sql(
+            "ALTER TABLE transactions ADD COLUMN import_hash VARCHAR"
+        )
+    connection.exec_driver_sql(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_transactions_import_hash "
+        "ON transactions (import_hash)"
+    )
+
+
+@migration(4, "Explicit transfer direction instead of matching descriptions")
+def _transfer_direction(connection):
+    if not has_column(connection, "transactions", "transfer_direction"):
+        connection.exec_driver_sql(
+            "ALTER TABLE transactions ADD COLUMN transfer_direction INTEGER"
+        )
+    # Backfill from the pair links: the outgoing leg is always inserted
+    # first, so it has the lower id. Legs without a pair in another account
+    # never moved a balance and get 0.
+    connection.exec_driver_sql(
+        "UPDATE transactions SET transfer_direction = COALESCE(("
+        "  SELECT CASE"
+        "    WHEN pair.account_id = transactions.account_id THEN 0"
+        "    WHEN transactions.id < pair.id THEN -1"
+        "    ELSE 1 END"
+        "  FROM transactions AS pair"
+        "  WHERE pair.id = transactions.transfer_pair_id"
+        "), 0) "
+        "WHERE transaction_type = 'TRANSFER'"
+    )
+    # The balance index now covers the direction as well
+    connection.exec_driver_sql("DROP INDEX IF EXISTS ix_transactions_account_type")
+    connection.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_transactions_account_balance "
+        "ON transactions (account_id, transaction_type, amount, transfer_direction)"
+    )
+
+
+def _category_id(connection, parent_id, name):
+    row = connection.exec_driver_sql(
+        "SELECT id FROM categories WHERE parent_id IS ? AND name = ?",
+        (parent_id, name),
+    ).first()
+    if row is not None:
+        return row[0]
+    return connection.exec_driver_sql(
+        "INSERT INTO categories (parent_id, name) VALUES (?, ?)",
+        (parent_id, name),
+    ).lastrowid
+
+
+@migration(5, "Normalized categories table referenced by transactions.category_id")
+def _categories(connection):
+    connection.exec_driver_sql(
+        "CREATE TABLE IF NOT EXISTS categories ("
+        "id INTEGER NOT NULL PRIMARY KEY, "
+        "parent_id INTEGER REFERENCES categories (id), "
+        "name VARCHAR NOT NULL, "
+        "color VARCHAR, "
+        "nature VARCHAR)"
+    )
+    connection.exec_driver_sql(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_categories_parent_name "
+        "ON categories (parent_id, name)"
+    )
+    if not has_column(connection, "transactions", "category_id"):
+        connection.exec_driver_sql(
+            "ALTER TABLE transactions ADD COLUMN category_id INTEGER "
+            "REFERENCES categories (id)"
+        )
+
+    # Map every distinct "Parent > Child" string to a category row; colours
+    # and natures are filled in by the YAML sync that follows migrations
+    labels = connection.exec_driver_sql(
+        "SELECT DISTINCT category FROM transactions "
+        "WHERE category IS NOT NULL AND category != ''"
+    ).scalars().all()
+    mapping = []
+    for label in labels:
+        parent, _, child = label.partition(">")
+        category_id = _category_id(connection, None, parent.strip())
+        if child.strip():
+            category_id = _category_id(connection, category_id, child.strip())
+        mapping.append((label, category_id))
+
+    connection.exec_driver_sql(
+        "CREATE TEMP TABLE category_map (label VARCHAR PRIMARY KEY, id INTEGER)"
+    )
+    if mapping:
+        connection.exec_driver_sql("INSERT INTO category_map VALUES (?, ?)", mapping)
+    connection.exec_driver_sql(
+        "UPDATE transactions SET category_id = "
+        "(SELECT id FROM category_map WHERE label = transactions.category) "
+        "WHERE category IS NOT NULL"
+    )
+    connection.exec_driver_sql("DROP TABLE category_map")
+
+    # Range aggregations can now group by category from the covering index
+    connection.exec_driver_sql("DROP INDEX IF EXISTS ix_transactions_type_date")
+    connection.exec_driver_sql(
+        "CREATE INDEX ix_transactions_type_date "
+        "ON transactions (transaction_type, date, category_id, amount)"
+    )
+    connection.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_transactions_category "
+        "ON transactions (category_id, date)"
+    )
+
+
+@migration(6, "Category closure table and inherited natures for rollups")
+def _category_closure(connection):
+    connection.exec_driver_sql(
+        "CREATE TABLE IF NOT EXISTS category_closure ("
+        "ancestor_id INTEGER NOT NULL REFERENCES categories (id), "
+        "descendant_id INTEGER NOT NULL REFERENCES categories (id), "
+        "depth INTEGER NOT NULL, "
+        "PRIMARY KEY (ancestor_id, descendant_id))"
+    )
+    connection.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_category_closure_descendant "
+        "ON category_closure (descendant_id, ancestor_id)"
+    )
+    if not has_column(connection, "categories", "effective_nature"):
+        connection.exec_driver_sql(
+            "ALTER TABLE categories ADD COLUMN effective_nature VARCHAR"
+        )
+    # The closure itself is filled by the category sync that follows
+    connection.exec_driver_sql("DROP INDEX IF EXISTS ix_transactions_category")
+    connection.exec_driver_sql(
+        "CREATE INDEX ix_transactions_category "
+        "ON transactions (category_id, transaction_type, date, amount)"
+    )
+
+
+@migration(7, "Daily and monthly rollup tables for insights and reports")
+def _rollups(connection):
+    for table, period in (("daily_rollups", "day"), ("monthly_rollups", "month")):
+        connection.exec_driver_sql(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            f"{period} DATE NOT NULL, "
+            "account_id INTEGER NOT NULL, "
+            "category_id INTEGER NOT NULL, "
+            "transaction_type VARCHAR(8) NOT NULL, "
+            "total FLOAT NOT NULL, "
+            "count INTEGER NOT NULL, "
+            f"PRIMARY KEY ({period}, account_id, category_id, transaction_type))"
+        )
+        connection.exec_driver_sql(
+            f"CREATE INDEX IF NOT EXISTS ix_{table}_type_{period} "
+            f"ON {table} (transaction_type, {period}, category_id, total)"
+        )
+        connection.exec_driver_sql(f"DELETE FROM {table}")
+    connection.exec_driver_sql(
+        "INSERT INTO daily_rollups "
+        "(day, account_id, category_id, transaction_type, total, count) "
+        "SELECT date(date), COALESCE(account_id, 0), COALESCE(category_id, 0), "
+        "transaction_type, SUM(amount), COUNT(*) "
+        "FROM transactions GROUP BY 1, 2, 3, 4"
+    )
+    connection.exec_driver_sql(
+        "INSERT INTO monthly_rollups "
+        "(month, account_id, category_id, transaction_type, total, count) "
+        "SELECT strftime('%Y-%m-01', day), account_id, category_id, transaction_type, "
+        "SUM(total), SUM(count) "
+        "FROM daily_rollups GROUP BY 1, 2, 3, 4"
+    )
+
+
+@migration(8, "Rewrite counter and triggers for the columnar ledger cache")
+def _ledger_state(connection):
+    connection.exec_driver_sql(
+        "CREATE TABLE IF NOT EXISTS ledger_state ("
+        "id INTEGER NOT NULL PRIMARY KEY, "
+        "rewrites INTEGER NOT NULL)"
+    )
+    connection.exec_driver_sql("INSERT OR IGNORE INTO ledger_state (id, rewrites) VALUES (1, 0)")
+    connection.exec_driver_sql(
+        "CREATE TRIGGER IF NOT EXISTS transactions_rewrite_update "
+        "AFTER UPDATE OF date, amount, transaction_type, account_id, category_id, transfer_direction "
+        "ON transactions BEGIN UPDATE ledger_state SET rewrites = rewrites + 1; END"
+    )
+    connection.exec_driver_sql(
+        "CREATE TRIGGER IF NOT EXISTS transactions_rewrite_delete "
+        "AFTER DELETE ON transactions BEGIN UPDATE ledger_state SET rewrites = rewrites + 1; END"
+    )
+
+
+@migration(9, "Running category statistics and anomalies for spending alerts")
+def _anomalies(connection):
+    connection.exec_driver_sql(
+        "CREATE TABLE IF NOT EXISTS category_stats ("
+        "category_id INTEGER NOT NULL PRIMARY KEY, "
+        "count INTEGER NOT NULL, "
+        "mean FLOAT NOT NULL, "
+        "variance FLOAT NOT NULL, "
+        "week DATE, "
+        "week_total FLOAT NOT NULL, "
+        "weeks INTEGER NOT NULL, "
+        "week_mean FLOAT NOT NULL, "
+        "week_variance FLOAT NOT NULL)"
+    )
+    connection.exec_driver_sql(
+        "CREATE TABLE IF NOT EXISTS anomalies ("
+        "id INTEGER NOT NULL PRIMARY KEY, "
+        "kind VARCHAR NOT NULL, "
+        "category_id INTEGER NOT NULL, "
+        "period DATE NOT NULL, "
+        "transaction_id INTEGER NOT NULL, "
+        "amount FLOAT NOT NULL, "
+        "expected FLOAT NOT NULL, "
+        "zscore FLOAT NOT NULL, "
+        "detected_at DATETIME)"
+    )
+    connection.exec_driver_sql(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_anomalies_key "
+        "ON anomalies (kind, category_id, period, transaction_id)"
+    )
+    connection.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_anomalies_period ON anomalies (period)")
+    # The running statistics cannot be computed in SQL; init_db replays the
+    # existing history through the detector once the migrations are done
+
+
+@migration(10, "Key/value application state (category sync fingerprint)")
+def _app_state(connection):
+    connection.exec_driver_sql(
+        "CREATE TABLE IF NOT EXISTS app_state ("
+        "key VARCHAR NOT NULL PRIMARY KEY, "
+        "value VARCHAR)"
+    )
+
+
+@migration(11, "Count description edits as ledger rewrites (cached merchant codes)")
+def _description_rewrites(connection):
+    connection.exec_driver_sql("DROP TRIGGER IF EXISTS transactions_rewrite_update")
+    connection.exec_driver_sql(
+        "CREATE TRIGGER transactions_rewrite_update "
+        "AFTER UPDATE OF date, amount, transaction_type, account_id, category_id, transfer_direction, description "
+        "ON transactions BEGIN UPDATE ledger_state SET rewrites = rewrites + 1; END"
+    )
@@ -0,0 +1,242 @@
+"""Timing spans and SQL statistics behind ``BUDGT_PROFILE=1`` and the ``p`` overlay.
+
+Work users wait on is wrapped in named spans: loading and applying refresh
+snapshots, rendering the insights panel and its charts, and the modal
+commits. While the profiler is enabled every span records its duration and
+the SQL statements run on its thread, with the time each took to execute and
+the rows fetched. Spans nest, and a span's counts include its children's.
+
+Finished spans are kept in a ring buffer for the overlay and appended to a
+JSONL trace file, one object per span. The slowest statements seen so far
+are kept as well. When profiling is off, ``span`` returns a shared no-op
+context manager, so instrumented code pays one attribute check.
+"""
+
+import heapq
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque, namedtuple
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+
+# Set to 1 to profile a whole run
+PROFILE_ENV = "BUDGT_PROFILE"
+# Trace file to use instead of the one next to the database
+PROFILE_FILE_ENV = "BUDGT_PROFILE_FILE"
+# Finished spans kept for the overlay
+SPAN_HISTORY = 100
+# Slowest statements kept for the overlay
+SLOW_QUERIES = 10
+
+# A finished span; ``depth`` is 0 for spans not nested in another one
+Span = namedtuple("Span", ["name", "time", "ms", "queries", "rows", "sql_ms", "depth", "thread"])
+
+# One SQL statement and the innermost span it ran in (None outside spans)
+Query = namedtuple("Query", ["ms", "statement", "span"])
+
+_NO_SPAN = nullcontext()
+
+
+class _Active:
+    """Counters of a span that has not finished yet."""
+
+    __slots__ = ("name", "queries", "rows", "sql_ms")
+
+    def __init__(self, name):
+        self.name = name
+        self.queries = 0
+        self.rows = 0
+        self.sql_ms = 0.0
+
+
+class Profiler:
+    """Collects spans and statement timings while enabled."""
+
+    def __init__(self, history=SPAN_HISTORY, slow_queries=SLOW_QUERIES):
+        self.enabled = False
+        self.path = None
+        self.spans = deque(maxlen=history)
+        self.slow_queries = slow_queries
+        self._slowest = []
+        self._sequence = itertools.count()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._file = None
+        self._installed = False
+
+    def enable(self, path=None):
+        """Start recording, appending finished spans to ``path`` if given."""
+        self._install()
+        if path is not None and self._file is None:
+            self._file = open(path, "a", encoding="utf-8", buffering=1)
+            self.path = path
+        self.enabled = True
+
+    def disable(self):
+        """Stop recording; spans already open still finish."""
+        self.enabled = False
+
+    def close(self):
+        """Stop recording and close the trace file."""
+        self.disable()
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+                self.path = None
+
+    def clear(self):
+        """Forget the recorded spans and statements."""
+        with self._lock:
+            self.spans.clear()
+            self._slowest = []
+
+    def span(self, name):
+        """Context manager timing the enclosed block as span ``name``."""
+        if not self.enabled:
+            return _NO_SPAN
+        return self._span(name)
+
+    def recent(self, limit=None):
+        """Finished spans, newest first."""
+        with self._lock:
+            spans = list(self.spans)
+        spans.reverse()
+        return spans[:limit] if limit else spans
+
+    def slowest(self):
+        """The slowest statements recorded, slowest first."""
+        with self._lock:
+            entries = sorted(self._slowest, reverse=True)
+        return [query for _, _, query in entries]
+
+    @contextmanager
+    def _span(self, name):
+        stack = self._stack()
+        active = _Active(name)
+        stack.append(active)
+        wall = time.time()
+        started = time.perf_counter()
+        try:
+            yield active
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            stack.pop()
+            if stack:
+                parent = stack[-1]
+                parent.queries += active.queries
+                parent.rows += active.rows
+                parent.sql_ms += active.sql_ms
+            self._finish(Span(
+                name,
+                round(wall, 6),
+                round(elapsed, 3),
+                active.queries,
+                active.rows,
+                round(active.sql_ms, 3),
+                len(stack),
+                threading.current_thread().name,
+            ))
+
+    def _finish(self, span):
+        with self._lock:
+            self.spans.append(span)
+            if self._file is not None:
+                self._file.write(json.dumps(span._asdict()) + "\n")
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _install(self):
+        """Listen to every engine and pool, including ones created later."""
+        if self._installed:
+            return
+        from sqlalchemy import event
+        from sqlalchemy.engine import Engine
+        from sqlalchemy.pool import Pool
+
+        event.listen(Engine, "before_cursor_execute", self._before_execute)
+        event.listen(Engine, "after_cursor_execute", self._after_execute)
+        event.listen(Pool, "checkout", self._checkout)
+        self._installed = True
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if self.enabled and context is not None:
+            context._profile_started = time.perf_counter()
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_profile_started", None)
+        if started is None:
+            return
+        elapsed = (time.perf_counter() - started) * 1000
+        stack = self._stack()
+        name = None
+        if stack:
+            active = stack[-1]
+            active.queries += 1
+            active.sql_ms += elapsed
+            name = active.name
+        entry = (elapsed, next(self._sequence), Query(round(elapsed, 3), " ".join(statement.split()), name))
+        with self._lock:
+            if len(self._slowest) < self.slow_queries:
+                heapq.heappush(self._slowest, entry)
+            elif elapsed > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, entry)
+
+    def _checkout(self, dbapi_connection, connection_record, connection_proxy):
+        # sqlite3 hands every fetched row to the row factory, which makes it
+        # the one place rows can be counted without wrapping cursors
+        dbapi_connection.row_factory = self._count_row if self.enabled else None
+
+    def _count_row(self, cursor, row):
+        stack = getattr(self._local, "stack", None)
+        if stack:
+            stack[-1].rows += 1
+        return row
+
+
+def requested():
+    """Whether ``BUDGT_PROFILE`` asks to profile this run."""
+    return os.environ.get(PROFILE_ENV, "").strip() not in ("", "0")
+
+
+def trace_path(config):
+    """Trace file for the database in ``config``.
+
+    Args:
+        config (StorageConfig): Effective storage settings
+
+    Returns:
+        str: ``BUDGT_PROFILE_FILE`` if set, else ``<database>-profile.jsonl``
+        (``budgt-profile.jsonl`` for in-memory databases)
+    """
+    override = os.environ.get(PROFILE_FILE_ENV)
+    if override:
+        return os.path.expanduser(override)
+    if config is None or config.path == ":memory:":
+        return "budgt-profile.jsonl"
+    return f"{config.path}-profile.jsonl"
+
+
+def profiled(name):
+    """Decorator timing every call of the function as span ``name``."""
+
+    def decorate(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with profiler.span(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+# Shared by every instrumented module
+profiler = Profiler()
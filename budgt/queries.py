@@ -0,0 +1,143 @@
+"""Lightweight read queries for the Budgt.sh command line.
+
+``budgt balance``, ``budgt list`` and ``budgt report`` answer from a plain
+``sqlite3`` connection instead of the SQLAlchemy models, so a one-off query
+from a script does not pay for importing SQLAlchemy, Textual or plotext. The
+SQL reads the same materialized tables the TUI does (``account_balances`` and
+``monthly_rollups``) and the ``(date, id)`` index of ``transactions``.
+
+``connect`` only hands out a connection when the database is already at the
+current schema version; otherwise the caller runs ``init_db`` first.
+"""
+
+import os
+import sqlite3
+from collections import namedtuple
+
+from . import migrations
+
+# Pragmas worth setting on a short-lived read connection; journal_mode is
+# stored in the database file and left alone
+READ_PRAGMAS = ("busy_timeout", "cache_size", "mmap_size", "temp_store")
+
+AccountRow = namedtuple("AccountRow", ["id", "name", "account_type", "balance"])
+
+TransactionRow = namedtuple(
+    "TransactionRow",
+    [
+        "id",
+        "date",
+        "description",
+        "amount",
+        "transaction_type",
+        "category",
+        "account_name",
+        "transfer_direction",
+    ],
+)
+
+# One line of a report: transaction type, category label (None when
+# uncategorized), total and number of transactions
+ReportRow = namedtuple("ReportRow", ["transaction_type", "category", "total", "count"])
+
+_BALANCES = (
+    "SELECT a.id, a.name, a.account_type, b.balance FROM accounts a "
+    "LEFT JOIN account_balances b ON b.account_id = a.id ORDER BY a.id"
+)
+
+_TRANSACTIONS = (
+    "SELECT t.id, t.date, t.description, t.amount, t.transaction_type, t.category, "
+    "a.name, t.transfer_direction FROM transactions t "
+    "LEFT JOIN accounts a ON a.id = t.account_id"
+)
+
+# Same "Parent > Child" labels as categories.label_expression()
+_REPORT = (
+    "SELECT r.transaction_type, COALESCE(p.name || ' > ' || c.name, c.name), "
+    "SUM(r.total), SUM(r.count) FROM monthly_rollups r "
+    "LEFT JOIN categories c ON c.id = r.category_id "
+    "LEFT JOIN categories p ON p.id = c.parent_id "
+    "WHERE r.month >= ? AND r.month < ? AND r.transaction_type IN ('INCOME', 'EXPENSE') "
+    "GROUP BY r.transaction_type, r.category_id ORDER BY r.transaction_type, 3 DESC"
+)
+
+
+def connect(config):
+    """Open a plain connection to a database at the current schema version.
+
+    Args:
+        config (StorageConfig): Effective storage settings
+
+    Returns:
+        sqlite3.Connection: Open connection, or None when the database does
+        not exist yet, is in memory or still has migrations to run
+    """
+    if config.path == ":memory:" or not os.path.exists(config.path):
+        return None
+    connection = sqlite3.connect(config.path)
+    for name in READ_PRAGMAS:
+        connection.execute(f"PRAGMA {name} = {config.pragmas[name]}")
+    if connection.execute("PRAGMA user_version").fetchone()[0] != migrations.head_version():
+        connection.close()
+        return None
+    return connection
+
+
+def balances(connection):
+    """Return every account with its materialized balance.
+
+    Args:
+        connection (sqlite3.Connection): Connection from ``connect``
+
+    Returns:
+        list: ``AccountRow`` tuples ordered by account id; ``balance`` is None
+        for accounts without a materialized row yet
+    """
+    return [AccountRow(*row) for row in connection.execute(_BALANCES)]
+
+
+def transactions(connection, limit=20, account=None, start=None, end=None):
+    """Return the newest transactions, optionally filtered.
+
+    Args:
+        connection (sqlite3.Connection): Connection from ``connect``
+        limit (int): Maximum number of rows
+        account (str): Only this account's transactions
+        start (date): First day to include
+        end (date): First day not included
+
+    Returns:
+        list: ``TransactionRow`` tuples, newest first
+    """
+    conditions, params = [], []
+    if account is not None:
+        conditions.append("a.name = ?")
+        params.append(account)
+    # Dates are stored as ISO text, so day bounds compare as strings
+    if start is not None:
+        conditions.append("t.date >= ?")
+        params.append(start.isoformat())
+    if end is not None:
+        conditions.append("t.date < ?")
+        params.append(end.isoformat())
+    sql = _TRANSACTIONS
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += " ORDER BY t.date DESC, t.id DESC LIMIT ?"
+    params.append(limit)
+    return [TransactionRow(*row) for row in connection.execute(sql, params)]
+
+
+def report(connection, start, end):
+    """Income and expense totals per category from the monthly rollups.
+
+    Args:
+        connection (sqlite3.Connection): Connection from ``connect``
+        start (date): First month included (the 1st of the month)
+        end (date): First month not included
+
+    Returns:
+        list: ``ReportRow`` tuples, expenses then income, largest first
+    """
+    rows = connection.execute(_REPORT, (start.isoformat(), end.isoformat()))
+    return [ReportRow(*row) for row in rows]
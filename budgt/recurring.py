@@ -0,0 +1,258 @@
+"""Recurring-transaction detection for Budgt.sh.
+
+Subscriptions and bills are found without comparing transactions pairwise:
+
+1. Expenses from the lookback window are grouped on their merchant code, a
+   hash of the normalized description (lowercase, with digits and
+   punctuation removed) that the column cache stores next to every row.
+2. Each group is sorted by amount and split wherever an amount is more than
+   ``AMOUNT_TOLERANCE`` above the first amount of its cluster.
+3. The distinct days of each cluster are sorted, and the cluster is
+   recurring when its intervals agree with one of ``PERIODS``.
+
+The rows are read from the memory-mapped column arrays and grouped with one
+NumPy sort, so no description is parsed out of SQLite and Python only loops
+over clusters. Everything is O(n log n) in the number of expenses. Regular income is found
+the same way with ``transaction_type=TransactionType.INCOME``. ``detect_cached``
+reuses the result until the database data version or the day changes.
+"""
+
+import calendar
+import hashlib
+import re
+import statistics
+from collections import namedtuple
+from datetime import date, timedelta
+
+from sqlalchemy import select
+
+from .cache import LRUCache, data_version
+from .database import Transaction, TransactionType
+
+# How far back charges are looked for, in days (two years catch yearly bills)
+LOOKBACK_DAYS = 760
+# Relative spread of amounts treated as the same charge
+AMOUNT_TOLERANCE = 0.1
+# Share of intervals that must match the period
+MIN_REGULARITY = 0.75
+
+# (label, days, tolerance in days, occurrences needed)
+PERIODS = (
+    ("weekly", 7, 1, 4),
+    ("biweekly", 14, 2, 3),
+    ("monthly", 30.44, 4, 3),
+    ("quarterly", 91.31, 10, 3),
+    ("yearly", 365.25, 15, 2),
+)
+
+# A detected subscription or bill
+RecurringCharge = namedtuple(
+    "RecurringCharge",
+    [
+        "description",
+        "amount",
+        "period",
+        "period_days",
+        "occurrences",
+        "last_date",
+        "next_date",
+        "account_id",
+        "category_id",
+    ],
+)
+
+_EPOCH = date(1970, 1, 1)
+_NOISE = re.compile(r"\b\w*\d\w*\b|[^a-z ]+")
+
+
+def normalize(description):
+    """Reduce a description to the words that identify the merchant."""
+    return " ".join(_NOISE.sub(" ", (description or "").lower()).split())
+
+
+def merchant_code(description):
+    """Signed 64-bit hash of ``normalize(description)``, 0 when nothing is left."""
+    key = normalize(description)
+    if not key:
+        return 0
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little", signed=True)
+
+
+def _clusters(amounts, start, end):
+    """Split the sorted ``amounts[start:end]`` into runs of similar amounts.
+
+    Yields:
+        tuple: (start, end) bounds of each run
+    """
+    while start < end:
+        stop = start + int(amounts[start:end].searchsorted(amounts[start] * (1 + AMOUNT_TOLERANCE), "right"))
+        yield start, stop
+        start = stop
+
+
+def _period(days):
+    """Match the intervals between sorted day numbers against ``PERIODS``."""
+    intervals = [later - earlier for earlier, later in zip(days, days[1:])]
+    if not intervals:
+        return None
+    typical = statistics.median(intervals)
+    for label, length, tolerance, needed in PERIODS:
+        if len(days) < needed or abs(typical - length) > tolerance:
+            continue
+        regular = sum(1 for interval in intervals if abs(interval - length) <= tolerance)
+        if regular >= MIN_REGULARITY * len(intervals):
+            return label, length, tolerance
+    return None
+
+
+def _add_months(value, months):
+    month = value.month - 1 + months
+    year = value.year + month // 12
+    month = month % 12 + 1
+    return value.replace(year=year, month=month, day=min(value.day, calendar.monthrange(year, month)[1]))
+
+
+def _expected(last, label, length, step):
+    """Date of the ``step``-th charge after ``last``."""
+    if label == "monthly":
+        return _add_months(last, step)
+    if label == "quarterly":
+        return _add_months(last, 3 * step)
+    if label == "yearly":
+        return _add_months(last, 12 * step)
+    return last + timedelta(days=round(length * step))
+
+
+def _next_date(last, label, length, tolerance, today):
+    """First expected charge after ``last`` that is not already overdue."""
+    step = 1
+    while _expected(last, label, length, step) < today - timedelta(days=tolerance):
+        step += 1
+    return _expected(last, label, length, step)
+
+
+def schedule(charge, until):
+    """Expected dates of ``charge`` from its next date up to ``until`` (exclusive).
+
+    Args:
+        charge (RecurringCharge): Detected charge
+        until (date): First day not included
+
+    Returns:
+        list: Dates in order
+    """
+    dates = []
+    step = 1
+    while True:
+        # Stepping from the last charge keeps month-end dates from drifting
+        expected = _expected(charge.last_date, charge.period, charge.period_days, step)
+        if expected >= until:
+            return dates
+        if expected >= charge.next_date:
+            dates.append(expected)
+        step += 1
+
+
+def detect(db, today=None, lookback_days=LOOKBACK_DAYS, transaction_type=TransactionType.EXPENSE):
+    """Find recurring expenses (or income) in the lookback window.
+
+    Args:
+        db (Session): Open database session
+        today (date): Reference day (defaults to today)
+        lookback_days (int): Days of history to scan
+        transaction_type (TransactionType): EXPENSE for bills, INCOME for
+            salaries and other regular deposits
+
+    Returns:
+        list: ``RecurringCharge`` tuples ordered by next expected date;
+        charges that have stopped for two periods are left out
+    """
+    # numpy is only loaded once the panel is first drawn
+    import numpy as np
+
+    from .analytics import EXPENSE, INCOME, TRANSFER, load_analytics, to_day
+
+    today = today or date.today()
+    code = {TransactionType.INCOME: INCOME, TransactionType.EXPENSE: EXPENSE}.get(transaction_type, TRANSFER)
+    columns = load_analytics(db).columns
+    # Rows are sorted by (day, id), so the window is a slice
+    first = int(columns.day.searchsorted(to_day(today - timedelta(days=lookback_days)), "left"))
+    selected = first + np.flatnonzero((columns.type[first:] == code) & (columns.merchant[first:] != 0))
+    merchant = columns.merchant[selected]
+    amounts = np.nan_to_num(columns.amount[selected])
+    days = columns.day[selected]
+    # One stable sort groups the merchants with their amounts ascending;
+    # positions in ``selected`` still follow (day, id) within equal amounts
+    order = np.lexsort((amounts, merchant))
+    merchant, amounts, days, selected = merchant[order], amounts[order], days[order], selected[order]
+    bounds = np.flatnonzero(np.diff(merchant)) + 1
+    starts = [0] + bounds.tolist()
+    ends = bounds.tolist() + [len(merchant)]
+
+    today_number = (today - _EPOCH).days
+    found = []
+    for group_start, group_end in zip(starts, ends):
+        if group_end - group_start < 2:
+            continue
+        for start, end in _clusters(amounts, group_start, group_end):
+            if end - start < 2:
+                continue
+            distinct = np.unique(days[start:end]).tolist()
+            match = _period(distinct)
+            if match is None:
+                continue
+            label, length, tolerance = match
+            if today_number - distinct[-1] > 2 * length + tolerance:
+                continue
+            # Describe the charge by its most recent occurrence
+            latest = int(columns.id[selected[start:end].max()])
+            amount = float(np.median(amounts[start:end]))
+            found.append((latest, distinct[-1], amount, label, length, tolerance, len(distinct)))
+
+    # Descriptions, accounts and categories are only looked up for the
+    # detected charges
+    details = {}
+    if found:
+        details = {
+            row.id: row
+            for row in db.execute(
+                select(Transaction.id, Transaction.description, Transaction.account_id, Transaction.category_id).where(
+                    Transaction.id.in_([latest for latest, *_ in found])
+                )
+            )
+        }
+
+    charges = []
+    for latest, last_day, amount, label, length, tolerance, occurrences in found:
+        last_date = _EPOCH + timedelta(days=last_day)
+        detail = details.get(latest)
+        charges.append(
+            RecurringCharge(
+                detail.description if detail else None,
+                amount,
+                label,
+                length,
+                occurrences,
+                last_date,
+                _next_date(last_date, label, length, tolerance, today),
+                detail.account_id if detail else None,
+                detail.category_id if detail else None,
+            )
+        )
+    charges.sort(key=lambda charge: (charge.next_date, -charge.amount))
+    return charges
+
+
+# Detection results for recent data versions
+_recurring_cache = LRUCache(maxsize=4)
+
+
+def detect_cached(db, today=None, transaction_type=TransactionType.EXPENSE):
+    """Return ``detect()``, reusing its result while the data is unchanged."""
+    today = today or date.today()
+    key = (data_version.current(), today, transaction_type)
+    charges = _recurring_cache.get(key)
+    if charges is None:
+        charges = detect(db, today, transaction_type=transaction_type)
+        _recurring_cache.put(key, charges)
+    return charges
@@ -0,0 +1,130 @@
+"""Precomputed transaction rollups for Budgt.sh.
+
+``daily_rollups`` and ``monthly_rollups`` hold the sum and count of
+transactions per (period, account, category, type). Every write path calls
+``record`` inside its own DB transaction, so the tables never lag behind the
+ledger, and ``rebuild`` recomputes them from scratch on demand. Insights,
+trends and the monthly export read these tables, which stay a few thousand
+rows per year however many transactions the ledger holds.
+"""
+
+from collections import defaultdict, namedtuple
+
+from sqlalchemy import text
+from sqlalchemy.dialects.sqlite import insert
+
+from .database import DailyRollup, MonthlyRollup
+
+# category_id stored for uncategorized transactions
+UNCATEGORIZED = 0
+
+# One written transaction as seen by the rollups
+RollupEntry = namedtuple(
+    "RollupEntry", ["date", "account_id", "category_id", "transaction_type", "amount"]
+)
+
+
+def entry_for(transaction):
+    """Build a ``RollupEntry`` from a flushed ``Transaction``."""
+    return RollupEntry(
+        transaction.date,
+        transaction.account_id,
+        transaction.category_id,
+        transaction.transaction_type,
+        transaction.amount,
+    )
+
+
+def _upsert(model, period_column):
+    statement = insert(model)
+    return statement.on_conflict_do_update(
+        index_elements=[period_column, "account_id", "category_id", "transaction_type"],
+        set_={
+            "total": model.total + statement.excluded.total,
+            "count": model.count + statement.excluded.count,
+        },
+    )
+
+
+_DAILY_UPSERT = _upsert(DailyRollup, "day")
+_MONTHLY_UPSERT = _upsert(MonthlyRollup, "month")
+
+
+def record(db, entries):
+    """Add written transactions to the rollups in the caller's transaction.
+
+    Entries are aggregated in Python first, so a bulk import issues one
+    upsert per distinct (day, account, category, type) rather than per row.
+
+    Args:
+        db: Session or Connection holding the write
+        entries (iterable): ``RollupEntry`` tuples
+    """
+    daily = defaultdict(lambda: [0.0, 0])
+    for entry in entries:
+        key = (
+            entry.date.date(),
+            entry.account_id or 0,
+            entry.category_id or UNCATEGORIZED,
+            entry.transaction_type,
+        )
+        bucket = daily[key]
+        bucket[0] += entry.amount or 0.0
+        bucket[1] += 1
+    if not daily:
+        return
+
+    monthly = defaultdict(lambda: [0.0, 0])
+    for (day, *rest), (total, count) in daily.items():
+        bucket = monthly[(day.replace(day=1), *rest)]
+        bucket[0] += total
+        bucket[1] += count
+
+    db.execute(_DAILY_UPSERT, _params("day", daily))
+    db.execute(_MONTHLY_UPSERT, _params("month", monthly))
+
+
+def _params(period, buckets):
+    return [
+        {
+            period: key[0],
+            "account_id": key[1],
+            "category_id": key[2],
+            "transaction_type": key[3],
+            "total": total,
+            "count": count,
+        }
+        for key, (total, count) in buckets.items()
+    ]
+
+
+def rebuild(db):
+    """Recompute both rollup tables from ``transactions``.
+
+    Args:
+        db: Session or Connection; the caller commits
+
+    Returns:
+        int: Number of daily rollup rows written
+    """
+    db.execute(text("DELETE FROM daily_rollups"))
+    db.execute(text("DELETE FROM monthly_rollups"))
+    db.execute(
+        text(
+            "INSERT INTO daily_rollups "
+            "(day, account_id, category_id, transaction_type, total, count) "
+            "SELECT date(date), COALESCE(account_id, 0), COALESCE(category_id, 0), transaction_type, "
+            "SUM(amount), COUNT(*) "
+            "FROM transactions GROUP BY 1, 2, 3, 4"
+        )
+    )
+    db.execute(
+        text(
+            "INSERT INTO monthly_rollups "
+            "(month, account_id, category_id, transaction_type, total, count) "
+            "SELECT strftime('%Y-%m-01', day), account_id, category_id, transaction_type, "
+            "SUM(total), SUM(count) "
+            "FROM daily_rollups GROUP BY 1, 2, 3, 4"
+        )
+    )
+    return db.execute(text("SELECT COUNT(*) FROM daily_rollups")).scalar()
@@ -0,0 +1,47 @@
+"""Startup phase timing for ``budgt --startup-trace``.
+
+Code on the startup path calls ``trace.mark(phase)`` when a phase ends. Marks
+are ignored unless the trace was enabled, and only the first mark of each
+phase counts, so the calls can stay in code that also runs later (refreshes,
+regenerated insights). The breakdown is printed once the app exits.
+"""
+
+import sys
+import time
+
+
+class StartupTrace:
+    """Records when each startup phase finished."""
+
+    def __init__(self):
+        self.enabled = False
+        self.started = time.perf_counter()
+        self.phases = []
+
+    def enable(self, started=None):
+        """Start recording, measuring from ``started`` (a perf_counter value)."""
+        self.enabled = True
+        if started is not None:
+            self.started = started
+
+    def mark(self, phase):
+        """Record that ``phase`` finished now."""
+        if not self.enabled or any(name == phase for name, _ in self.phases):
+            return
+        self.phases.append((phase, time.perf_counter()))
+
+    def report(self, file=None):
+        """Print each phase's own duration and the elapsed time at its end."""
+        file = file or sys.stderr
+        print(f"{'phase':<20} {'took':>10} {'at':>10}", file=file)
+        previous = self.started
+        for phase, at in self.phases:
+            print(
+                f"{phase:<20} {(at - previous) * 1000:>8.1f}ms {(at - self.started) * 1000:>8.1f}ms",
+                file=file,
+            )
+            previous = at
+
+
+# Shared by every module on the startup path
+trace = StartupTrace()
@@ -0,0 +1,491 @@
+"""Seeded synthetic ledgers for Budgt.sh.
+
+``generate`` fills an empty database with a realistic-looking ledger of a
+requested size, so behaviour at scale can be measured (``budgt bench``) and
+tested without sharing real data. The same seed, size and end date always
+produce the same ledger.
+
+The ledger holds:
+
+- four accounts: checking, savings, a credit card and cash
+- a monthly salary, a yearly bonus and savings interest
+- bills from ``BILLS`` (rent, utilities, phone, subscriptions, insurance)
+  on fixed days, which ``budgt.recurring`` detects as recurring
+- transfers stored as ``TRANSFER_OUT``/``TRANSFER_IN`` pairs linked through
+  ``transfer_pair_id``: a monthly savings transfer, a card payment covering
+  the previous month's card spend and fortnightly cash withdrawals
+- day-to-day spending in the expense categories of ``categories.yaml``,
+  heavier at weekends and towards December
+
+Scheduled rows are built month by month in Python; day-to-day spending, which
+is nearly all of a large ledger, is drawn with NumPy in one pass. Rows are
+written in date order with ``executemany`` and the derived tables (balances,
+rollups, anomaly statistics) are rebuilt once at the end, as the ``budgt
+rebuild-*`` commands would.
+"""
+
+import calendar
+from collections import namedtuple
+from datetime import date, timedelta
+
+import numpy as np
+from sqlalchemy import func, select
+
+from . import anomalies, categories, rollups
+from .balances import AccountBalanceStore
+from .database import TRANSFER_IN, TRANSFER_OUT, Account, AccountType, Transaction
+
+# Rows written per executemany
+BATCH_SIZE = 50000
+# Default length of the history, in years
+YEARS = 2
+# Scheduled rows may use at most this share of the requested size; smaller
+# ledgers get a shorter history instead
+MAX_SCHEDULED_SHARE = 0.5
+# Spread of day-to-day amounts around their typical value (lognormal sigma)
+AMOUNT_SIGMA = 0.6
+# Distinct store numbers per merchant
+STORES = 8
+# Share of day-to-day spending paid by card, from checking and in cash
+PAYMENT_SHARES = (0.6, 0.3, 0.1)
+# Income as a multiple of the expected outgoings
+INCOME_MARGIN = 1.15
+
+CHECKING, SAVINGS, CARD, CASH = range(4)
+
+# (name, type, starting balance), indexed by the constants above
+ACCOUNTS = (
+    ("Checking", AccountType.BANK_ACCOUNT, 2500.0),
+    ("Savings", AccountType.SAVINGS, 10000.0),
+    ("Credit Card", AccountType.CREDIT_CARD, 0.0),
+    ("Cash", AccountType.CASH, 100.0),
+)
+
+# Codes used while generating; same order as the analytics column codes
+INCOME, EXPENSE, TRANSFER = 0, 1, 2
+_TYPE_NAMES = ("INCOME", "EXPENSE", "TRANSFER")
+
+# (description, category label, day of month, amount, account, every N months)
+BILLS = (
+    ("OAKWOOD PROPERTY MGMT", "Housing > Rent", 1, 1450.00, CHECKING, 1),
+    ("HEALTH PLUS PREMIUM", "Medical & Healthcare > Insurance", 1, 180.00, CHECKING, 1),
+    ("NETFLIX.COM", "Electronic & Communication > Streaming Services", 3, 15.99, CARD, 1),
+    ("CITY GYM", "Life & Entertainment > Sports", 5, 39.00, CHECKING, 1),
+    ("CITY POWER & WATER", "Housing > Utilities", 8, 120.00, CHECKING, 1),
+    ("DOMAIN RENEWAL", "Electronic & Communication > Software Subscriptions", 9, 18.00, CARD, 12),
+    ("MOBILE ONE", "Electronic & Communication > Phone Bill", 12, 45.00, CARD, 1),
+    ("SAFE DRIVE INSURANCE", "Vehicle > Insurance", 14, 320.00, CHECKING, 3),
+    ("FIBERNET", "Electronic & Communication > Internet", 15, 60.00, CHECKING, 1),
+    ("SPOTIFY", "Electronic & Communication > Streaming Services", 18, 10.99, CARD, 1),
+    ("CLOUD DRIVE", "Electronic & Communication > Software Subscriptions", 20, 2.99, CARD, 1),
+)
+
+# Same layout as BILLS
+INCOME_FLOWS = (
+    ("ACME CORP PAYROLL", "Income > Salary", 25, 4200.00, CHECKING, 1),
+    ("SAVINGS INTEREST", "Income > Investment Returns", 28, 12.50, SAVINGS, 1),
+)
+
+# Typical amount and relative frequency of day-to-day spending per
+# category label; categories.yaml leaves without an entry get DEFAULT_SPEND
+SPEND = {
+    "Food > Groceries": (55.0, 22),
+    "Food > Restaurants": (35.0, 10),
+    "Food > Takeout": (22.0, 8),
+    "Food > Snacks": (6.0, 8),
+    "Transport > Public Transport": (3.5, 7),
+    "Transport > Taxi": (18.0, 2),
+    "Transport > Ride Share": (15.0, 3),
+    "Shopping > Clothing": (60.0, 4),
+    "Shopping > Electronics": (180.0, 1.5),
+    "Shopping > Home & Garden": (45.0, 3),
+    "Shopping > Gifts": (40.0, 2),
+    "Vehicle > Fuel": (50.0, 6),
+    "Vehicle > Parking": (8.0, 4),
+    "Vehicle > Maintenance": (250.0, 0.5),
+    "Life & Entertainment > Movies": (14.0, 2),
+    "Life & Entertainment > Hobbies": (30.0, 3),
+    "Life & Entertainment > Travel": (400.0, 0.5),
+    "Medical & Healthcare > Medication": (20.0, 1.5),
+    "Medical & Healthcare > Doctor": (90.0, 0.5),
+    "Education > Books": (25.0, 1),
+}
+DEFAULT_SPEND = (30.0, 0.5)
+
+# Merchant names per category label; others use the category name
+MERCHANTS = {
+    "Food > Groceries": ("FRESH MART", "GREEN GROCER", "SUPERSAVE"),
+    "Food > Restaurants": ("TRATTORIA ROMA", "THE GRILL HOUSE", "SUSHI BAR"),
+    "Food > Takeout": ("PIZZA EXPRESS", "WOK TO GO"),
+    "Food > Snacks": ("CORNER CAFE", "BEAN THERE COFFEE"),
+    "Transport > Public Transport": ("METRO TRANSIT",),
+    "Transport > Ride Share": ("RIDESHARE TRIP",),
+    "Vehicle > Fuel": ("FUELCO", "QUICKGAS"),
+    "Shopping > Clothing": ("URBAN THREADS", "DENIM CO"),
+}
+
+# Extra spending by weekday (Monday first) and by month (January first)
+WEEKDAY_FACTOR = (0.8, 0.85, 0.9, 0.95, 1.15, 1.4, 1.1)
+MONTH_FACTOR = (0.85, 0.9, 0.95, 1.0, 1.0, 1.05, 1.1, 1.1, 1.0, 1.0, 1.1, 1.35)
+
+SyntheticLedger = namedtuple("SyntheticLedger", ["rows", "accounts", "start", "end", "seed"])
+
+_EPOCH = date(1970, 1, 1)
+_INSERT = (
+    "INSERT INTO transactions (id, date, description, amount, transaction_type, account_id, "
+    "category, category_id, transfer_pair_id, transfer_direction) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+
+def _on_day(year, month, day):
+    return date(year, month, min(day, calendar.monthrange(year, month)[1]))
+
+
+def _months(start, end):
+    """Yield (year, month) for every month overlapping [start, end]."""
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        yield year, month
+        month += 1
+        if month > 12:
+            year, month = year + 1, 1
+
+
+class _Rows:
+    """Column lists of the scheduled rows, plus the shared text tables."""
+
+    def __init__(self):
+        self.day, self.seconds, self.amount = [], [], []
+        self.type, self.account, self.label, self.text = [], [], [], []
+        self.pair, self.direction = [], []
+        self.labels = []
+        self.texts = []
+        self._label_index = {}
+        self._text_index = {}
+
+    def label_index(self, label):
+        if label not in self._label_index:
+            self._label_index[label] = len(self.labels)
+            self.labels.append(label)
+        return self._label_index[label]
+
+    def text_index(self, text):
+        if text not in self._text_index:
+            self._text_index[text] = len(self.texts)
+            self.texts.append(text)
+        return self._text_index[text]
+
+    def add(self, when, seconds, amount, transaction_type, account, label, text, pair=-1, direction=0):
+        self.day.append((when - _EPOCH).days)
+        self.seconds.append(seconds)
+        self.amount.append(round(amount, 2))
+        self.type.append(transaction_type)
+        self.account.append(account)
+        self.label.append(self.label_index(label))
+        self.text.append(self.text_index(text))
+        self.pair.append(pair)
+        self.direction.append(direction)
+
+    def transfer(self, when, amount, source, target, note, pair):
+        source_name, target_name = ACCOUNTS[source][0], ACCOUNTS[target][0]
+        seconds = 9 * 3600
+        self.add(when, seconds, amount, TRANSFER, source, "Transfer",
+                 f"Transfer to {target_name}: {note}", pair, TRANSFER_OUT)
+        self.add(when, seconds, amount, TRANSFER, target, "Transfer",
+                 f"Transfer from {source_name}: {note}", pair, TRANSFER_IN)
+
+
+def _schedule(rows, rng, start, end, scale=1.0, withdrawal=200.0):
+    """Add salaries, bills and transfers between ``start`` and ``end``.
+
+    ``scale`` multiplies income and savings so that dense ledgers (many rows
+    a day) still earn what they spend, and ``withdrawal`` is the amount of
+    each cash withdrawal.
+
+    Card payments are added with a zero amount and a ``pair`` id listed in
+    the returned dict (pair -> month paid for), to be filled in once the
+    card spending is known.
+    """
+    pair = 0
+    card_payments = {}
+    first_year = start.year
+    for index, (year, month) in enumerate(_months(start, end)):
+        raise_factor = scale * 1.03 ** (year - first_year)
+        for flows, transaction_type in ((BILLS, EXPENSE), (INCOME_FLOWS, INCOME)):
+            for description, label, day, amount, account, every in flows:
+                if (year * 12 + month) % every:
+                    continue
+                when = _on_day(year, month, day)
+                if not start <= when <= end:
+                    continue
+                if label == "Income > Salary":
+                    amount *= raise_factor
+                elif label in ("Housing > Utilities", "Income > Investment Returns"):
+                    amount *= 1 + rng.uniform(-0.05, 0.05)
+                rows.add(when, 7 * 3600, amount, transaction_type, account, label, description)
+        bonus = date(year, 3, 15)
+        if month == 3 and start <= bonus <= end:
+            rows.add(bonus, 7 * 3600, 3000.0 * raise_factor, INCOME, CHECKING,
+                     "Income > Bonus", "ACME CORP BONUS")
+
+        savings = _on_day(year, month, 26)
+        if start <= savings <= end:
+            rows.transfer(savings, round(500.0 * scale, -1), CHECKING, SAVINGS, "Monthly savings", pair)
+            pair += 1
+        payment = _on_day(year, month, 10)
+        if index > 0 and start <= payment <= end:
+            rows.transfer(payment, 0.0, CHECKING, CARD, "Card payment", pair)
+            card_payments[pair] = year * 12 + month - 2
+            pair += 1
+
+    # Cash withdrawals every other Saturday
+    when = start + timedelta(days=(5 - start.weekday()) % 7)
+    while when <= end:
+        rows.transfer(when, withdrawal, CHECKING, CASH, "ATM withdrawal", pair)
+        pair += 1
+        when += timedelta(days=14)
+    return card_payments
+
+
+def _spend_profile():
+    """(labels, typical amounts, weights) of day-to-day spending."""
+    recurring = {label for _, label, *_ in BILLS}
+    labels, amounts, weights = [], [], []
+    for node in categories.load_definitions():
+        if node["name"] == "Income":
+            continue
+        for child in node.get("subcategories") or []:
+            label = categories.join_label(node["name"], child["name"])
+            if label in recurring:
+                continue
+            amount, weight = SPEND.get(label, DEFAULT_SPEND)
+            labels.append(label)
+            amounts.append(amount)
+            weights.append(weight)
+    if not labels:
+        # No categories.yaml: spend in the labels this module knows about
+        labels = list(SPEND)
+        amounts = [SPEND[label][0] for label in labels]
+        weights = [SPEND[label][1] for label in labels]
+    return labels, np.array(amounts), np.array(weights, dtype=float)
+
+
+def _spending(rows, rng, count, start, end, profile):
+    """Draw ``count`` day-to-day expenses as column arrays."""
+    days = np.arange((start - _EPOCH).days, (end - _EPOCH).days + 1)
+    dates = [start + timedelta(days=offset) for offset in range(len(days))]
+    weights = np.array([WEEKDAY_FACTOR[d.weekday()] * MONTH_FACTOR[d.month - 1] for d in dates])
+    day = np.repeat(days, rng.multinomial(count, weights / weights.sum()))
+
+    labels, typical, frequency = profile
+    category = rng.choice(len(labels), size=count, p=frequency / frequency.sum())
+    # Lognormal with the typical amount as its mean
+    mu = np.log(typical) - AMOUNT_SIGMA ** 2 / 2
+    amount = np.maximum(np.round(rng.lognormal(mu[category], AMOUNT_SIGMA), 2), 0.5)
+
+    # Each category's descriptions: merchants x store numbers
+    label_codes = np.array([rows.label_index(label) for label in labels])
+    first_text, merchant_count = [], []
+    for label in labels:
+        merchants = MERCHANTS.get(label) or (categories.split_label(label)[1].upper(),)
+        first_text.append(len(rows.texts))
+        merchant_count.append(len(merchants))
+        for merchant in merchants:
+            # Appended without deduplication so every merchant has STORES slots
+            rows.texts.extend(f"{merchant} #{store}" for store in rng.integers(100, 10000, size=STORES).tolist())
+    first_text, merchant_count = np.array(first_text), np.array(merchant_count)
+    merchant = (rng.random(count) * merchant_count[category]).astype(np.int64)
+    text = first_text[category] + merchant * STORES + rng.integers(0, STORES, size=count)
+
+    account = np.array([CARD, CHECKING, CASH])[rng.choice(3, size=count, p=PAYMENT_SHARES)]
+    seconds = rng.integers(8 * 3600, 22 * 3600, size=count)
+    return {
+        "day": day,
+        "seconds": seconds,
+        "amount": amount,
+        "type": np.full(count, EXPENSE),
+        "account": account,
+        "label": label_codes[category],
+        "text": text,
+        "pair": np.full(count, -1),
+        "direction": np.zeros(count, dtype=np.int64),
+    }
+
+
+def _month_of(days):
+    """Vectorized ``year * 12 + month - 1`` of epoch day numbers."""
+    as_dates = np.datetime64("1970-01-01") + days.astype("timedelta64[D]")
+    return as_dates.astype("datetime64[M]").astype(np.int64) + 1970 * 12
+
+
+def _columns(rows, rng, size, start, end):
+    """Build every column, sorted by date and time, with ids assigned."""
+    # Scheduled row counts do not depend on amounts, so a dry run tells how
+    # much day-to-day spending there will be and what income must cover it
+    dry_run = _Rows()
+    _schedule(dry_run, np.random.default_rng(0), start, end)
+    count = max(size - len(dry_run.day), 0)
+    profile = _spend_profile()
+    labels, typical, frequency = profile
+    daily = count / ((end - start).days + 1) * float(typical @ frequency / frequency.sum())
+    bills = sum(amount / every for _, _, _, amount, _, every in BILLS)
+    scale = max(1.0, INCOME_MARGIN * (daily * 30.44 + bills) / (INCOME_FLOWS[0][3] + 500.0))
+    withdrawal = max(200.0, round(daily * 14 * PAYMENT_SHARES[2] / 20) * 20.0)
+
+    card_payments = _schedule(rows, rng, start, end, scale, withdrawal)
+    scheduled = {name: np.array(getattr(rows, name)) for name in
+                 ("day", "seconds", "amount", "type", "account", "label", "text", "pair", "direction")}
+    spending = _spending(rows, rng, count, start, end, profile)
+    columns = {name: np.concatenate([scheduled[name], spending[name]]) for name in scheduled}
+
+    # Card payments cover the previous month's card expenses
+    card = (columns["account"] == CARD) & (columns["type"] == EXPENSE)
+    months = _month_of(columns["day"])
+    first_month = int(months.min())
+    totals = np.bincount(months[card] - first_month, weights=columns["amount"][card])
+    # Scheduled rows come first, so only they need searching for the legs
+    scheduled_pairs = columns["pair"][:len(rows.day)]
+    for pair, month in card_payments.items():
+        offset = month - first_month
+        amount = round(float(totals[offset]), 2) if 0 <= offset < len(totals) else 0.0
+        columns["amount"][:len(rows.day)][scheduled_pairs == pair] = amount
+
+    order = np.lexsort((np.arange(len(columns["day"])), columns["seconds"], columns["day"]))
+    columns = {name: values[order] for name, values in columns.items()}
+    columns["id"] = np.arange(1, len(order) + 1)
+
+    # Link each transfer leg to the other leg of its pair
+    legs = np.flatnonzero(columns["pair"] >= 0)
+    legs = legs[np.argsort(columns["pair"][legs], kind="stable")]
+    paired = np.zeros(len(order), dtype=np.int64)
+    paired[legs[0::2]] = columns["id"][legs[1::2]]
+    paired[legs[1::2]] = columns["id"][legs[0::2]]
+    columns["pair_id"] = paired
+    return columns
+
+
+def _span(size, years, end):
+    """First day of a history sized so scheduled rows stay a minority."""
+    # Roughly 18 scheduled rows a month (bills, income and transfer legs)
+    days = int(size * MAX_SCHEDULED_SHARE / 18 * 30.44)
+    days = max(60, min(days, round(years * 365.25)))
+    return end - timedelta(days=days - 1)
+
+
+def generate(db, size, seed=0, years=YEARS, end=None):
+    """Fill an empty database with a synthetic ledger.
+
+    Args:
+        db (Session): Session on a database with no transactions
+        size (int): Number of transactions to write (small sizes may get a
+            few more, as every month keeps its bills)
+        seed (int): Random seed; equal seeds give equal ledgers
+        years (float): Longest history to generate
+        end (date): Last day of the history (defaults to today)
+
+    Returns:
+        SyntheticLedger: What was written
+
+    Raises:
+        ValueError: If the database already holds transactions
+    """
+    if db.execute(select(func.count()).select_from(Transaction)).scalar():
+        raise ValueError("synthetic ledgers can only be written to an empty database")
+    end = end or date.today()
+    start = _span(size, years, end)
+    rng = np.random.default_rng(seed)
+
+    account_ids = []
+    for name, account_type, balance in ACCOUNTS:
+        account = Account(name=name, account_type=account_type, starting_balance=balance)
+        db.add(account)
+        db.flush()
+        AccountBalanceStore.open_account(db, account)
+        account_ids.append(account.id)
+
+    rows = _Rows()
+    columns = _columns(rows, rng, size, start, end)
+    category_ids = [categories.resolve(db, label) for label in rows.labels]
+
+    day_text = {
+        day: (_EPOCH + timedelta(days=day)).isoformat()
+        for day in range((start - _EPOCH).days, (end - _EPOCH).days + 1)
+    }
+    connection = db.connection()
+    total = len(columns["id"])
+    for first in range(0, total, BATCH_SIZE):
+        batch = slice(first, first + BATCH_SIZE)
+        params = []
+        for row_id, day, seconds, text, amount, kind, account, label, pair_id, direction in zip(
+            columns["id"][batch].tolist(),
+            columns["day"][batch].tolist(),
+            columns["seconds"][batch].tolist(),
+            columns["text"][batch].tolist(),
+            columns["amount"][batch].tolist(),
+            columns["type"][batch].tolist(),
+            columns["account"][batch].tolist(),
+            columns["label"][batch].tolist(),
+            columns["pair_id"][batch].tolist(),
+            columns["direction"][batch].tolist(),
+        ):
+            hours, rest = divmod(seconds, 3600)
+            params.append((
+                row_id,
+                f"{day_text[day]} {hours:02d}:{rest // 60:02d}:{rest % 60:02d}.000000",
+                rows.texts[text],
+                amount,
+                _TYPE_NAMES[kind],
+                account_ids[account],
+                rows.labels[label],
+                category_ids[label],
+                pair_id or None,
+                direction or None,
+            ))
+        connection.exec_driver_sql(_INSERT, params)
+    db.commit()
+
+    # Derived tables, exactly as the rebuild commands compute them
+    AccountBalanceStore.rebuild(db)
+    rollups.rebuild(db)
+    anomalies.rebuild(db)
+    db.commit()
+    return SyntheticLedger(total, len(account_ids), start, end, seed)
+
+
+def write_statement(path, size, seed=0, end=None, days=90):
+    """Write a CSV bank statement of day-to-day spending and pay cheques.
+
+    Used to time imports; the columns (Date, Description, Amount, Category)
+    are the ones ``budgt import`` guesses from the header.
+
+    Args:
+        path (str): File to write
+        size (int): Number of data rows
+        seed (int): Random seed
+        end (date): Last day of the statement (defaults to today)
+        days (int): Days covered by the statement
+    """
+    import csv
+
+    end = end or date.today()
+    start = end - timedelta(days=days - 1)
+    rng = np.random.default_rng(seed)
+    rows = _Rows()
+    spending = _spending(rows, rng, size, start, end, _spend_profile())
+    income = rng.random(size) < 0.02
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(("Date", "Description", "Amount", "Category"))
+        for day, text, label, amount, paid in zip(
+            spending["day"].tolist(),
+            spending["text"].tolist(),
+            spending["label"].tolist(),
+            spending["amount"].tolist(),
+            income.tolist(),
+        ):
+            when = (_EPOCH + timedelta(days=day)).isoformat()
+            if paid:
+                writer.writerow((when, "ACME CORP PAYROLL", f"{amount * 20:.2f}", "Income > Salary"))
+            else:
+                writer.writerow((when, rows.texts[text], f"{-amount:.2f}", rows.labels[label]))
@@ -0,0 +1,182 @@
+"""Expense time series for Budgt.sh insights.
+
+Series are read from the precomputed ``daily_rollups`` and ``monthly_rollups``
+tables (see ``budgt/rollups.py``) with a GROUP BY over a date bucket computed
+in SQLite, so a multi-year trend scans a few thousand rollup rows instead of
+every transaction. Buckets with no spending are filled with zeros in Python.
+"""
+
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import func, select
+
+from .database import DailyRollup, MonthlyRollup, TransactionType
+
+# Windows offered by the insights panel, in days
+WINDOWS = (7, 30, 90, 365)
+
+DAY = "day"
+WEEK = "week"
+MONTH = "month"
+
+
+def default_bucket(days):
+    """Pick a bucket size that keeps a window of ``days`` chartable."""
+    if days <= 31:
+        return DAY
+    if days <= 120:
+        return WEEK
+    return MONTH
+
+
+def window_bounds(days, today=None):
+    """Return ``(start, end)`` datetimes covering the last ``days`` calendar days.
+
+    Args:
+        days (int): Number of days, today included
+        today (date): Last day of the window (defaults to today)
+
+    Returns:
+        tuple: Inclusive start and exclusive end at midnight
+    """
+    today = today or date.today()
+    start = datetime.combine(today - timedelta(days=days - 1), datetime.min.time())
+    end = datetime.combine(today + timedelta(days=1), datetime.min.time())
+    return start, end
+
+
+def _bucket_expression(bucket, column=DailyRollup.day):
+    """SQL expression yielding the ISO date that starts each bucket."""
+    if bucket == DAY:
+        return func.date(column)
+    if bucket == WEEK:
+        # Monday of the row's week
+        return func.date(column, "weekday 0", "-6 days")
+    if bucket == MONTH:
+        return func.strftime("%Y-%m-01", column)
+    raise ValueError(f"Unknown bucket: {bucket}")
+
+
+def _bucket_start(day, bucket):
+    """Python counterpart of ``_bucket_expression`` for zero-filling."""
+    if bucket == DAY:
+        return day
+    if bucket == WEEK:
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+
+def _next_bucket(start, bucket):
+    if bucket == DAY:
+        return start + timedelta(days=1)
+    if bucket == WEEK:
+        return start + timedelta(days=7)
+    if start.month == 12:
+        return start.replace(year=start.year + 1, month=1)
+    return start.replace(month=start.month + 1)
+
+
+def _daily_totals(db, start_day, end_day, bucket, transaction_type):
+    """Bucketed totals from ``daily_rollups`` over ``[start_day, end_day)``."""
+    bucket_column = _bucket_expression(bucket).label("bucket")
+    rows = db.execute(
+        select(bucket_column, func.sum(DailyRollup.total))
+        .where(
+            DailyRollup.transaction_type == transaction_type,
+            DailyRollup.day >= start_day,
+            DailyRollup.day < end_day,
+        )
+        .group_by(bucket_column)
+    ).all()
+    return {date.fromisoformat(key): total or 0.0 for key, total in rows}
+
+
+def _monthly_totals(db, start_month, end_day, transaction_type):
+    """Monthly totals from ``monthly_rollups`` for months in ``[start_month, end_day)``."""
+    rows = db.execute(
+        select(MonthlyRollup.month, func.sum(MonthlyRollup.total))
+        .where(
+            MonthlyRollup.transaction_type == transaction_type,
+            MonthlyRollup.month >= start_month,
+            MonthlyRollup.month < end_day,
+        )
+        .group_by(MonthlyRollup.month)
+    ).all()
+    return {month: total or 0.0 for month, total in rows}
+
+
+def monthly_series(db, months, today=None, transaction_type=TransactionType.EXPENSE):
+    """Totals for the last ``months`` calendar months, for month-over-month views.
+
+    Args:
+        db (Session): Open database session
+        months (int): Number of months, the current one included
+        today (date): Day inside the last month (defaults to today)
+        transaction_type (TransactionType): Which transactions to sum
+
+    Returns:
+        list: ``(month_start, total)`` tuples, oldest first, zero-filled
+    """
+    today = today or date.today()
+    current = today.replace(day=1)
+    start = current
+    for _ in range(months - 1):
+        start = (start - timedelta(days=1)).replace(day=1)
+    totals = _monthly_totals(db, start, _next_bucket(current, MONTH), transaction_type)
+
+    series = []
+    while start <= current:
+        series.append((start, totals.get(start, 0.0)))
+        start = _next_bucket(start, MONTH)
+    return series
+
+
+def expense_series(db, days, bucket=None, today=None):
+    """Total expenses per bucket over the last ``days`` days.
+
+    Args:
+        db (Session): Open database session
+        days (int): Window length in days, today included
+        bucket (str): ``"day"``, ``"week"`` or ``"month"`` (defaults to
+            ``default_bucket(days)``)
+        today (date): Last day of the window (defaults to today)
+
+    Returns:
+        list: ``(bucket_start_date, total)`` tuples, oldest first, with a
+        zero total for buckets without expenses
+    """
+    bucket = bucket or default_bucket(days)
+    start, end = window_bounds(days, today)
+    start_day, end_day = start.date(), end.date()
+
+    totals = {}
+    if bucket == MONTH:
+        # Months wholly inside the window come from the monthly rollups; the
+        # partial months at either edge are summed from the daily ones
+        first_full = start_day if start_day.day == 1 else _next_bucket(_bucket_start(start_day, MONTH), MONTH)
+        last_full = _bucket_start(end_day, MONTH)
+        if first_full < last_full:
+            totals.update(_monthly_totals(db, first_full, last_full, TransactionType.EXPENSE))
+            edges = [(start_day, first_full), (last_full, end_day)]
+        else:
+            edges = [(start_day, end_day)]
+        for edge_start, edge_end in edges:
+            if edge_start < edge_end:
+                totals.update(_daily_totals(db, edge_start, edge_end, MONTH, TransactionType.EXPENSE))
+    else:
+        totals.update(_daily_totals(db, start_day, end_day, bucket, TransactionType.EXPENSE))
+
+    series = []
+    current = _bucket_start(start_day, bucket)
+    last = end_day - timedelta(days=1)
+    while current <= last:
+        series.append((current, totals.get(current, 0.0)))
+        current = _next_bucket(current, bucket)
+    return series
+
+
+def bucket_label(day, bucket):
+    """Short x-axis label for a bucket start date."""
+    if bucket == MONTH:
+        return day.strftime("%b")
+    return day.strftime("%m/%d")
@@ -6,19 +6,29 @@ from textual.message import Message
 from .database import SessionLocal, Transaction, TransactionType, Account
 from .components.modals import AddAccountModal, AddTransactionModal, TransferModal
 from .components.calendar import CalendarComponent
-from .components.categories import CategoryManager
-from .components.insights import InsightsGenerator
+from .balances import AccountBalanceStore
+from .ledger import TransactionPager, format_row, row_key
+from .messages import LedgerChanged
+from .timeseries import WINDOWS
+from .startup import trace
+from .profiling import profiled, profiler, requested, trace_path
 from textual import work
+from textual.worker import get_current_worker
 from pathlib import Path
 
 
 
 
+# Seconds to wait for further refresh requests before loading, so a burst of
+# writes triggers a single background load
+REFRESH_DEBOUNCE = 0.15
+
 class InsightsReady(Message):
     """Message sent when insights are ready to be displayed."""
-    def __init__(self, content: str):
+    def __init__(self, content: str, generation: int = 0):
         super().__init__()
         self.content = content
+        self.generation = generation
 
 class ExpenseApp(App):
     # Use Tokyo Night theme for modern styling
@@ -31,16 +41,37 @@ class ExpenseApp(App):
         ("left", "expand_accounts", "Expand Accounts"),
         ("right", "expand_transactions", "Expand Transactions"),
         ("r", "reset_layout", "Reset Layout"),
+        ("w", "cycle_insights_window", "Insights Window"),
+        ("p", "toggle_profiler", "Profiler"),
     ]
     
     def __init__(self):
         super().__init__()
-        self.category_manager = CategoryManager()
+        self._category_manager = None
         self.theme_list = ["textual-dark", "textual-light", "nord", "gruvbox", "monokai", "tokyo-night"]
         self.current_theme_index = 2  # Default to Nord theme
+        self.transaction_pager = TransactionPager()
+        self.account_balances = {}
+        # Generation counters let background loads detect that a newer
+        # request superseded them; their results are then discarded
+        self._data_generation = 0
+        self._insights_generation = 0
+        self._refresh_timer = None
+        self._insights_timer = None
+        self._refresh_pending = False
+        self.insights_window = WINDOWS[0]
+        self._profile_overlay = None
     
     CSS_PATH = Path(__file__).parent / "styles.tcss"
     
+    @property
+    def category_manager(self):
+        """Category colours, parsed from categories.yaml on first use."""
+        if self._category_manager is None:
+            from .components.categories import CategoryManager
+            self._category_manager = CategoryManager()
+        return self._category_manager
+    
     def compose(self) -> ComposeResult:
         yield Header()
         
@@ -82,53 +113,29 @@ class ExpenseApp(App):
         # Set initial theme based on current_theme_index
         self.theme = self.theme_list[self.current_theme_index]
         
-        # Load data
+        # Load data; insights follow as soon as the first snapshot lands
         self.load_data()
-        
-        # Load insights after a delay to ensure UI is ready
-        self.set_timer(1.0, self._load_insights_delayed)
+        self.call_after_refresh(trace.mark, "first frame")
 
     def load_data(self):
         # Setup table columns
         try:
             accounts_table = self.query_one("#accounts-table", DataTable)
-            accounts_table.add_columns("Account", "Type", "Balance")
+            accounts_table.add_column("Account")
+            accounts_table.add_column("Type")
+            accounts_table.add_column("Balance", key="balance")
             
             transactions_table = self.query_one("#transactions-table", DataTable)
-            transactions_table.add_columns("Date", "Description", "Amount", "Type", "Category", "Account")
+            transactions_table.add_column("Date", key="date")
+            transactions_table.add_columns("Description", "Amount", "Type", "Category", "Account")
             
         except Exception as e:
             self.log(f"Error setting up tables: {e}")
             self.notify("Failed to initialize tables. Please restart the app", severity="error")
             return
         
-        # Load actual data from database
-        self.refresh_data()
-
-    def _load_insights_delayed(self):
-        """Load insights after a delay - simplest approach."""
-        try:
-            self.log("Loading insights after delay")
-            insights_display = self.query_one("#insights-display", Static)
-            
-            # Since we confirmed this works outside Textual, let's try it directly
-            result = InsightsGenerator.generate_insights()
-            self.log(f"Insights loaded successfully, length: {len(result)}")
-            
-            insights_display.update(result)
-            
-        except Exception as e:
-            self.log(f"Error in delayed insights loading: {e}")
-            import traceback
-            self.log(f"Full traceback: {traceback.format_exc()}")
-            try:
-                insights_display = self.query_one("#insights-display", Static)
-                insights_display.update(f"Failed to load insights: {str(e)}")
-            except:
-                pass
-
-
-
+        # Load actual data from database, without waiting for more requests
+        self.refresh_data(immediate=True)
 
     def action_add_account(self) -> None:
         """Show the add account modal."""
@@ -150,18 +157,10 @@ class ExpenseApp(App):
         # Handle specific useful clicks
         if hasattr(clicked_widget, 'id'):
             if clicked_widget.id == "insights-display":
-                # Refresh insights when clicked
-                try:
-                    insights_display = self.query_one("#insights-display", Static)
-                    insights_display.update("🔄 Refreshing insights...")
-                    self.log("Refreshing insights...")
-                    result = InsightsGenerator.generate_insights()
-                    self.log(f"Insights refresh successful")
-                    insights_display.update(result)
-                except Exception as e:
-                    self.log(f"Error refreshing insights: {e}")
-                    insights_display = self.query_one("#insights-display", Static)
-                    insights_display.update("Failed to refresh insights")
+                # Refresh insights when clicked; the current content stays
+                # visible until the new one is ready
+                self.log("Refreshing insights...")
+                self._update_insights()
             elif clicked_widget.id == "accounts-header":
                 # Refresh accounts when header is clicked
                 self.refresh_data()
@@ -170,162 +169,209 @@ class ExpenseApp(App):
 
 
 
-    def refresh_data(self) -> None:
-        """Refresh all data from database."""
+    def on_ledger_changed(self, message: LedgerChanged) -> None:
+        """Apply a committed write without a full refresh.
+
+        Balances are updated in place; the transactions table reloads only
+        its newest page, and only when a new row falls inside it.
+        """
         try:
-            db = SessionLocal()
+            accounts_table = self.query_one("#accounts-table", DataTable)
+            for account in message.balances:
+                key = str(account.account_id)
+                if account.account_id in self.account_balances:
+                    accounts_table.update_cell(key, "balance", f"${account.balance:.2f}")
+                    self.account_balances[account.account_id] = account.balance
+                else:
+                    if "placeholder" in accounts_table.rows:
+                        accounts_table.remove_row("placeholder")
+                    self._add_account_row(accounts_table, account)
+            if message.balances:
+                self._update_total_header()
             
-            # Clear and reload accounts table
+            if any(self.transaction_pager.covers(row) for row in message.rows):
+                self._reload_first_page(self.query_one("#transactions-table", DataTable))
+        except Exception as e:
+            self.log(f"Error applying ledger change: {e}")
+            self.refresh_data()
+            return
+        
+        if self._refresh_pending:
+            # A snapshot loading right now may predate this write
+            self.refresh_data()
+        elif message.rows:
+            self._update_insights()
+
+    def _reload_first_page(self, transactions_table: DataTable) -> None:
+        """Show the newest page again after a write that falls inside it.
+
+        DataTable can only append rows, so a new row that belongs above
+        others is shown by refilling the table from a fresh keyset cursor:
+        one indexed query and at most one page of rows, however long the
+        history is. Older pages are fetched again as the cursor scrolls.
+        """
+        pager = TransactionPager(self.transaction_pager.page_size)
+        db = SessionLocal()
+        try:
+            rows = pager.next_page(db)
+        finally:
+            db.close()
+        transactions_table.clear()
+        self.transaction_pager = pager
+        for row in rows:
+            transactions_table.add_row(*format_row(row), key=row_key(row))
+
+    def _add_account_row(self, accounts_table: DataTable, account) -> None:
+        """Add one account row keyed by its id and remember its balance."""
+        account_type = account.account_type.value if account.account_type else "Unknown"
+        accounts_table.add_row(account.name, account_type, f"${account.balance:.2f}", key=str(account.account_id))
+        self.account_balances[account.account_id] = account.balance
+
+    def _update_total_header(self) -> None:
+        """Show the sum of the known account balances in the accounts header."""
+        total_balance = sum(self.account_balances.values())
+        accounts_header = self.query_one("#accounts-header", Static)
+        accounts_header.update(f"💳 Accounts @= ${total_balance:.2f}")
+
+    def _update_insights(self, immediate: bool = False) -> None:
+        """Schedule a background regeneration of the insights panel."""
+        self._insights_generation += 1
+        if self._insights_timer is not None:
+            self._insights_timer.stop()
+            self._insights_timer = None
+        if immediate:
+            self._start_insights()
+        else:
+            self._insights_timer = self.set_timer(REFRESH_DEBOUNCE, self._start_insights)
+
+    def _start_insights(self) -> None:
+        self._insights_timer = None
+        self._generate_insights(self._insights_generation, self.insights_window)
+
+    @work(thread=True, exclusive=True, group="insights", exit_on_error=False)
+    def _generate_insights(self, generation: int, window_days: int) -> None:
+        """Build the insights text in a worker thread, reusing cached output."""
+        # Imported here so plotext and the Rich consoles load off the UI
+        # thread, after the first frame
+        from .components.insights import InsightsGenerator
+        worker = get_current_worker()
+        with profiler.span("insights"):
+            result = InsightsGenerator.generate_cached(window_days)
+        if not worker.is_cancelled:
+            self.post_message(InsightsReady(result, generation))
+
+    def on_insights_ready(self, message: InsightsReady) -> None:
+        """Show freshly generated insights unless a newer run was requested."""
+        if message.generation != self._insights_generation:
+            return
+        self.log(f"Insights update successful")
+        self.query_one("#insights-display", Static).update(message.content)
+        trace.mark("insights ready")
+
+    def on_data_table_cell_highlighted(self, event: DataTable.CellHighlighted) -> None:
+        """Fetch the next page of transactions as the cursor nears the end."""
+        if event.data_table.id != "transactions-table":
+            return
+        if not self.transaction_pager.wants_more(event.coordinate.row):
+            return
+        try:
+            db = SessionLocal()
+            try:
+                rows = self.transaction_pager.next_page(db)
+            finally:
+                db.close()
+            for row in rows:
+                event.data_table.add_row(*format_row(row), key=row_key(row))
+        except Exception as e:
+            self.log(f"Error loading more transactions: {e}")
+
+    def refresh_data(self, immediate: bool = False) -> None:
+        """Reload all data from the database in the background.
+
+        Requests arriving in quick succession are coalesced into one load
+        (unless ``immediate``), and the tables keep showing the previous data
+        until the new snapshot lands.
+        """
+        self._data_generation += 1
+        self._refresh_pending = True
+        if self._refresh_timer is not None:
+            self._refresh_timer.stop()
+            self._refresh_timer = None
+        if immediate:
+            self._start_refresh()
+        else:
+            self._refresh_timer = self.set_timer(REFRESH_DEBOUNCE, self._start_refresh)
+
+    def _start_refresh(self) -> None:
+        self._refresh_timer = None
+        self._load_snapshot(self._data_generation)
+
+    @work(thread=True, exclusive=True, group="refresh", exit_on_error=False)
+    def _load_snapshot(self, generation: int) -> None:
+        """Read balances and the first transactions page in a worker thread."""
+        worker = get_current_worker()
+        db = SessionLocal()
+        try:
+            with profiler.span("refresh.load"):
+                summary = AccountBalanceStore.read(db)
+                pager = TransactionPager()
+                transaction_rows = pager.next_page(db)
+        except Exception as e:
+            self.call_from_thread(self._report_refresh_error, e)
+            return
+        finally:
+            db.close()
+        
+        if worker.is_cancelled or generation != self._data_generation:
+            return
+        self.call_from_thread(self._apply_snapshot, generation, summary, pager, transaction_rows)
+
+    @profiled("refresh.apply")
+    def _apply_snapshot(self, generation: int, summary, pager: TransactionPager, transaction_rows) -> None:
+        """Replace the table contents with a freshly loaded snapshot."""
+        if generation != self._data_generation:
+            # A newer refresh was requested while this one was loading
+            return
+        self._refresh_pending = False
+        try:
             accounts_table = self.query_one("#accounts-table", DataTable)
             accounts_table.clear()
+            self.log(f"Found {len(summary)} accounts in database")
             
-            # Load real account data
-            accounts = db.query(Account).all()
-            self.log(f"Found {len(accounts)} accounts in database")
-            total_balance = 0
-            
-            # Prepare all rows at once
-            account_rows = []
-            for account in accounts:
-                # Calculate totals for this account using proper SQLAlchemy syntax
-                from sqlalchemy import func
-                income_total = db.query(func.sum(Transaction.amount)).filter(
-                    Transaction.account_id == account.id,
-                    Transaction.transaction_type == TransactionType.INCOME
-                ).scalar() or 0
-                
-                expense_total = db.query(func.sum(Transaction.amount)).filter(
-                    Transaction.account_id == account.id,
-                    Transaction.transaction_type == TransactionType.EXPENSE
-                ).scalar() or 0
-                
-                # For transfers, we need to calculate incoming and outgoing separately
-                # Transfers are stored with both accounts having transactions
-                # The amount represents: 
-                # - Money leaving the source account (treat as expense)
-                # - Money entering the destination account (treat as income)
-                
-                # Get all transfer transactions for this account
-                transfer_transactions = db.query(Transaction).filter(
-                    Transaction.account_id == account.id,
-                    Transaction.transaction_type == TransactionType.TRANSFER
-                ).all()
-                
-                transfer_net = 0
-                for transfer in transfer_transactions:
-                    # Find the paired transaction to determine direction
-                    if transfer.transfer_pair_id:
-                        paired_transaction = db.query(Transaction).filter(
-                            Transaction.id == transfer.transfer_pair_id
-                        ).first()
-                        
-                        if paired_transaction:
-                            # If the paired transaction is in a different account, 
-                            # this is money leaving our account (negative)
-                            if paired_transaction.account_id != account.id:
-                                # Check if this is the "out" transaction by comparing descriptions
-                                if f"Transfer to" in transfer.description:
-                                    transfer_net -= transfer.amount  # Money leaving
-                                else:
-                                    transfer_net += transfer.amount  # Money coming in
-                
-                # Calculate balance (starting + income - expense + net transfers)
-                balance = account.starting_balance + income_total - expense_total + transfer_net
-                total_balance += balance
-                
-                # Add account type and better formatting
-                account_type = account.account_type.value if account.account_type else "Unknown"
-                account_rows.append([account.name, account_type, f"${balance:.2f}"])
-            
-            # Add rows to table
-            if account_rows:
-                for row in account_rows:
-                    accounts_table.add_row(*row)
-            else:
-                accounts_table.add_row("No Accounts", "Unknown", "$0.00")
+            # Add rows keyed by account id so later writes can update them in place
+            self.account_balances = {}
+            for account in summary:
+                self._add_account_row(accounts_table, account)
+            if not summary:
+                accounts_table.add_row("No Accounts", "Unknown", "$0.00", key="placeholder")
             
             # Update the accounts header with total balance
-            accounts_header = self.query_one("#accounts-header", Static)
-            accounts_header.update(f"💳 Accounts @= ${total_balance:.2f}")
+            self._update_total_header()
             
-            # Load all transactions in a single table
+            # Show the first page of transactions (most recent first);
+            # further pages are fetched as the cursor scrolls
             transactions_table = self.query_one("#transactions-table", DataTable)
             transactions_table.clear()
+            self.transaction_pager = pager
             
-            # Get all transactions ordered by date (most recent first)
-            all_transactions = db.query(Transaction).order_by(Transaction.date.desc()).all()
-            
-            # Prepare all rows at once
-            transaction_rows = []
-            for transaction in all_transactions:
-                try:
-                    # Get account name
-                    account = db.query(Account).filter(Account.id == transaction.account_id).first()
-                    account_name = account.name if account else "Unknown"
-                    
-                    # Format date
-                    date_str = transaction.date.strftime("%m/%d")
-                    
-                    # Format amount with currency and sign
-                    amount_str = f"${transaction.amount:.2f}"
-                    if transaction.transaction_type == TransactionType.INCOME:
-                        amount_str = f"+{amount_str}"
-                        type_str = "💰 Income"
-                    elif transaction.transaction_type == TransactionType.EXPENSE:
-                        amount_str = f"-{amount_str}"
-                        type_str = "💸 Expense"
-                    elif transaction.transaction_type == TransactionType.TRANSFER:
-                        # Determine if this is incoming or outgoing transfer by description
-                        if "Transfer to" in transaction.description:
-                            amount_str = f"-{amount_str}"
-                            type_str = "🔄 Transfer Out"
-                        else:
-                            amount_str = f"+{amount_str}"
-                            type_str = "🔄 Transfer In"
-                    
-                    # Format category
-                    category_str = transaction.category if transaction.category else "Uncategorized"
-                    
-                    transaction_row = [
-                        date_str,
-                        transaction.description,
-                        amount_str,
-                        type_str,
-                        category_str,
-                        account_name
-                    ]
-                    transaction_rows.append(transaction_row)
-                    
-                except Exception as e:
-                    self.log(f"Error processing transaction: {e}")  # Remove ID exposure
-            
-            # Add rows to table
             if transaction_rows:
                 for row in transaction_rows:
-                    transactions_table.add_row(*row)
+                    transactions_table.add_row(*format_row(row), key=row_key(row))
             else:
-                transactions_table.add_row("--/--", "No Transactions", "$0.00", "📝 None", "No Category", "No Account")
-            
-            # Refresh the insights with new data
-            try:
-                insights_display = self.query_one("#insights-display", Static)
-                self.log("Updating insights after data refresh...")
-                result = InsightsGenerator.generate_insights()
-                self.log(f"Insights update successful")
-                insights_display.update(result)
-            except Exception as e:
-                self.log(f"Error updating insights: {e}")
-                import traceback
-                self.log(f"Insights error traceback: {traceback.format_exc()}")
-                insights_display = self.query_one("#insights-display", Static)
-                insights_display.update(f"Insights error: {str(e)}")
-            
-            db.close()
+                transactions_table.add_row("--/--", "No Transactions", "$0.00", "📝 None", "No Category", "No Account", key="placeholder")
         except Exception as e:
-            if 'db' in locals():
-                db.close()
-            self.log(f"Error refreshing data: {e}")
-            self.notify("Failed to load data. Please check database connection", severity="error")
+            self._report_refresh_error(e)
+            return
+        trace.mark("accounts loaded")
+        
+        # Refresh the insights with new data; snapshots are already
+        # debounced, so there is no need to wait again
+        self._update_insights(immediate=True)
+
+    def _report_refresh_error(self, error: Exception) -> None:
+        self._refresh_pending = False
+        self.log(f"Error refreshing data: {error}")
+        self.notify("Failed to load data. Please check database connection", severity="error")
 
     def action_expand_accounts(self) -> None:
         """Expand the accounts panel"""
@@ -363,6 +409,31 @@ class ExpenseApp(App):
         except Exception as e:
             self.log(f"Error resetting layout: {e}")
 
+    def action_cycle_insights_window(self) -> None:
+        """Cycle the insights overview and trend through the available windows"""
+        index = (WINDOWS.index(self.insights_window) + 1) % len(WINDOWS)
+        self.insights_window = WINDOWS[index]
+        self._update_insights()
+        self.notify(f"Insights window: {self.insights_window} days", severity="information")
+
+    def action_toggle_profiler(self) -> None:
+        """Show or hide the profiler overlay, recording while it is open"""
+        from . import database
+        if self._profile_overlay is None:
+            from .components.profile_overlay import ProfileOverlay
+            self._profile_overlay = ProfileOverlay(id="profile-overlay")
+            self.mount(self._profile_overlay)
+        else:
+            self._profile_overlay.display = not self._profile_overlay.display
+        
+        if self._profile_overlay.display:
+            profiler.enable(trace_path(database.storage_config))
+            self._profile_overlay.refresh_content()
+            self.notify(f"Profiling to {profiler.path}", severity="information")
+        elif not requested():
+            # Keep recording when the whole run is profiled
+            profiler.disable()
+
     def action_toggle_theme(self) -> None:
         """Cycle through available themes"""
         self.current_theme_index = (self.current_theme_index + 1) % len(self.theme_list)
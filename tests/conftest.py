@@ -0,0 +1,208 @@
+"""Shared fixtures for the Budgt.sh test suite.
+
+Tests run against throwaway databases filled by ``budgt.synthetic``, so every
+size is a realistic ledger (four accounts, two years of paychecks, bills,
+card payments, transfers and day-to-day spending) and a seed always yields
+the same rows. Each size is generated once per session and copied for every
+test that uses it.
+"""
+
+import asyncio
+import os
+import shutil
+import threading
+import time
+from collections import Counter
+
+import pytest
+from sqlalchemy import event
+
+from budgt import database, synthetic
+from budgt.bench import parse_size
+from budgt.cache import clear_all
+from budgt.config import StorageConfig
+
+# Ledger sizes of the size-parametrized tests; widen the sweep with e.g.
+# BUDGT_TEST_SIZES=1k,20k,100k
+SIZES = tuple(parse_size(size) for size in os.environ.get("BUDGT_TEST_SIZES", "1k,20k").split(","))
+SEED = 7
+
+# Multiplies every latency budget, for slow or shared CI machines
+LATENCY_SCALE = float(os.environ.get("BUDGT_LATENCY_SCALE", "1"))
+
+# Headless terminal size, wide enough for the full insights layout
+SCREEN_SIZE = (160, 50)
+# Seconds to wait for the app before failing the test
+APP_TIMEOUT = 60
+
+# Statements SQLite runs as bookkeeping rather than to fetch data
+_BOOKKEEPING = ("PRAGMA data_version",)
+
+
+class QueryLog:
+    """SQL statements run on the engine while the log is active.
+
+    Use as a context manager around the operation under test. Statements
+    from every thread are recorded, so background workers that should not
+    be measured have to be kept out of the window.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+        self._lock = threading.Lock()
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        with self._lock:
+            self.statements.append(" ".join(statement.split()))
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(self.engine, "before_cursor_execute", self._record)
+
+    @property
+    def count(self):
+        """Number of statements recorded."""
+        return len(self.statements)
+
+    def repeated(self, limit=2):
+        """Statements run more than ``limit`` times, the mark of an N+1 loop.
+
+        Returns:
+            dict: ``{statement: times run}``, bookkeeping pragmas excluded
+        """
+        counts = Counter(
+            statement for statement in self.statements if not statement.startswith(_BOOKKEEPING)
+        )
+        return {statement: times for statement, times in counts.items() if times > limit}
+
+    def report(self):
+        """The recorded statements, numbered, for assertion messages."""
+        return "\n".join(f"{number:3}: {statement[:160]}" for number, statement in enumerate(self.statements, 1))
+
+
+@pytest.fixture(scope="session")
+def _ledger_templates(tmp_path_factory):
+    """Generate each ledger size once per session."""
+    directory = tmp_path_factory.mktemp("ledgers")
+    templates = {}
+
+    def template(size):
+        if size not in templates:
+            path = str(directory / f"ledger-{size}.db")
+            database.configure(StorageConfig(path))
+            database.init_db()
+            db = database.SessionLocal()
+            try:
+                synthetic.generate(db, size, SEED)
+            finally:
+                db.close()
+            # Closing the last connection checkpoints the WAL into the file
+            database.engine.dispose()
+            templates[size] = path
+        return templates[size]
+
+    return template
+
+
+@pytest.fixture
+def make_ledger(_ledger_templates, tmp_path):
+    """Factory pointing the app at a fresh copy of a generated ledger.
+
+    ``make_ledger(size)`` copies the session's ledger of that size, configures
+    ``budgt.database`` to use it, clears the in-memory analytics caches and
+    returns the database path. The previous storage settings are restored
+    afterwards.
+    """
+    previous = database.storage_config
+
+    def make(size):
+        path = str(tmp_path / f"budgt-{size}.db")
+        shutil.copyfile(_ledger_templates(size), path)
+        database.configure(StorageConfig(path))
+        database.init_db()
+        clear_all()
+        return path
+
+    yield make
+    clear_all()
+    if previous is not None:
+        database.configure(previous)
+    else:
+        database.engine.dispose()
+
+
+@pytest.fixture(params=SIZES, ids=lambda size: f"{size}rows")
+def ledger(request, make_ledger):
+    """A fresh copy of the generated ledger of each size in ``SIZES``."""
+    make_ledger(request.param)
+    return request.param
+
+
+@pytest.fixture
+def query_log():
+    """Factory for a ``QueryLog`` on the currently configured engine."""
+    return lambda: QueryLog(database.engine)
+
+
+@pytest.fixture
+def budget():
+    """Assert that an operation stayed within its latency budget."""
+
+    def check(name, seconds, budget_ms):
+        limit = budget_ms * LATENCY_SCALE
+        elapsed = seconds * 1000
+        assert elapsed <= limit, f"{name} took {elapsed:.1f}ms, budget {limit:.0f}ms"
+
+    return check
+
+
+async def _wait_for(condition, timeout=APP_TIMEOUT):
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > deadline:
+            raise AssertionError("timed out waiting for the app")
+        await asyncio.sleep(0.001)
+
+
+@pytest.fixture
+def wait_for():
+    """Coroutine polling ``condition()`` on the event loop until it holds."""
+    return _wait_for
+
+
+@pytest.fixture
+def run_app():
+    """Run a scenario against a headless ``ExpenseApp``.
+
+    ``run_app(scenario)`` mounts the app on the configured database, waits
+    for the first snapshot and insights, then awaits ``scenario(app, pilot)``
+    and returns its result. With ``insights=False`` the insights panel is not
+    regenerated once the scenario starts, which keeps its background queries
+    out of query counts and timings of the operation itself.
+    """
+    from textual.widgets import Static
+
+    from budgt.tui import ExpenseApp
+
+    def run(scenario, insights=False):
+        async def main():
+            app = ExpenseApp()
+            async with app.run_test(size=SCREEN_SIZE) as pilot:
+                await _wait_for(lambda: app._data_generation and not app._refresh_pending)
+                display = app.query_one("#insights-display", Static)
+                await _wait_for(lambda: "Loading insights" not in str(display.render()))
+                await app.workers.wait_for_complete()
+                if not insights:
+                    app._update_insights = lambda immediate=False: None
+                result = await scenario(app, pilot)
+                await app.workers.wait_for_complete()
+                await pilot.pause()
+            return result
+
+        return asyncio.run(main())
+
+    return run
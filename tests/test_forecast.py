@@ -0,0 +1,49 @@
+"""Projecting balances from recurring flows."""
+
+import time
+
+from budgt import database, synthetic
+from budgt.analytics import load_analytics
+from budgt.cache import clear_all
+from budgt.forecast import HORIZONS, forecast
+from budgt.recurring import detect
+
+# Cold means the in-memory caches are empty; the column cache on disk is
+# already built, as it is for every launch after the first
+FORECAST_COLD_BUDGET_MS = 100
+REPEAT = 3
+
+
+def _cold_forecast(days):
+    clear_all()
+    db = database.SessionLocal()
+    try:
+        started = time.perf_counter()
+        result = forecast(db, days)
+        return time.perf_counter() - started, result
+    finally:
+        db.close()
+
+
+def test_forecast_cold_latency(ledger, budget):
+    db = database.SessionLocal()
+    try:
+        load_analytics(db)
+    finally:
+        db.close()
+
+    for days in HORIZONS:
+        elapsed = min(_cold_forecast(days)[0] for _ in range(REPEAT))
+        budget(f"cold forecast ({days} days)", elapsed, FORECAST_COLD_BUDGET_MS)
+
+
+def test_bills_are_recurring(make_ledger):
+    make_ledger(1000)
+    db = database.SessionLocal()
+    try:
+        charges = detect(db)
+    finally:
+        db.close()
+
+    monthly = {description for description, _, _, _, _, frequency in synthetic.BILLS if frequency == 1}
+    assert monthly <= {charge.description for charge in charges}
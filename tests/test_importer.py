@@ -0,0 +1,50 @@
+"""Importing bank statements."""
+
+import pytest
+
+from budgt import database, importer, synthetic
+from budgt.database import Transaction
+from budgt.importer import import_file
+
+CHECKING = synthetic.ACCOUNTS[synthetic.CHECKING][0]
+
+# Not sorted by date: the second coffee comes back to Jan 5 after Jan 6
+INTERLEAVED = """Date,Description,Amount
+2024-01-05,COFFEE,-3.50
+2024-01-06,GROCERIES,-42.10
+2024-01-05,COFFEE,-3.50
+2024-01-06,GROCERIES,-42.10
+2024-01-05,COFFEE,-3.50
+"""
+
+
+def _import(path):
+    db = database.SessionLocal()
+    try:
+        return import_file(db, path, CHECKING)
+    finally:
+        db.close()
+
+
+# The default keeps every counter in memory; 1 moves each day to the
+# temporary file as soon as the statement leaves it
+@pytest.mark.parametrize("limit", [importer.OCCURRENCE_LIMIT, 1])
+def test_interleaved_dates_keep_identical_rows(make_ledger, tmp_path, monkeypatch, limit):
+    monkeypatch.setattr(importer, "OCCURRENCE_LIMIT", limit)
+    make_ledger(1000)
+    path = tmp_path / "statement.csv"
+    path.write_text(INTERLEAVED)
+
+    result = _import(str(path))
+    assert (result.inserted, result.duplicates, result.invalid) == (5, 0, 0)
+
+    db = database.SessionLocal()
+    try:
+        coffees = db.query(Transaction).filter(Transaction.description == "COFFEE").count()
+    finally:
+        db.close()
+    assert coffees == 3
+
+    # Re-importing the same file adds nothing
+    again = _import(str(path))
+    assert (again.inserted, again.duplicates) == (0, 5)
@@ -0,0 +1,88 @@
+"""Generating the insights panel."""
+
+import time
+
+from textual.widgets import Static
+
+from budgt.cache import clear_all
+from budgt.components.insights import InsightsGenerator
+from budgt.timeseries import WINDOWS
+
+# Grouped reads of the rollups, balances, anomalies, recurring charges and
+# forecast; the first run also builds the column cache from the ledger
+INSIGHTS_STATEMENTS = 25
+# The first run reads the whole ledger into the column cache
+INSIGHTS_FIRST_BUDGET_MS = 1000
+INSIGHTS_BUDGET_MS = 300
+INSIGHTS_CACHED_BUDGET_MS = 5
+# From pressing "w" until the panel shows the new window
+INSIGHTS_WINDOW_BUDGET_MS = 600
+REPEAT = 3
+
+
+def _generate(window_days=30):
+    started = time.perf_counter()
+    content = InsightsGenerator.generate_insights(window_days)
+    elapsed = time.perf_counter() - started
+    assert "Please check your database connection" not in str(content)
+    return elapsed
+
+
+def test_insights_statements(ledger, query_log):
+    with query_log() as first:
+        _generate()
+    clear_all()
+    with query_log() as warm:
+        _generate()
+
+    for log in (first, warm):
+        assert log.count <= INSIGHTS_STATEMENTS, log.report()
+        assert not log.repeated(), log.report()
+
+
+def test_insights_latency(ledger, budget):
+    budget("first insights", _generate(), INSIGHTS_FIRST_BUDGET_MS)
+
+    def regenerate():
+        clear_all()
+        return _generate()
+
+    budget("insights", min(regenerate() for _ in range(REPEAT)), INSIGHTS_BUDGET_MS)
+
+
+def test_cached_insights(ledger, query_log, budget):
+    content = InsightsGenerator.generate_cached(30)
+    with query_log() as log:
+        started = time.perf_counter()
+        cached = InsightsGenerator.generate_cached(30)
+        elapsed = time.perf_counter() - started
+
+    assert cached is content
+    assert log.count == 1, log.report()
+    budget("cached insights", elapsed, INSIGHTS_CACHED_BUDGET_MS)
+
+
+def test_error_panels_are_not_cached(make_ledger, monkeypatch):
+    make_ledger(1000)
+
+    def fail(window_days):
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(InsightsGenerator, "_render", staticmethod(fail))
+    assert "database is locked" in InsightsGenerator.generate_cached(30)
+    monkeypatch.undo()
+    assert "database is locked" not in InsightsGenerator.generate_cached(30)
+
+
+def test_insights_window(ledger, run_app, wait_for, budget):
+    async def scenario(app, pilot):
+        display = app.query_one("#insights-display", Static)
+        shown = str(display.render())
+        started = time.perf_counter()
+        await pilot.press("w")
+        await wait_for(lambda: str(display.render()) != shown)
+        return app.insights_window, time.perf_counter() - started
+
+    window, elapsed = run_app(scenario, insights=True)
+    assert window == WINDOWS[1]
+    budget("insights window", elapsed, INSIGHTS_WINDOW_BUDGET_MS)
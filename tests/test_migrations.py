@@ -0,0 +1,26 @@
+"""Upgrading existing databases."""
+
+from budgt import database, migrations
+
+
+def _counts():
+    with database.engine.connect() as connection:
+        return tuple(
+            connection.exec_driver_sql(f"SELECT COUNT(*) FROM {table}").scalar()
+            for table in ("category_stats", "anomalies")
+        )
+
+
+def test_upgrade_replays_anomaly_history(make_ledger):
+    make_ledger(1000)
+    expected = _counts()
+    assert expected[0] and expected[1]
+
+    # A database from before the detector: no statistics, schema version 8
+    with database.engine.begin() as connection:
+        connection.exec_driver_sql("DROP TABLE category_stats")
+        connection.exec_driver_sql("DROP TABLE anomalies")
+        migrations.set_version(connection, 8)
+    database.init_db()
+
+    assert _counts() == expected
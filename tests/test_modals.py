@@ -0,0 +1,244 @@
+"""Adding transactions and transfers through the modals."""
+
+import time
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import text
+from textual.widgets import Button, DataTable
+
+from budgt import database
+from budgt.balances import AccountBalanceService
+from budgt.components.modals import AddTransactionModal, TransferModal
+from budgt.database import Account, Transaction, TransactionType
+from budgt.ledger import from_transaction, row_key
+from budgt.messages import LedgerChanged
+
+# Inserts, balance, rollup and anomaly updates, and the balances read back
+# for the tables; none of it depends on the size of the ledger
+ADD_TRANSACTION_STATEMENTS = 10
+TRANSFER_STATEMENTS = 12
+# From pressing the button until the new rows show, mostly spent redrawing
+# the screen behind the closing modal
+ADD_TRANSACTION_BUDGET_MS = 250
+TRANSFER_BUDGET_MS = 250
+
+
+def _balances():
+    # Recomputed from the transactions, so a write that updates the stored
+    # balance without inserting the rows (or the reverse) shows up
+    db = database.SessionLocal()
+    try:
+        return {account.account_id: account.balance for account in AccountBalanceService.compute(db).accounts}
+    finally:
+        db.close()
+
+
+async def _submit(app, pilot, modal, fields, button, query_log, wait_for):
+    """Fill ``modal`` and press ``button``, timing until the new rows show.
+
+    Returns:
+        tuple: (seconds, QueryLog)
+    """
+    transactions = app.query_one("#transactions-table", DataTable)
+    shown = set(transactions.rows)
+    app.push_screen(modal)
+    await pilot.pause()
+    for selector, value in fields.items():
+        modal.query_one(selector).value = value
+    await pilot.pause()
+
+    with query_log() as log:
+        started = time.perf_counter()
+        modal.query_one(button, Button).press()
+        await wait_for(lambda: app.screen is not modal and set(transactions.rows) != shown)
+        elapsed = time.perf_counter() - started
+    return elapsed, log
+
+
+def _add_expense(account_id, amount, query_log, wait_for):
+    async def scenario(app, pilot):
+        modal = AddTransactionModal()
+        fields = {
+            "#transaction-type": TransactionType.EXPENSE,
+            "#account-select": account_id,
+            "#description": "Test purchase",
+            "#amount": str(amount),
+            "#category-select": "Food",
+        }
+        return await _submit(app, pilot, modal, fields, "#add-transaction", query_log, wait_for)
+
+    return scenario
+
+
+def _transfer(source, destination, amount, query_log, wait_for):
+    async def scenario(app, pilot):
+        modal = TransferModal()
+        fields = {
+            "#from-account-select": source,
+            "#to-account-select": destination,
+            "#transfer-amount": str(amount),
+            "#transfer-description": "Test transfer",
+        }
+        return await _submit(app, pilot, modal, fields, "#transfer-money", query_log, wait_for)
+
+    return scenario
+
+
+def test_add_transaction(ledger, run_app, query_log, wait_for, budget):
+    before = _balances()
+    account_id = min(before)
+    elapsed, log = run_app(_add_expense(account_id, 12.5, query_log, wait_for))
+
+    assert log.count <= ADD_TRANSACTION_STATEMENTS, log.report()
+    assert not log.repeated(), log.report()
+    budget("add transaction", elapsed, ADD_TRANSACTION_BUDGET_MS)
+
+    after = _balances()
+    assert after[account_id] == pytest.approx(before[account_id] - 12.5)
+    db = database.SessionLocal()
+    try:
+        newest = db.query(Transaction).order_by(Transaction.id.desc()).first()
+    finally:
+        db.close()
+    assert (newest.description, newest.amount, newest.category) == ("Test purchase", 12.5, "Food")
+
+
+def test_transfer(ledger, run_app, query_log, wait_for, budget):
+    before = _balances()
+    source, destination = sorted(before)[:2]
+    elapsed, log = run_app(_transfer(source, destination, 40, query_log, wait_for))
+
+    assert log.count <= TRANSFER_STATEMENTS, log.report()
+    assert not log.repeated(), log.report()
+    budget("transfer", elapsed, TRANSFER_BUDGET_MS)
+
+    after = _balances()
+    assert after[source] == pytest.approx(before[source] - 40)
+    assert after[destination] == pytest.approx(before[destination] + 40)
+    db = database.SessionLocal()
+    try:
+        transfer_out, transfer_in = db.query(Transaction).order_by(Transaction.id.desc()).limit(2).all()[::-1]
+    finally:
+        db.close()
+    assert transfer_out.transfer_pair_id == transfer_in.id
+    assert transfer_in.transfer_pair_id == transfer_out.id
+
+
+def test_failed_add_rolls_back(ledger, run_app, monkeypatch):
+    from budgt.components import modals
+
+    def fail(db, observations):
+        raise RuntimeError("disk full")
+
+    sessions = []
+
+    def session():
+        db = database.SessionLocal()
+        sessions.append(db)
+        return db
+
+    # Fails after the insert and the balance update have been flushed
+    monkeypatch.setattr(modals.anomalies, "record", fail)
+    monkeypatch.setattr(modals, "SessionLocal", session)
+    before = _balances()
+    account_id = min(before)
+
+    async def scenario(app, pilot):
+        modal = AddTransactionModal()
+        app.push_screen(modal)
+        await pilot.pause()
+        modal.query_one("#transaction-type").value = TransactionType.EXPENSE
+        modal.query_one("#account-select").value = account_id
+        modal.query_one("#description").value = "Test purchase"
+        modal.query_one("#amount").value = "12.5"
+        modal.query_one("#category-select").value = "Food"
+        await pilot.pause()
+        modal.query_one("#add-transaction", Button).press()
+        await pilot.pause()
+        return app.screen is modal
+
+    assert run_app(scenario)
+    # The failed write was rolled back and its session closed
+    assert sessions and not any(db.in_transaction() for db in sessions)
+    assert _balances() == before
+    db = database.SessionLocal()
+    try:
+        stored = db.execute(text("SELECT balance FROM account_balances WHERE account_id = :id"), {"id": account_id}).scalar()
+    finally:
+        db.close()
+    assert stored == pytest.approx(before[account_id])
+
+
+def test_write_statements_do_not_grow_with_ledger(make_ledger, run_app, query_log, wait_for):
+    counts = []
+    for size in (1000, 20000):
+        make_ledger(size)
+        account_id = min(_balances())
+        _, log = run_app(_add_expense(account_id, 5, query_log, wait_for))
+        counts.append(log.count)
+    assert counts[0] == counts[1]
+
+
+def _insert_expenses(dates):
+    """Write an expense on each of ``dates`` and return their ``LedgerRow``s."""
+    db = database.SessionLocal()
+    try:
+        account = db.query(Account).order_by(Account.id).first()
+        transactions = [
+            Transaction(
+                date=when,
+                transaction_type=TransactionType.EXPENSE,
+                account_id=account.id,
+                description="Test purchase",
+                amount=1.0,
+                category="Food",
+            )
+            for when in dates
+        ]
+        db.add_all(transactions)
+        db.flush()
+        rows = [from_transaction(transaction, account.name) for transaction in transactions]
+        db.commit()
+        return rows
+    finally:
+        db.close()
+
+
+def _newest_ids(limit):
+    db = database.SessionLocal()
+    try:
+        return [
+            row[0]
+            for row in db.execute(
+                text("SELECT id FROM transactions ORDER BY date DESC, id DESC LIMIT :limit"), {"limit": limit}
+            )
+        ]
+    finally:
+        db.close()
+
+
+def test_new_rows_keep_table_order(ledger, run_app, wait_for):
+    async def scenario(app, pilot):
+        transactions = app.query_one("#transactions-table", DataTable)
+        dates = [row[0] for row in _newest_rows(transactions)]
+        # One row newer than everything, one between the loaded rows
+        rows = _insert_expenses([dates[0] + timedelta(days=1), dates[len(dates) // 2]])
+        app.post_message(LedgerChanged(rows=rows))
+        await wait_for(lambda: row_key(rows[0]) in transactions.rows)
+        return [row.key.value for row in transactions.ordered_rows], rows
+
+    shown, rows = run_app(scenario)
+    assert shown == [f"txn-{id}" for id in _newest_ids(len(shown))]
+    assert shown[0] == row_key(rows[0])
+    assert row_key(rows[1]) in shown
+
+
+def _newest_rows(transactions):
+    """(date, id) of the rows loaded in the table, newest first."""
+    db = database.SessionLocal()
+    try:
+        ids = [int(row.key.value.removeprefix("txn-")) for row in transactions.ordered_rows]
+        return sorted(db.query(Transaction.date, Transaction.id).filter(Transaction.id.in_(ids)).all(), reverse=True)
+    finally:
+        db.close()
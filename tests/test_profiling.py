@@ -0,0 +1,112 @@
+"""Profiling spans, SQL statistics and the overlay."""
+
+import json
+
+import pytest
+
+from budgt import database
+from budgt.database import Transaction
+from budgt.profiling import Profiler, profiler, trace_path
+
+
+@pytest.fixture
+def trace(tmp_path):
+    """Enable the shared profiler with a trace file; yields the file's path."""
+    path = str(tmp_path / "profile.jsonl")
+    profiler.clear()
+    profiler.enable(path)
+    yield path
+    profiler.close()
+    profiler.clear()
+
+
+def _trace_lines(path):
+    with open(path, encoding="utf-8") as trace_file:
+        return [json.loads(line) for line in trace_file]
+
+
+def test_disabled_span_records_nothing():
+    idle = Profiler()
+    with idle.span("idle"):
+        pass
+    assert idle.span("idle") is idle.span("other")
+    assert idle.recent() == []
+
+
+def test_spans_count_statements_and_rows(make_ledger, trace):
+    make_ledger(1000)
+    profiler.clear()
+    db = database.SessionLocal()
+    try:
+        with profiler.span("outer"):
+            with profiler.span("inner"):
+                db.query(Transaction).limit(50).all()
+            db.query(Transaction.id).limit(10).all()
+    finally:
+        db.close()
+
+    inner, outer = profiler.recent()[::-1]
+    assert (inner.name, inner.queries, inner.rows, inner.depth) == ("inner", 1, 50, 1)
+    assert (outer.name, outer.queries, outer.rows, outer.depth) == ("outer", 2, 60, 0)
+    assert outer.ms >= inner.ms
+    assert {query.span for query in profiler.slowest()} == {"inner", "outer"}
+
+    lines = _trace_lines(trace)
+    assert [line["name"] for line in lines] == ["inner", "outer"]
+    assert lines[1]["rows"] == 60
+
+
+def test_slowest_keeps_the_slowest_statements(make_ledger, trace):
+    make_ledger(1000)
+    profiler.clear()
+    db = database.SessionLocal()
+    try:
+        for _ in range(profiler.slow_queries * 2):
+            db.query(Transaction.id).limit(1).all()
+    finally:
+        db.close()
+
+    slowest = profiler.slowest()
+    assert len(slowest) == profiler.slow_queries
+    assert [query.ms for query in slowest] == sorted((query.ms for query in slowest), reverse=True)
+
+
+def test_trace_path(monkeypatch):
+    from budgt.config import StorageConfig
+
+    monkeypatch.delenv("BUDGT_PROFILE_FILE", raising=False)
+    assert trace_path(StorageConfig("/data/budgt.db")) == "/data/budgt.db-profile.jsonl"
+    monkeypatch.setenv("BUDGT_PROFILE_FILE", "/tmp/trace.jsonl")
+    assert trace_path(StorageConfig("/data/budgt.db")) == "/tmp/trace.jsonl"
+
+
+def test_overlay_records_app_spans(make_ledger, run_app, wait_for, tmp_path, monkeypatch):
+    monkeypatch.setenv("BUDGT_PROFILE_FILE", str(tmp_path / "app.jsonl"))
+    monkeypatch.delenv("BUDGT_PROFILE", raising=False)
+    make_ledger(1000)
+    profiler.clear()
+
+    async def scenario(app, pilot):
+        await pilot.press("p")
+        overlay = app.query_one("#profile-overlay")
+        # The refresh regenerates the insights once its snapshot lands; a new
+        # window misses the insights cache, so the panel renders again
+        await pilot.press("w")
+        app.refresh_data(immediate=True)
+        await wait_for(lambda: any(span.name == "insights" for span in profiler.recent()))
+        overlay.refresh_content()
+        shown = str(overlay.render())
+        await pilot.press("p")
+        return shown, overlay.display, profiler.enabled
+
+    try:
+        shown, displayed, enabled = run_app(scenario, insights=True)
+    finally:
+        profiler.close()
+    names = {span.name for span in profiler.recent()}
+    profiler.clear()
+
+    assert {"refresh.load", "refresh.apply", "insights", "insights.render", "chart.spending"} <= names
+    assert "refresh.load" in shown and "Slowest SQL" in shown
+    assert not displayed and not enabled
+    assert len(_trace_lines(str(tmp_path / "app.jsonl"))) >= len(names)
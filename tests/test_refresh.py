@@ -0,0 +1,90 @@
+"""Reloading the accounts and transactions tables."""
+
+import time
+
+import pytest
+from textual.widgets import DataTable
+
+from budgt import database
+from budgt.balances import AccountBalanceService, AccountBalanceStore
+from budgt.database import Account, AccountType
+from budgt.ledger import PAGE_SIZE
+
+# A refresh reads the materialized balances and one page of transactions
+REFRESH_STATEMENTS = 4
+REFRESH_BUDGET_MS = 150
+REPEAT = 3
+
+
+async def _refresh(app, wait_for):
+    started = time.perf_counter()
+    app.refresh_data(immediate=True)
+    await wait_for(lambda: not app._refresh_pending)
+    return time.perf_counter() - started
+
+
+def _add_accounts(count):
+    db = database.SessionLocal()
+    try:
+        for number in range(count):
+            account = Account(name=f"Extra {number}", account_type=AccountType.SAVINGS, starting_balance=number)
+            db.add(account)
+            db.flush()
+            AccountBalanceStore.open_account(db, account)
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_refresh_statements(ledger, run_app, query_log, wait_for):
+    async def scenario(app, pilot):
+        with query_log() as log:
+            await _refresh(app, wait_for)
+        return log
+
+    log = run_app(scenario)
+    assert log.count <= REFRESH_STATEMENTS, log.report()
+    assert not log.repeated(), log.report()
+
+
+def test_refresh_statements_do_not_grow_with_accounts(make_ledger, run_app, query_log, wait_for):
+    make_ledger(1000)
+
+    async def scenario(app, pilot):
+        with query_log() as log:
+            await _refresh(app, wait_for)
+        return log.count, app.query_one("#accounts-table", DataTable).row_count
+
+    before, _ = run_app(scenario)
+    _add_accounts(25)
+    after, rows = run_app(scenario)
+    assert rows == 29
+    assert after == before
+
+
+def test_refresh_latency(ledger, run_app, wait_for, budget):
+    async def scenario(app, pilot):
+        return min([await _refresh(app, wait_for) for _ in range(REPEAT)])
+
+    budget("refresh", run_app(scenario), REFRESH_BUDGET_MS)
+
+
+def test_refresh_fills_tables(ledger, run_app, wait_for):
+    async def scenario(app, pilot):
+        await _refresh(app, wait_for)
+        accounts = app.query_one("#accounts-table", DataTable)
+        transactions = app.query_one("#transactions-table", DataTable)
+        return accounts.row_count, transactions.row_count, dict(app.account_balances)
+
+    accounts, transactions, balances = run_app(scenario)
+    db = database.SessionLocal()
+    try:
+        # Recomputed from the transactions, not read back from the store the
+        # app reads too
+        expected = {account.account_id: account.balance for account in AccountBalanceService.compute(db).accounts}
+    finally:
+        db.close()
+    assert accounts == 4
+    assert transactions == min(ledger, PAGE_SIZE)
+    assert balances == pytest.approx(expected)
+
@@ -0,0 +1,109 @@
+"""Cold-start cost of the scriptable subcommands.
+
+``budgt balance`` and ``budgt --version`` must answer without importing the
+UI or ORM stacks; ``python -X importtime`` lists every module a run imported.
+The budget is on the wall-clock time of the whole process, interpreter
+start-up included.
+"""
+
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import time
+
+import pytest
+
+from budgt import database, synthetic
+
+# Packages only the TUI and ORM commands may import
+HEAVY_MODULES = ("sqlalchemy", "textual", "plotext", "numpy", "rich", "yaml")
+# From spawning ``python -m budgt balance`` until it exits
+COLD_START_BUDGET_MS = 150
+REPEAT = 3
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _run(args, cwd, *options, check=True):
+    """Run ``python OPTIONS -m budgt ARGS`` and return the finished process."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")])))
+    return subprocess.run(
+        [sys.executable, *options, "-m", "budgt", *args],
+        cwd=cwd,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=check,
+    )
+
+
+def _importtime(args, cwd):
+    """Run ``python -X importtime -m budgt ARGS``.
+
+    Returns:
+        tuple: (output, [(module, cumulative microseconds, depth)])
+    """
+    result = _run(args, cwd, "-X", "importtime")
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            # Nested imports are indented two spaces per level
+            depth = (len(name) - len(name.lstrip()) - 1) // 2
+            imports.append((name.strip(), int(cumulative), depth))
+    return result.stdout, imports
+
+
+@pytest.mark.parametrize("args", [["balance"], ["balance", "--json"], ["--version"]])
+def test_light_commands_skip_heavy_imports(make_ledger, tmp_path, args):
+    path = make_ledger(1000)
+    output, imports = _importtime(["--db", path, *args], tmp_path)
+
+    assert output
+    assert not [name for name, _, _ in imports if name.split(".")[0] in HEAVY_MODULES]
+
+
+def test_balance_cold_start(ledger, tmp_path, budget):
+    path = database.storage_config.path
+
+    def run():
+        started = time.perf_counter()
+        _run(["--db", path, "balance"], tmp_path)
+        return time.perf_counter() - started
+
+    budget("budgt balance", min(run() for _ in range(REPEAT)), COLD_START_BUDGET_MS)
+
+
+def test_balance_lists_accounts(make_ledger, tmp_path):
+    path = make_ledger(1000)
+    output, _ = _importtime(["--db", path, "balance"], tmp_path)
+    for name, _, _ in synthetic.ACCOUNTS:
+        assert name in output
+
+
+def test_balance_backfills_untyped_accounts(make_ledger, tmp_path):
+    path = make_ledger(1000)
+    with sqlite3.connect(path) as connection:
+        # An account from before balances were materialized, with no type
+        connection.execute("INSERT INTO accounts (name, account_type) VALUES ('Legacy', NULL)")
+    connection.close()
+
+    result = _run(["--db", path, "balance", "--json"], tmp_path)
+
+    accounts = {account["name"]: account for account in json.loads(result.stdout)["accounts"]}
+    assert accounts["Legacy"]["type"] == ""
+    assert accounts["Legacy"]["balance"] == 0
+
+
+@pytest.mark.parametrize("args", [["balnce"], ["db", "infos"], ["--frobnicate"]])
+def test_unknown_command_is_rejected(tmp_path, args):
+    path = str(tmp_path / "budgt.db")
+    result = _run(["--db", path, *args], tmp_path, check=False)
+
+    assert result.returncode == 2
+    assert "unknown command" in result.stderr and "balance" in result.stderr
+    assert not os.path.exists(path)